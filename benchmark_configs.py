@@ -0,0 +1,35 @@
+"""Script to benchmark the GA on the ten test problem configs, and compare the results against a baseline."""
+import json
+import logging
+import os
+
+import optimisation.benchmark
+
+CONFIG_NUMBERS = list(range(1, 11))
+SIZES = [1000, 10000, 100000]
+SEED = 1
+OUTPUT_FILE = "benchmark-results.json"
+BASELINE_FILE = "benchmark-baseline.json"
+TOLERANCE = 0.1  # Fractional change treated as a regression;
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+
+    results = optimisation.benchmark.run_benchmarks(config_numbers=CONFIG_NUMBERS, sizes=SIZES, seed=SEED)
+    optimisation.benchmark.save_results(results, OUTPUT_FILE)
+    for case, summary in results['cases'].items():
+        peak_rss = "unknown " if summary['peak_rss_mb'] is None else round(summary['peak_rss_mb'])
+        print(f"{case}: {round(summary['evaluations_per_second'])} evals/s, "
+              f"{round(summary['generations_per_second'], 1)} gens/s, "
+              f"{peak_rss}MB, fitness {round(summary['final_fitness'], 4)}")
+
+    # Compare against the baseline, or save these results as the baseline if there isn't one yet;
+    if os.path.exists(BASELINE_FILE):
+        regressions = optimisation.benchmark.compare_to_baseline(
+            results, optimisation.benchmark.load_results(BASELINE_FILE), TOLERANCE)
+        print(json.dumps(regressions, indent=2) if regressions else "No regressions against the baseline.")
+    else:
+        optimisation.benchmark.save_results(results, BASELINE_FILE)
+        print(f"Saved baseline to {BASELINE_FILE}.")
+
+    print("Done.")
@@ -0,0 +1,42 @@
+"""Script to benchmark how island mode scales from one worker up to one worker per island."""
+import json
+import logging
+import time
+
+import optimisation
+from optimisation import configs
+
+NUM_ISLANDS = 8
+WORKER_COUNTS = [1, 2, 4, 8]
+SEED = 1
+OUTPUT_FILE = "island-scaling.json"
+
+ga_configs = dict(configs.ga_configs)
+island_configs = dict(configs.island_configs, num_islands=NUM_ISLANDS)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+
+    results = {}
+    for num_workers in WORKER_COUNTS:
+        start = time.perf_counter()
+        meal = optimisation.run_islands(
+            ga_configs=ga_configs,
+            island_configs=island_configs,
+            seed=SEED,
+            num_workers=num_workers
+        )
+        elapsed = time.perf_counter() - start
+        results[num_workers] = {
+            'seconds': elapsed,
+            'speedup': results[WORKER_COUNTS[0]]['seconds'] / elapsed if results else 1.0,
+            'fitness': optimisation.calculate_fitness(meal)[0]
+        }
+        results[num_workers]['efficiency'] = results[num_workers]['speedup'] * WORKER_COUNTS[0] / num_workers
+        print(f"{num_workers} workers: {round(elapsed, 2)}s, speedup x{round(results[num_workers]['speedup'], 2)}")
+
+    with open(OUTPUT_FILE, 'w') as fh:
+        json.dump(results, fh, indent=2)
+
+    print("Done.")
@@ -21,22 +21,9 @@ for recipe_dfn in recipe_index:
     i += 1
     r = model.recipes.SettableRecipe(persistence.load_datafile(cls=model.recipes.RecipeBase, datafile_name=recipe_dfn))
 
-    data = {}
-    data['nutrient_ratios_data'] = r.nutrient_ratios_data
-    data['ingredient_unique_names'] = r.ingredient_unique_names
-    data['ingredient_ratios_data'] = r.ingredient_ratios_data
-    data['ingredient_quantities_data'] = r.ingredient_quantities_data
-    data['typical_serving_size_g'] = r.typical_serving_size_g
-    data['cost_per_qty_data'] = r.cost_per_qty_data
-    data['flag_data'] = {}
-    for flag_name in model.flags.ALL_FLAGS.keys():
-        try:
-            data['flag_data'][flag_name] = r.get_flag_value(flag_name)
-        except model.flags.exceptions.UndefinedFlagError:
-            data['flag_data'][flag_name] = None
-    data['calories_per_g'] = r.calories_per_g
-
-    recipes[recipe_dfn] = data
+    precalc_data = r.precalc_data
+    if precalc_data is not None:
+        recipes[recipe_dfn] = precalc_data
 
     print(f'{round((i/num_recs)*100, 2)}% Completed...')
 
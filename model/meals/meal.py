@@ -1,5 +1,5 @@
 """Defines meal classes."""
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 
 import model
 import persistence
@@ -13,6 +13,30 @@ class SettableMeal(
 
     def __init__(self, meal_data: Optional['model.meals.MealData'] = None, **kwargs):
         super().__init__(recipe_quantities_data=meal_data, **kwargs)
+        self._genome_key: Optional[Tuple[Tuple[str, float], ...]] = None
+
+    @property
+    def genome_key(self) -> Tuple[Tuple[str, float], ...]:
+        """Returns a hashable key which is identical for any two meals with the same recipes and quantities.
+        Notes:
+            The key is memoised, and reset by add_recipe and set_recipe_quantity. Changes made by writing
+            to recipe_quantities_data directly are not detected.
+        """
+        if self._genome_key is None:
+            self._genome_key = tuple(sorted(
+                (rdf_name, rqd['quantity_in_g']) for rdf_name, rqd in self.recipe_quantities_data.items()
+            ))
+        return self._genome_key
+
+    def add_recipe(self, recipe_unique_name: str, recipe_qty_data: Optional['model.quantity.QuantityData'] = None):
+        """Adds a recipe to the meal, invalidating the genome key."""
+        super().add_recipe(recipe_unique_name=recipe_unique_name, recipe_qty_data=recipe_qty_data)
+        self._genome_key = None
+
+    def set_recipe_quantity(self, recipe_unique_name: str, quantity: float, unit: str) -> None:
+        """Sets the quantity of a recipe on the meal, invalidating the genome key."""
+        super().set_recipe_quantity(recipe_unique_name=recipe_unique_name, quantity=quantity, unit=unit)
+        self._genome_key = None
 
     @property
     def pricetag(self) -> float:
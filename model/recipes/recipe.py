@@ -13,6 +13,7 @@ class RecipeBase(
     model.instructions.HasReadableInstructionSrc,
     model.tags.HasReadableTags,
     persistence.SupportsPersistence,
+    persistence.YieldsPrecalcData,
     abc.ABC
 ):
     """Abstract base class for readable and writbale recipe classes."""
@@ -45,6 +46,32 @@ class RecipeBase(
         del data['flag_data']
         return data
 
+    @property
+    def precalc_data(self) -> Optional[Dict[str, Any]]:
+        """Returns the precalc data for the recipe instance, as held in the precalc recipes.json, or None if
+        the recipe's calorie, nutrient or cost data is incomplete."""
+        flag_data = {}
+        for flag_name in model.flags.ALL_FLAGS.keys():
+            try:
+                flag_data[flag_name] = self.get_flag_value(flag_name)
+            except model.flags.exceptions.UndefinedFlagError:
+                flag_data[flag_name] = None
+        try:
+            return {
+                'nutrient_ratios_data': self.nutrient_ratios_data,
+                'ingredient_unique_names': self.ingredient_unique_names,
+                'ingredient_ratios_data': self.ingredient_ratios_data,
+                'ingredient_quantities_data': self.ingredient_quantities_data,
+                'typical_serving_size_g': self.typical_serving_size_g,
+                'cost_per_qty_data': self.cost_per_qty_data,
+                'flag_data': flag_data,
+                'calories_per_g': self.calories_per_g,
+                'tags': self.tags,
+                'serve_intervals': self.serve_intervals_data
+            }
+        except model.exceptions.PyDietModelError:
+            return None
+
 
 class ReadonlyRecipe(
     RecipeBase,
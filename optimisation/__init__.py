@@ -8,4 +8,36 @@ from .main import (
     splice_members
 )
 from .population import Population
-from .history import History
+from .history import History, HistoryReader, read_history, create_solution_data
+from .fitness_engine import RecipeArrays, FitnessEngine, build_fitness_engine, load_recipe_arrays
+from .fitness_cache import FitnessCache
+from .candidate_pools import CandidatePools, get_default_candidate_pools
+from .genome import (
+    Genome,
+    genome_to_meal,
+    meal_to_genome,
+    get_candidate_recipe_ids,
+    create_random_genome,
+    splice_genomes,
+    mutate_genome,
+    choose_cull_losers,
+    breed_genomes
+)
+from .local_search import refine_quantities, refine_population
+from .solution_archive import SolutionArchive
+from .pareto import run_pareto, non_dominated_sort, crowding_distance
+from .milp import solve_meal, run_milp
+from .termination import (
+    TerminationPolicy,
+    MaxGenerations,
+    WallClockDeadline,
+    StallDetection,
+    TargetFitness,
+    EvaluationBudget,
+    AnyOf,
+    AllOf,
+    build_termination_policy
+)
+from .metrics import Metrics, JsonlMetricsWriter, log_metrics, profiled
+from .islands import run_islands, migrate, get_migration_routes
+from .day_plan import DayPlanEngine, run_day_plan
@@ -0,0 +1,221 @@
+"""Benchmark harness, running the test problem configs against seeded synthetic recipe databases."""
+import copy
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any
+
+import numpy
+
+import model
+import optimisation
+import persistence
+
+TEST_DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests',
+                                  'test_database')
+SYNTHETIC_TAGS = ["main", "side", "drink", "sweet", "savory", "snack", "dessert"]
+SYNTHETIC_SERVE_INTERVALS = ["04:00-10:00", "10:00-14:00", "12:00-18:00", "16:00-22:00"]
+FITNESS_THRESHOLDS = [0.8, 0.85, 0.9, 0.95]
+
+# Metrics where a higher value is better, or worse, when comparing against a baseline;
+HIGHER_IS_BETTER = ['evaluations_per_second', 'generations_per_second', 'final_fitness']
+LOWER_IS_BETTER = ['peak_rss_mb']
+
+
+def install_synthetic_recipe_db(
+        num_recipes: int,
+        seed: int = 1,
+        source_db_path: str = TEST_DATABASE_PATH
+) -> None:
+    """Loads a synthetic recipe database into the persistence cache, in place of the configured database.
+    Notes:
+        Each synthetic recipe is a copy of a recipe in the source database, with its precalc values jittered
+        and random tags, flags and serve intervals, all drawn from the seed. Ingredients are still read from
+        the source database, so the synthetic recipes can be loaded into meals.
+    """
+    persistence.configs.PATH_INTO_DB = source_db_path
+    persistence.cache.reset()
+    rng = numpy.random.default_rng(seed)
+
+    # Take the recipes with precalc data as templates;
+    source_precalc_data = persistence.get_precalc_data_for_recipes()
+    source_df_names = sorted(source_precalc_data.keys())
+    source_datafiles = {df_name: persistence.load_datafile(cls=model.recipes.RecipeBase, datafile_name=df_name)
+                        for df_name in source_df_names}
+
+    index, precalc_data, recipes_by_tag, datafiles = {}, {}, {}, {}
+    flag_names = list(model.flags.ALL_FLAGS.keys())
+    for i in range(num_recipes):
+        source_df_name = source_df_names[rng.integers(len(source_df_names))]
+        df_name = f"synthetic-{i:06d}"
+        tags = sorted(rng.choice(SYNTHETIC_TAGS, size=rng.integers(1, 3), replace=False).tolist())
+        serve_intervals = sorted(
+            rng.choice(SYNTHETIC_SERVE_INTERVALS, size=rng.integers(1, 3), replace=False).tolist())
+
+        # Jitter the precalc data;
+        recipe_data = copy.deepcopy(source_precalc_data[source_df_name])
+        for nutr_ratio_data in recipe_data['nutrient_ratios_data'].values():
+            nutr_ratio_data['subject_qty_data']['quantity_in_g'] *= rng.uniform(0.5, 1.5)
+        recipe_data['calories_per_g'] *= rng.uniform(0.7, 1.3)
+        recipe_data['cost_per_qty_data']['cost_per_g'] *= rng.uniform(0.5, 1.5)
+        recipe_data['flag_data'] = {flag_name: bool(value) for flag_name, value in
+                                    zip(flag_names, rng.random(len(flag_names)) < 0.8)}
+        recipe_data['tags'] = tags
+        recipe_data['serve_intervals'] = serve_intervals
+        precalc_data[df_name] = recipe_data
+
+        # Copy the datafile, so the recipe can be loaded;
+        datafile = dict(source_datafiles[source_df_name])
+        datafile.update(name=f"Synthetic Recipe {i}", tags=tags, serve_intervals=serve_intervals)
+        datafiles[df_name] = datafile
+        index[df_name] = datafile['name']
+        for tag in tags:
+            recipes_by_tag.setdefault(tag, []).append(df_name)
+
+    persistence.cache.datafiles.update(datafiles)
+    persistence.cache.indexes[model.recipes.RecipeBase.__name__] = index
+    persistence.cache.recipe_precalc_data = precalc_data
+    persistence.cache.recipes_by_tag = recipes_by_tag
+
+
+class RunRecorder(optimisation.TerminationPolicy):
+    """Wraps a termination policy, recording the progress of the run at each generation."""
+
+    def __init__(self, policy: 'optimisation.TerminationPolicy'):
+        self.policy = policy
+        self.records: List[Dict[str, float]] = []
+        self._start_time: Optional[float] = None
+
+    def start(self) -> None:
+        self.records = []
+        self._start_time = time.perf_counter()
+        self.policy.start()
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        self.records.append({
+            'seconds': time.perf_counter() - self._start_time,
+            'generation': population.generation,
+            'fitness': population.highest_fitness_score,
+            'evaluations': num_evaluations
+        })
+        return self.policy.should_stop(population, num_evaluations)
+
+
+def summarise_run(records: List[Dict[str, float]], thresholds: List[float] = FITNESS_THRESHOLDS) -> Dict[str, Any]:
+    """Returns the benchmark metrics for the records of a run."""
+    final = records[-1]
+    time_to_fitness = {}
+    for threshold in thresholds:
+        reached = [record['seconds'] for record in records if record['fitness'] >= threshold]
+        time_to_fitness[str(threshold)] = reached[0] if reached else None
+    return {
+        'seconds': final['seconds'],
+        'generations': final['generation'],
+        'evaluations': final['evaluations'],
+        'evaluations_per_second': final['evaluations'] / final['seconds'],
+        'generations_per_second': final['generation'] / final['seconds'],
+        'time_to_fitness': time_to_fitness,
+        'final_fitness': final['fitness']
+    }
+
+
+def run_case(config_number: int, num_recipes: int, seed: int = 1) -> Dict[str, Any]:
+    """Runs one test problem config against a synthetic database, and returns its metrics.
+    Run in a fresh process, so the peak RSS belongs to this case alone.
+    """
+    config = importlib.import_module(f"optimisation.configs{config_number}")
+    install_synthetic_recipe_db(num_recipes=num_recipes, seed=seed)
+    recorder = RunRecorder(optimisation.build_termination_policy(config.ga_configs))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        optimisation.main.run(
+            ga_configs=config.ga_configs,
+            constraints=config.constraints,
+            goals=config.goals,
+            history_filepath=os.path.join(tmp_dir, 'history.jsonl'),
+            seed=seed,
+            termination=recorder
+        )
+    summary = summarise_run(recorder.records)
+    summary['peak_rss_mb'] = get_peak_rss_mb()
+    return summary
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """Returns the peak resident set size of this process in MB, or None where the platform can't report it.
+    Notes:
+        The resource module is only available on Unix. ru_maxrss is in bytes on macOS, and kilobytes elsewhere.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss / (1024 * 1024)
+    return max_rss / 1024
+
+
+def run_benchmarks(
+        config_numbers: List[int] = tuple(range(1, 11)),
+        sizes: List[int] = (1000, 10000, 100000),
+        seed: int = 1
+) -> Dict[str, Any]:
+    """Runs every config at every database size, one at a time, each in its own process."""
+    results = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed
+        },
+        'cases': {}
+    }
+    for num_recipes in sizes:
+        for config_number in config_numbers:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                summary = executor.submit(run_case, config_number, num_recipes, seed).result()
+            results['cases'][f"config{config_number}-{num_recipes}"] = summary
+    return results
+
+
+def compare_to_baseline(
+        results: Dict[str, Any],
+        baseline: Dict[str, Any],
+        tolerance: float = 0.1
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Returns the metrics which are more than tolerance (as a fraction) worse than the baseline, by case.
+    Cases missing from either set of results are skipped, as are metrics either set could not measure.
+    """
+    regressions = {}
+    for case, summary in results['cases'].items():
+        if case not in baseline['cases']:
+            continue
+        baseline_summary = baseline['cases'][case]
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            value, baseline_value = summary[metric], baseline_summary[metric]
+            if value is None or baseline_value is None:
+                continue
+            change = (value - baseline_value) / baseline_value if baseline_value else 0
+            if (metric in HIGHER_IS_BETTER and change < -tolerance) or \
+                    (metric in LOWER_IS_BETTER and change > tolerance):
+                regressions.setdefault(case, {})[metric] = {
+                    'value': value, 'baseline': baseline_value, 'change': change}
+    return regressions
+
+
+def save_results(results: Dict[str, Any], filepath: str) -> None:
+    """Saves the results as JSON."""
+    with open(filepath, 'w') as fh:
+        json.dump(results, fh, indent=2)
+
+
+def load_results(filepath: str) -> Dict[str, Any]:
+    """Loads results saved by save_results."""
+    with open(filepath, 'r') as fh:
+        return json.load(fh)
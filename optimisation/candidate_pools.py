@@ -0,0 +1,63 @@
+"""Cache of the recipes which can fill each slot of a meal, so random members can be drawn in O(1)."""
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy
+
+import model
+import optimisation
+import persistence
+
+
+class CandidatePools:
+    """Computes, once per combination of tag, flags and serve time, the array of recipe ids which satisfy it.
+    Notes:
+        Pools are queried from the persistence recipe index, or from an index built over the precalc data
+        provided.
+    """
+
+    def __init__(self, recipe_arrays: 'optimisation.RecipeArrays', precalc_data: Optional[Dict[str, Any]] = None):
+        self.recipe_arrays = recipe_arrays
+        if precalc_data is None:
+            self._recipe_index = persistence.get_recipe_index()
+        else:
+            self._recipe_index = persistence.RecipeIndex.from_precalc_data(
+                precalc_data=precalc_data,
+                get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+                get_serve_intervals=lambda df_name: persistence.load_datafile(
+                    cls=model.recipes.RecipeBase, datafile_name=df_name)['serve_intervals']
+            )
+        # Map the index's rows onto the recipe ids;
+        self._row_recipe_ids = numpy.array(
+            [recipe_arrays.recipe_ids[df_name] for df_name in self._recipe_index.df_names], dtype=numpy.intp)
+        self._pools: Dict[Tuple[str, Tuple[Tuple[str, bool], ...], Optional[str]], 'numpy.ndarray'] = {}
+
+    def __len__(self):
+        return len(self._pools)
+
+    def get_pool(self, tag: str, flags: Dict[str, bool], serve_time: Optional[str] = None) -> 'numpy.ndarray':
+        """Returns a sorted array of the ids of the recipes with the tag and flags, servable at the time."""
+        key = (tag, tuple(sorted(flags.items())), serve_time)
+        if key not in self._pools:
+            rows = self._recipe_index.query_rows(tags=[tag], flags=flags, serve_time=serve_time)
+            self._pools[key] = numpy.sort(self._row_recipe_ids[rows])
+        return self._pools[key]
+
+    def get_pools(self, tags: List[str], flags: Dict[str, bool],
+                  serve_time: Optional[str] = None) -> List['numpy.ndarray']:
+        """Returns the pool for each tag, one per meal slot."""
+        return [self.get_pool(tag, flags, serve_time) for tag in tags]
+
+
+# Pools for the SettableMeal operators, rebuilt whenever the precalc data is reloaded;
+_default_pools: Dict[str, Any] = {'recipe_index': None, 'pools': None}
+
+
+def get_default_candidate_pools() -> 'CandidatePools':
+    """Returns the candidate pools for the precalc data currently loaded by persistence."""
+    recipe_index = persistence.get_recipe_index()
+    if _default_pools['recipe_index'] is not recipe_index:
+        _default_pools['pools'] = CandidatePools(
+            recipe_arrays=optimisation.load_recipe_arrays()
+        )
+        _default_pools['recipe_index'] = recipe_index
+    return _default_pools['pools']
@@ -1,5 +1,6 @@
 """Configuration file for the optimisation module."""
-history_path = "optimisation/history.json"
+history_path = "optimisation/history.jsonl"
+history_fsync_every = None
 
 ga_configs = {
     "max_population_size": 100,
@@ -9,6 +10,49 @@ ga_configs = {
     "mutation_probability_percentage": 50,
     "random_solution_intro_percentage": 50,
     "log_every_n_updates": 10,
+    "target_fitness": None,
+    "max_seconds": None,
+    "stall_generations": None,
+    "max_evaluations": None,
+}
+
+island_configs = {
+    "num_islands": 4,
+    "migration_interval": 10,
+    "migration_size": 2,
+    "topology": "ring",
+}
+
+day_plan_configs = {
+    "epoch_generations": 10,
+}
+
+local_search_configs = {
+    "enabled": False,
+    "num_members": 5,
+    "interval": 1,
+}
+
+archive_configs = {
+    "enabled": False,
+    "path": "optimisation/archive.json",
+    "seed_fraction": 0.5,
+    "max_solutions": 10,
+}
+
+milp_configs = {
+    "min_serving_ratio": 0.5,
+    "max_serving_ratio": 1.5,
+    "time_limit": None,
+}
+
+service_configs = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "unix_socket_path": None,
+    "num_workers": None,
+    "max_ended_jobs": 100,
+    "max_request_bytes": 1000000,
 }
 
 constraints = {
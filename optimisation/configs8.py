@@ -1,5 +1,5 @@
 """Configuration file for the optimisation module."""
-history_path = "optimisation/history.json"
+history_path = "optimisation/history.jsonl"
 
 ga_configs = {
     "max_population_size": 50,
@@ -0,0 +1,311 @@
+"""Day plan optimisation: one sub-population per meal, evolved in worker processes against shared day goals."""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, TypedDict, Tuple
+
+import numpy
+
+import model
+import optimisation
+import persistence
+from optimisation import configs
+
+
+class MealTotals(TypedDict):
+    """Nutrient masses, calories and cost of one or more meals, once scaled to their calorie targets."""
+    nutrient_masses_g: 'numpy.ndarray'
+    calories: float
+    cost: float
+
+
+class MealState(TypedDict):
+    """Picklable snapshot of a meal's sub-population, passed between the coordinating process and workers."""
+    recipe_ids: 'numpy.ndarray'
+    quantities_g: 'numpy.ndarray'
+    generation: int
+    rng: 'numpy.random.Generator'
+
+
+def get_meal_time(meal_goals_data: 'goals.MealGoalsData') -> Optional[str]:
+    """Returns the serve time from the meal goals data, which is persisted under time_str."""
+    return meal_goals_data.get('time_str', meal_goals_data.get('time'))
+
+
+def get_meal_flags(day_goals_data: 'goals.DayGoalsData', meal_name: str) -> Dict[str, bool]:
+    """Returns the flags which apply to the meal; the day's flags, overridden by any set on the meal."""
+    flags = {}
+    for goals_data in (day_goals_data, day_goals_data['meal_goals'][meal_name]):
+        for flag_name, flag_value in goals_data.get('flags', {}).items():
+            if flag_value is not None:
+                flags[flag_name] = flag_value
+    return flags
+
+
+class DayPlanEngine:
+    """Scores the members of each meal's sub-population, in the context of the rest of the day's plan.
+    Notes:
+        Each meal's quantities are scaled to its calorie target, where it has one. Every nutrient mass
+        goal, on the meals and on the day, contributes 1 - |mass - goal| / goal, floored at zero, and
+        the fitness is the worst of these. A plan over the max cost of a meal or of the day scores zero.
+        The day goals are checked against the member plus the totals of the other meals, so meals can
+        trade nutrients with each other.
+    """
+
+    def __init__(self, recipe_arrays: 'optimisation.RecipeArrays', day_goals_data: 'goals.DayGoalsData'):
+        self.recipe_arrays = recipe_arrays
+        self.meal_names: List[str] = list(day_goals_data['meal_goals'].keys())
+        meal_goals = [day_goals_data['meal_goals'][meal_name] for meal_name in self.meal_names]
+
+        # Collect the columns for every targeted nutrient, on the day or on any meal;
+        self.nutrient_names: List[str] = []
+        for goals_data in [day_goals_data] + meal_goals:
+            for nutr_name in goals_data['nutrient_mass_goals'].keys():
+                nutr_name = model.nutrients.get_nutrient_primary_name(nutr_name)
+                if nutr_name not in self.nutrient_names:
+                    self.nutrient_names.append(nutr_name)
+        self._nutrient_ratios = numpy.zeros((len(recipe_arrays), len(self.nutrient_names)))
+        for i, nutr_name in enumerate(self.nutrient_names):
+            if nutr_name in recipe_arrays.nutrient_columns:
+                self._nutrient_ratios[:, i] = recipe_arrays.nutrient_ratios[:, recipe_arrays.nutrient_columns[nutr_name]]
+
+        # Hold the goals as arrays, with NaN where a nutrient has no goal;
+        self._day_goals = self._get_goal_array(day_goals_data)
+        self._day_calorie_target: Optional[float] = day_goals_data.get('calorie_target')
+        self._day_max_cost: Optional[float] = day_goals_data.get('max_cost_gbp_target')
+        self._meal_goals = [self._get_goal_array(goals_data) for goals_data in meal_goals]
+        self._meal_calorie_targets: List[Optional[float]] = [data.get('calorie_target') for data in meal_goals]
+        self._meal_max_costs: List[Optional[float]] = [data.get('max_cost_gbp_target') for data in meal_goals]
+
+    def _get_goal_array(self, goals_data: 'goals.GoalsData') -> 'numpy.ndarray':
+        """Returns the goal mass in grams for each targeted nutrient, with NaN where no goal is set."""
+        goal_array = numpy.full(len(self.nutrient_names), numpy.nan)
+        for nutr_name, nutrient_mass_data in goals_data['nutrient_mass_goals'].items():
+            column = self.nutrient_names.index(model.nutrients.get_nutrient_primary_name(nutr_name))
+            goal_array[column] = nutrient_mass_data['quantity_in_g']
+        return goal_array
+
+    def meal_totals(self, meal_index: int, recipe_ids: 'numpy.ndarray',
+                    quantities_g: 'numpy.ndarray') -> Tuple['numpy.ndarray', 'numpy.ndarray', 'numpy.ndarray']:
+        """Returns the nutrient masses, calories and cost of each member, scaled to the meal's calorie target."""
+        recipe_ids, quantities_g = numpy.atleast_2d(recipe_ids), numpy.atleast_2d(quantities_g)
+        calories = (self.recipe_arrays.calories_per_g[recipe_ids] * quantities_g).sum(axis=1)
+        cost = (self.recipe_arrays.cost_per_g[recipe_ids] * quantities_g).sum(axis=1)
+        nutrient_masses_g = numpy.einsum('ms,msn->mn', quantities_g, self._nutrient_ratios[recipe_ids])
+        if self._meal_calorie_targets[meal_index] is not None:
+            k = self._get_scale_factors(meal_index, calories)
+            calories, cost, nutrient_masses_g = calories * k, cost * k, nutrient_masses_g * k[:, None]
+        return nutrient_masses_g, calories, cost
+
+    def scaled_genome(self, meal_index: int, genome: 'optimisation.Genome') -> 'optimisation.Genome':
+        """Returns the genome with its quantities scaled to the meal's calorie target, as it is scored.
+        The genome is returned unscaled if the meal has no calorie target, or the genome has no calories.
+        """
+        if self._meal_calorie_targets[meal_index] is None:
+            return genome
+        calories = (self.recipe_arrays.calories_per_g[genome.recipe_ids] * genome.quantities_g).sum()
+        k = float(self._get_scale_factors(meal_index, numpy.array([calories]))[0])
+        if not numpy.isfinite(k):
+            return genome
+        return optimisation.Genome(recipe_ids=genome.recipe_ids.copy(), quantities_g=genome.quantities_g * k)
+
+    def _get_scale_factors(self, meal_index: int, calories: 'numpy.ndarray') -> 'numpy.ndarray':
+        """Returns the factor scaling each member's calories to the meal's calorie target."""
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return self._meal_calorie_targets[meal_index] / calories
+
+    def get_context(self, meal_index: int, representatives: List['optimisation.Genome']) -> 'MealTotals':
+        """Returns the combined totals of every meal's representative except the meal's own."""
+        context = MealTotals(nutrient_masses_g=numpy.zeros(len(self.nutrient_names)), calories=0, cost=0)
+        for other_index, genome in enumerate(representatives):
+            if other_index == meal_index:
+                continue
+            nutrient_masses_g, calories, cost = self.meal_totals(other_index, genome.recipe_ids, genome.quantities_g)
+            context['nutrient_masses_g'] = context['nutrient_masses_g'] + nutrient_masses_g[0]
+            context['calories'] += float(calories[0])
+            context['cost'] += float(cost[0])
+        return context
+
+    def score(self, meal_index: int, recipe_ids: 'numpy.ndarray', quantities_g: 'numpy.ndarray',
+              context: 'MealTotals') -> 'numpy.ndarray':
+        """Returns the fitness of each member of the meal's sub-population, alongside the context."""
+        nutrient_masses_g, calories, cost = self.meal_totals(meal_index, recipe_ids, quantities_g)
+        day_masses_g = nutrient_masses_g + context['nutrient_masses_g']
+
+        components = [_goal_components(nutrient_masses_g, self._meal_goals[meal_index]),
+                      _goal_components(day_masses_g, self._day_goals)]
+        if self._day_calorie_target is not None:
+            components.append(_goal_components(
+                (calories + context['calories'])[:, None], numpy.array([self._day_calorie_target])))
+        components = numpy.hstack(components)
+        fitness = components.min(axis=1) if components.shape[1] else numpy.ones(len(cost))
+        # A member with no calories cannot be scaled to its calorie target;
+        fitness[numpy.isnan(fitness)] = 0
+
+        # Write off any members which are too expensive, for the meal or for the day;
+        if self._meal_max_costs[meal_index] is not None:
+            fitness[cost > self._meal_max_costs[meal_index]] = 0
+        if self._day_max_cost is not None:
+            fitness[cost + context['cost'] > self._day_max_cost] = 0
+        return fitness
+
+    def score_plan(self, representatives: List['optimisation.Genome']) -> float:
+        """Returns the fitness of the day plan made up of one genome per meal."""
+        return float(self.score(0, representatives[0].recipe_ids, representatives[0].quantities_g,
+                                self.get_context(0, representatives))[0])
+
+
+def _goal_components(masses_g: 'numpy.ndarray', goals_g: 'numpy.ndarray') -> 'numpy.ndarray':
+    """Returns 1 - relative error, floored at zero, for each column with a goal."""
+    has_goal = ~numpy.isnan(goals_g)
+    return numpy.maximum(1 - numpy.abs(masses_g[:, has_goal] - goals_g[has_goal]) / goals_g[has_goal], 0)
+
+
+# Per-process state, populated by _init_worker so the precalc data is loaded once per worker;
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(path_into_db: str, day_goals_data: 'goals.DayGoalsData', ga_configs: Dict) -> None:
+    """Loads the recipe arrays and builds the day plan engine and candidate pools for this worker process."""
+    persistence.configs.PATH_INTO_DB = path_into_db
+    recipe_arrays = optimisation.load_recipe_arrays()
+    _worker['ga_configs'] = ga_configs
+    _worker['recipe_arrays'] = recipe_arrays
+    _worker['engine'] = DayPlanEngine(recipe_arrays, day_goals_data)
+    _worker['candidate_recipe_ids'] = get_meal_candidate_recipe_ids(day_goals_data, recipe_arrays)
+
+
+def get_meal_candidate_recipe_ids(day_goals_data: 'goals.DayGoalsData',
+                                  recipe_arrays: 'optimisation.RecipeArrays') -> List[List['numpy.ndarray']]:
+    """Returns, for each meal, the recipe ids which could fill each of its slots."""
+    candidate_pools = optimisation.CandidatePools(recipe_arrays)
+    return [
+        candidate_pools.get_pools(
+            tags=meal_goals_data['tags'],
+            flags=get_meal_flags(day_goals_data, meal_name),
+            serve_time=get_meal_time(meal_goals_data)
+        ) for meal_name, meal_goals_data in day_goals_data['meal_goals'].items()
+    ]
+
+
+def _evolve_meal(meal_index: int, state: Optional['MealState'], context: 'MealTotals', num_generations: int,
+                 rng: Optional['numpy.random.Generator'] = None) -> Tuple['MealState', float]:
+    """Evolves the meal's sub-population against the context, creating it first if no state is given.
+    Returns the new state, with its members ordered fittest first, and the fitness of the fittest member.
+    """
+    engine: 'DayPlanEngine' = _worker['engine']
+    recipe_arrays = _worker['recipe_arrays']
+    candidate_recipe_ids = _worker['candidate_recipe_ids'][meal_index]
+    if state is not None:
+        rng = state['rng']
+
+    # The context changes between calls, so fitnesses are only cached within a call;
+    fitness_cache = optimisation.FitnessCache(calculate_fitness=lambda *genomes: engine.score(
+        meal_index,
+        numpy.stack([genome.recipe_ids for genome in genomes]),
+        numpy.stack([genome.quantities_g for genome in genomes]),
+        context
+    ).tolist())
+    pop = optimisation.Population(
+        create_random_member=lambda: optimisation.create_random_genome(candidate_recipe_ids, recipe_arrays, rng),
+        calculate_fitness=fitness_cache.calculate_fitness,
+        max_size=_worker['ga_configs']['max_population_size'],
+        rng=rng,
+        generation=1 if state is None else state['generation']
+    )
+    if state is None:
+        pop.populate_with_random_members()
+    else:
+        pop.extend([optimisation.Genome(recipe_ids=recipe_ids, quantities_g=quantities_g)
+                    for recipe_ids, quantities_g in zip(state['recipe_ids'], state['quantities_g'])])
+
+    for _ in range(num_generations):
+        optimisation.main.run_genome_generation(
+            population=pop,
+            ga_configs=_worker['ga_configs'],
+            recipe_arrays=recipe_arrays,
+            candidate_recipe_ids=candidate_recipe_ids,
+            rng=rng
+        )
+
+    order = numpy.argsort(pop.fitnesses)[::-1]
+    members = pop.members
+    return MealState(
+        recipe_ids=numpy.stack([members[i].recipe_ids for i in order]),
+        quantities_g=numpy.stack([members[i].quantities_g for i in order]),
+        generation=pop.generation,
+        rng=rng
+    ), float(pop.fitnesses[order[0]])
+
+
+def run_day_plan(
+        day_goals_data: 'goals.DayGoalsData',
+        ga_configs=configs.ga_configs,
+        day_plan_configs=configs.day_plan_configs,
+        history_filepath=configs.history_path,
+        seed: Optional[int] = None,
+        num_workers: Optional[int] = None
+) -> Dict[str, 'model.meals.SettableMeal']:
+    """Optimises every meal in the day goals together, and returns the fittest plan found, by meal name.
+    Each meal has its own sub-population, evolved in a worker process against the current fittest members
+    of the other meals, so the day goals are scored on the combined plan. After every epoch the fittest
+    members become the new representatives of their meals, and the best combined plan is kept.
+    """
+    meal_names = list(day_goals_data['meal_goals'].keys())
+    recipe_arrays = optimisation.load_recipe_arrays()
+    engine = DayPlanEngine(recipe_arrays, day_goals_data)
+    candidate_recipe_ids = get_meal_candidate_recipe_ids(day_goals_data, recipe_arrays)
+    for meal_name, candidates in zip(meal_names, candidate_recipe_ids):
+        if any(len(slot_candidates) == 0 for slot_candidates in candidates):
+            raise ValueError(f"No recipes meet the tags, flags and time of meal '{meal_name}'.")
+
+    # Start each meal with a random representative;
+    seed_sequences = numpy.random.SeedSequence(seed).spawn(len(meal_names) + 1)
+    rngs = [numpy.random.default_rng(s) for s in seed_sequences[1:]]
+    coordinator_rng = numpy.random.default_rng(seed_sequences[0])
+    representatives = [optimisation.create_random_genome(candidates, recipe_arrays, coordinator_rng)
+                       for candidates in candidate_recipe_ids]
+    best_plan, best_fitness = list(representatives), engine.score_plan(representatives)
+    states: List[Optional['MealState']] = [None] * len(meal_names)
+    hist = optimisation.History(history_filepath=history_filepath)
+
+    logging.info(f"--- Day Plan Optimisation Run Starting ({len(meal_names)} meals) ---")
+    with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_worker,
+            initargs=(persistence.configs.PATH_INTO_DB, day_goals_data, ga_configs)
+    ) as executor:
+        generation = 1
+        while generation < ga_configs['max_generations']:
+            num_generations = min(day_plan_configs['epoch_generations'], ga_configs['max_generations'] - generation)
+            futures = [executor.submit(
+                _evolve_meal, i, states[i], engine.get_context(i, representatives), num_generations, rngs[i]
+            ) for i in range(len(meal_names))]
+            states = [future.result()[0] for future in futures]
+            generation += num_generations
+
+            # Each meal's fittest member becomes its representative, and the combined plan is scored;
+            representatives = [optimisation.Genome(recipe_ids=state['recipe_ids'][0].copy(),
+                                                   quantities_g=state['quantities_g'][0].copy())
+                               for state in states]
+            plan_fitness = engine.score_plan(representatives)
+            if plan_fitness > best_fitness:
+                logging.info(f"-> New best day plan: {plan_fitness} <-")
+                best_plan, best_fitness = list(representatives), plan_fitness
+            hist.record_solution(generation, create_day_plan_data(best_fitness, best_plan, meal_names, engine))
+    logging.info("Finished optimisation.")
+
+    return {meal_name: optimisation.genome_to_meal(engine.scaled_genome(meal_index, genome), recipe_arrays)
+            for meal_index, (meal_name, genome) in enumerate(zip(meal_names, best_plan))}
+
+
+def create_day_plan_data(fitness: float, plan: List['optimisation.Genome'], meal_names: List[str],
+                         engine: 'DayPlanEngine') -> Dict[str, Any]:
+    """Returns the data recorded in the history for a day plan, with each meal's quantities scaled to its
+    calorie target, as they were scored."""
+    data = {'fitness': fitness, 'cost': 0, 'meals': {}}
+    for meal_index, (meal_name, genome) in enumerate(zip(meal_names, plan)):
+        genome = engine.scaled_genome(meal_index, genome)
+        _, _, cost = engine.meal_totals(meal_index, genome.recipe_ids, genome.quantities_g)
+        data['cost'] += float(cost[0])
+        data['meals'][meal_name] = optimisation.genome_to_meal(genome, engine.recipe_arrays).persistable_data
+    return data
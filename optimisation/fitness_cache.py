@@ -0,0 +1,73 @@
+"""Memoisation of member fitness scores, so unchanged members are not re-scored."""
+from typing import Callable, Dict, Hashable, List, Optional
+
+import model
+
+
+class FitnessCache:
+    """Wraps a calculate_fitness function, caching scores against each member's genome key."""
+
+    def __init__(
+            self,
+            calculate_fitness: Callable[..., List[float]],
+            max_size: Optional[int] = None
+    ):
+        self._calculate_fitness = calculate_fitness
+        self._max_size = max_size
+        self._fitnesses: Dict[Hashable, float] = {}
+        self._hits: int = 0
+        self._misses: int = 0
+
+    def __len__(self):
+        return len(self._fitnesses)
+
+    @property
+    def hits(self) -> int:
+        """Returns the number of scores served from the cache."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Returns the number of scores which had to be calculated."""
+        return self._misses
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups served from the cache."""
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups > 0 else 0
+
+    def calculate_fitness(self, *members: 'model.meals.SettableMeal') -> List[float]:
+        """Returns the fitness of each member, only calculating scores for genomes not seen before."""
+        keys = [member.genome_key for member in members]
+
+        # Collect the hits, and score any misses together in a single call;
+        fitnesses = {}
+        missed = {}
+        for key, member in zip(keys, members):
+            if key in self._fitnesses:
+                fitnesses[key] = self._fitnesses[key]
+            elif key not in missed:
+                missed[key] = member
+        if len(missed) > 0:
+            fitnesses.update(zip(missed.keys(), self._calculate_fitness(*missed.values())))
+            for key in missed.keys():
+                self._fitnesses[key] = fitnesses[key]
+            self._evict()
+
+        self._misses += len(missed)
+        self._hits += len(keys) - len(missed)
+        return [fitnesses[key] for key in keys]
+
+    def clear(self) -> None:
+        """Empties the cache and resets the counters."""
+        self._fitnesses = {}
+        self._hits = 0
+        self._misses = 0
+
+    def _evict(self) -> None:
+        """Drops the oldest entries until the cache is back within its maximum size."""
+        if self._max_size is None:
+            return
+        while len(self._fitnesses) > self._max_size:
+            del self._fitnesses[next(iter(self._fitnesses))]
@@ -0,0 +1,216 @@
+"""Vectorised fitness evaluation, operating on the recipe precalc data loaded into arrays."""
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy
+
+import model
+import optimisation
+import persistence
+from optimisation import configs
+
+
+class RecipeArrays:
+    """Holds the recipe precalc data as column arrays, with each recipe identified by an integer id (its row)."""
+
+    def __init__(
+            self,
+            df_names: List[str],
+            nutrient_names: List[str],
+            nutrient_ratios: 'numpy.ndarray',
+            calories_per_g: 'numpy.ndarray',
+            cost_per_g: 'numpy.ndarray',
+            typical_serving_size_g: 'numpy.ndarray'
+    ):
+        self.df_names: List[str] = df_names
+        self.nutrient_names: List[str] = nutrient_names
+        self.nutrient_ratios: 'numpy.ndarray' = nutrient_ratios
+        self.calories_per_g: 'numpy.ndarray' = calories_per_g
+        self.cost_per_g: 'numpy.ndarray' = cost_per_g
+        self.typical_serving_size_g: 'numpy.ndarray' = typical_serving_size_g
+
+        # Build the lookups from names to rows/columns;
+        self.recipe_ids: Dict[str, int] = {df_name: i for i, df_name in enumerate(df_names)}
+        self.nutrient_columns: Dict[str, int] = {nutr_name: i for i, nutr_name in enumerate(nutrient_names)}
+
+    def __len__(self):
+        return len(self.df_names)
+
+    @classmethod
+    def from_precalc_data(cls, precalc_data: Dict[str, Dict[str, Any]]) -> 'RecipeArrays':
+        """Builds the arrays from a dict of recipe precalc data, keyed by recipe datafile name."""
+        df_names = list(precalc_data.keys())
+
+        # Collect every nutrient which appears on any recipe;
+        nutrient_names = set()
+        for recipe_data in precalc_data.values():
+            nutrient_names.update(recipe_data['nutrient_ratios_data'].keys())
+        nutrient_names = sorted(nutrient_names)
+        nutrient_columns = {nutr_name: i for i, nutr_name in enumerate(nutrient_names)}
+
+        # Fill the columns, leaving any nutrients missing from a recipe at zero;
+        nutrient_ratios = numpy.zeros((len(df_names), len(nutrient_names)))
+        calories_per_g = numpy.zeros(len(df_names))
+        cost_per_g = numpy.zeros(len(df_names))
+        typical_serving_size_g = numpy.zeros(len(df_names))
+        for i, df_name in enumerate(df_names):
+            recipe_data = precalc_data[df_name]
+            for nutr_name, nutr_ratio_data in recipe_data['nutrient_ratios_data'].items():
+                nutrient_ratios[i, nutrient_columns[nutr_name]] = model.quantity.get_ratio_from_qty_ratio_data(
+                    nutr_ratio_data)
+            calories_per_g[i] = recipe_data['calories_per_g']
+            cost_per_g[i] = recipe_data['cost_per_qty_data']['cost_per_g']
+            typical_serving_size_g[i] = recipe_data['typical_serving_size_g']
+
+        return cls(
+            df_names=df_names,
+            nutrient_names=nutrient_names,
+            nutrient_ratios=nutrient_ratios,
+            calories_per_g=calories_per_g,
+            cost_per_g=cost_per_g,
+            typical_serving_size_g=typical_serving_size_g
+        )
+
+    @classmethod
+    def from_precalc_store(cls, store: 'persistence.PrecalcStore') -> 'RecipeArrays':
+        """Builds the arrays over the columns of a binary precalc store, which are used in place, without copying."""
+        return cls(
+            df_names=store.df_names,
+            nutrient_names=store.nutrient_names,
+            nutrient_ratios=store.nutrient_ratios,
+            calories_per_g=store.calories_per_g,
+            cost_per_g=store.cost_per_g,
+            typical_serving_size_g=store.typical_serving_size_g
+        )
+
+
+class FitnessEngine:
+    """Scores whole populations in a single batched call, giving the same results as fitness_function.
+
+    Members are described by a (members x recipe-slots) array of integer recipe ids, and a matching array
+    of quantities in grams.
+    """
+
+    def __init__(
+            self,
+            recipe_arrays: 'RecipeArrays',
+            target_nutrient_ratios: Dict[str, float],
+            target_total_calories: float,
+            target_max_cost: float
+    ):
+        self.recipe_arrays = recipe_arrays
+        self.target_total_calories = target_total_calories
+        self.target_max_cost = target_max_cost
+
+        # Pick out the columns for the target nutrients, treating any nutrient no recipe defines as zero;
+        num_recipes = len(recipe_arrays)
+        self.target_nutrient_names: List[str] = []
+        target_ratios = []
+        target_columns = []
+        for nutr_name, target_ratio in target_nutrient_ratios.items():
+            nutr_name = model.nutrients.get_nutrient_primary_name(nutr_name)
+            self.target_nutrient_names.append(nutr_name)
+            target_ratios.append(target_ratio)
+            if nutr_name in recipe_arrays.nutrient_columns:
+                target_columns.append(recipe_arrays.nutrient_ratios[:, recipe_arrays.nutrient_columns[nutr_name]])
+            else:
+                target_columns.append(numpy.zeros(num_recipes))
+        self._target_ratios = numpy.array(target_ratios, dtype=float)
+        self._nutrient_ratios = numpy.stack(target_columns, axis=1) if target_columns \
+            else numpy.zeros((num_recipes, 0))
+
+    @property
+    def target_ratios(self) -> 'numpy.ndarray':
+        """Returns the target ratio of each target nutrient."""
+        return self._target_ratios
+
+    @property
+    def recipe_nutrient_ratios(self) -> 'numpy.ndarray':
+        """Returns a (recipes x target nutrients) array of the ratio of each target nutrient in each recipe."""
+        return self._nutrient_ratios
+
+    def nutrient_ratios(self, recipe_ids: 'numpy.ndarray', quantities: 'numpy.ndarray') -> 'numpy.ndarray':
+        """Returns a (members x target nutrients) array of the nutrient ratios of each member."""
+        recipe_ids, quantities = _as_2d(recipe_ids, quantities)
+        nutrient_masses = numpy.einsum('ms,msn->mn', quantities, self._nutrient_ratios[recipe_ids])
+        return nutrient_masses / quantities.sum(axis=1)[:, None]
+
+    def total_calories(self, recipe_ids: 'numpy.ndarray', quantities: 'numpy.ndarray') -> 'numpy.ndarray':
+        """Returns the total calories in each member."""
+        recipe_ids, quantities = _as_2d(recipe_ids, quantities)
+        return (self.recipe_arrays.calories_per_g[recipe_ids] * quantities).sum(axis=1)
+
+    def total_cost(self, recipe_ids: 'numpy.ndarray', quantities: 'numpy.ndarray') -> 'numpy.ndarray':
+        """Returns the total cost of each member."""
+        recipe_ids, quantities = _as_2d(recipe_ids, quantities)
+        return (self.recipe_arrays.cost_per_g[recipe_ids] * quantities).sum(axis=1)
+
+    def score(self, recipe_ids: 'numpy.ndarray', quantities: 'numpy.ndarray') -> 'numpy.ndarray':
+        """Returns the fitness of each member."""
+        recipe_ids, quantities = _as_2d(recipe_ids, quantities)
+
+        # Members with no quantity or no calories divide by zero here, and are written off below;
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            # Calculate the fitness based on the worst nutrient;
+            deltas = 1 - numpy.abs(self.nutrient_ratios(recipe_ids, quantities) - self._target_ratios)
+            fitness = deltas.min(axis=1)
+
+            # Write off any solutions which are too expensive, once scaled to meet the target calories;
+            k = self.target_total_calories / self.total_calories(recipe_ids, quantities)
+            meal_cost = self.total_cost(recipe_ids, quantities) * k
+        fitness[meal_cost > self.target_max_cost] = 0
+        # Members with no calories can't be scaled to the target, so have no cost to compare;
+        fitness[~numpy.isfinite(meal_cost)] = 0
+
+        return fitness
+
+    def encode_members(self, *members: 'model.meals.SettableMeal') -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+        """Converts the members into recipe id and quantity arrays."""
+        recipe_ids = []
+        quantities = []
+        for member in members:
+            rqd = member.recipe_quantities_data
+            recipe_ids.append([self.recipe_arrays.recipe_ids[df_name] for df_name in rqd.keys()])
+            quantities.append([qty_data['quantity_in_g'] for qty_data in rqd.values()])
+        if len(set(len(ids) for ids in recipe_ids)) > 1:
+            raise ValueError("Members must all have the same number of recipes to be scored together.")
+        return numpy.array(recipe_ids, dtype=numpy.intp), numpy.array(quantities, dtype=float)
+
+    def calculate_fitness(self, *members: 'model.meals.SettableMeal') -> List[float]:
+        """Drop in replacement for optimisation.calculate_fitness, scoring the members in one batch."""
+        return self.score(*self.encode_members(*members)).tolist()
+
+    def calculate_genome_fitness(self, *genomes: 'optimisation.Genome') -> List[float]:
+        """Returns the fitness of each genome, scoring them in one batch."""
+        return self.score(
+            numpy.stack([genome.recipe_ids for genome in genomes]),
+            numpy.stack([genome.quantities_g for genome in genomes])
+        ).tolist()
+
+
+def _as_2d(recipe_ids: 'numpy.ndarray', quantities: 'numpy.ndarray') -> Tuple['numpy.ndarray', 'numpy.ndarray']:
+    """Promotes single members to a population of one."""
+    return numpy.atleast_2d(recipe_ids), numpy.atleast_2d(numpy.asarray(quantities, dtype=float))
+
+
+def load_recipe_arrays() -> 'RecipeArrays':
+    """Returns arrays over the database's recipe precalc data, from its binary precalc store if it has one,
+    and otherwise from its json precalc data."""
+    store = persistence.get_precalc_store()
+    if store is not None:
+        return RecipeArrays.from_precalc_store(store)
+    return RecipeArrays.from_precalc_data(persistence.get_precalc_data_for_recipes())
+
+
+def build_fitness_engine(
+        goals: Dict[str, Any] = configs.goals,
+        recipe_arrays: Optional['RecipeArrays'] = None
+) -> 'FitnessEngine':
+    """Builds a fitness engine for the goals, loading the recipe precalc data if arrays are not provided."""
+    if recipe_arrays is None:
+        recipe_arrays = load_recipe_arrays()
+    return FitnessEngine(
+        recipe_arrays=recipe_arrays,
+        target_nutrient_ratios=goals['target_nutrient_ratios'],
+        target_total_calories=goals['total_calories'],
+        target_max_cost=goals['max_cost']
+    )
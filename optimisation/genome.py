@@ -0,0 +1,172 @@
+"""Compact, array backed population members, and the GA operators which act on them."""
+from typing import Dict, List, Optional, Tuple
+
+import numpy
+
+import model
+import persistence
+import optimisation
+
+
+class Genome:
+    """Models a population member as one integer recipe id and one quantity in grams per recipe slot.
+    Notes:
+        Slots are positional; when created by create_random_genome, slot n holds a recipe for the nth tag.
+        Genomes are converted to SettableMeal instances only where the model is needed (logging and results).
+    """
+
+    __slots__ = ('recipe_ids', 'quantities_g', '_genome_key')
+
+    def __init__(self, recipe_ids: 'numpy.ndarray', quantities_g: 'numpy.ndarray'):
+        self.recipe_ids: 'numpy.ndarray' = numpy.asarray(recipe_ids, dtype=numpy.intp)
+        self.quantities_g: 'numpy.ndarray' = numpy.asarray(quantities_g, dtype=float)
+        self._genome_key: Optional[Tuple[bytes, bytes]] = None
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    @property
+    def genome_key(self) -> Tuple[bytes, bytes]:
+        """Returns a hashable key which is identical for any two genomes with the same slots."""
+        if self._genome_key is None:
+            self._genome_key = (self.recipe_ids.tobytes(), self.quantities_g.tobytes())
+        return self._genome_key
+
+    def set_quantity(self, slot: int, quantity_g: float) -> None:
+        """Sets the quantity of the recipe in the slot, invalidating the genome key."""
+        self.quantities_g[slot] = quantity_g
+        self._genome_key = None
+
+    def set_recipe(self, slot: int, recipe_id: int, quantity_g: float) -> None:
+        """Replaces the recipe in the slot, invalidating the genome key."""
+        self.recipe_ids[slot] = recipe_id
+        self.quantities_g[slot] = quantity_g
+        self._genome_key = None
+
+
+def genome_to_meal(genome: 'Genome', recipe_arrays: 'optimisation.RecipeArrays') -> 'model.meals.SettableMeal':
+    """Converts the genome into a SettableMeal instance."""
+    meal_data: 'model.meals.MealData' = {}
+    for recipe_id, qty in zip(genome.recipe_ids, genome.quantities_g):
+        df_name = recipe_arrays.df_names[recipe_id]
+        # The same recipe could fill two slots, in which case the meal holds the combined quantity;
+        if df_name in meal_data:
+            meal_data[df_name]['quantity_in_g'] += float(qty)
+        else:
+            meal_data[df_name] = model.quantity.QuantityData(quantity_in_g=float(qty), pref_unit='g')
+    return model.meals.SettableMeal(meal_data=meal_data)
+
+
+def meal_to_genome(meal: 'model.meals.SettableMeal', recipe_arrays: 'optimisation.RecipeArrays') -> 'Genome':
+    """Converts the SettableMeal instance into a genome, with one slot per recipe."""
+    rqd = meal.recipe_quantities_data
+    return Genome(
+        recipe_ids=[recipe_arrays.recipe_ids[df_name] for df_name in rqd.keys()],
+        quantities_g=[qty_data['quantity_in_g'] for qty_data in rqd.values()]
+    )
+
+
+def get_candidate_recipe_ids(
+        tags: List[str],
+        flags: Dict[str, bool],
+        recipe_arrays: 'optimisation.RecipeArrays',
+        serve_time: Optional[str] = None
+) -> List['numpy.ndarray']:
+    """Returns an array of the recipe ids which could fill each slot, one slot per tag."""
+    return optimisation.CandidatePools(recipe_arrays).get_pools(tags, flags, serve_time)
+
+
+def create_random_genome(
+        candidate_recipe_ids: List['numpy.ndarray'],
+        recipe_arrays: 'optimisation.RecipeArrays',
+        rng: 'numpy.random.Generator'
+) -> 'Genome':
+    """Creates a random genome, drawing each slot from its candidates at its typical serving size."""
+    recipe_ids = numpy.array([rng.choice(candidates) for candidates in candidate_recipe_ids], dtype=numpy.intp)
+    return Genome(recipe_ids=recipe_ids, quantities_g=recipe_arrays.typical_serving_size_g[recipe_ids])
+
+
+def splice_genomes(genome_1: 'Genome', genome_2: 'Genome', rng: 'numpy.random.Generator') -> 'Genome':
+    """Combines two genomes to form a child, taking each slot from either parent at random."""
+    from_first = rng.random(len(genome_1)) < 0.5
+    return Genome(
+        recipe_ids=numpy.where(from_first, genome_1.recipe_ids, genome_2.recipe_ids),
+        quantities_g=numpy.where(from_first, genome_1.quantities_g, genome_2.quantities_g)
+    )
+
+
+def mutate_genome(
+        genome: 'Genome',
+        recipe_arrays: 'optimisation.RecipeArrays',
+        rng: 'numpy.random.Generator'
+) -> None:
+    """Mutates the genome, setting a random slot to a quantity between 0.5 and 1.5 typical servings."""
+    slot = rng.integers(len(genome))
+    typical_serving_size_g = recipe_arrays.typical_serving_size_g[genome.recipe_ids[slot]]
+    genome.set_quantity(slot, rng.uniform(typical_serving_size_g / 2, typical_serving_size_g * 1.5))
+
+
+def choose_cull_losers(fitnesses: 'numpy.ndarray', num_to_cull: int, rng: 'numpy.random.Generator') -> 'numpy.ndarray':
+    """Returns the indices of the members to cull, chosen by pairwise tournaments in as few rounds as possible.
+    Each round shuffles the survivors into disjoint pairs, and the less fit member of each pair loses.
+    """
+    survivors = numpy.arange(len(fitnesses))
+    losers = []
+    while num_to_cull > 0:
+        num_pairs = min(len(survivors) // 2, num_to_cull)
+        pairs = rng.permutation(survivors)[:num_pairs * 2].reshape(num_pairs, 2)
+        # Match the scalar cull, where the second member loses ties;
+        round_losers = numpy.where(fitnesses[pairs[:, 0]] < fitnesses[pairs[:, 1]], pairs[:, 0], pairs[:, 1])
+        losers.append(round_losers)
+        survivors = numpy.setdiff1d(survivors, round_losers, assume_unique=True)
+        num_to_cull -= num_pairs
+    return numpy.concatenate(losers) if losers else numpy.zeros(0, dtype=numpy.intp)
+
+
+def breed_genomes(
+        parent_recipe_ids: 'numpy.ndarray',
+        parent_quantities_g: 'numpy.ndarray',
+        num_children: int,
+        candidate_recipe_ids: List['numpy.ndarray'],
+        recipe_arrays: 'optimisation.RecipeArrays',
+        mutation_prob: float,
+        random_solution_prob: float,
+        rng: 'numpy.random.Generator'
+) -> List['Genome']:
+    """Creates a batch of new genomes from the parents, one generation's worth at a time.
+    Each new genome is random with probability random_solution_prob (percent), and is otherwise spliced from
+    two distinct parents, then mutated with probability mutation_prob (percent).
+    """
+    num_parents, num_slots = parent_recipe_ids.shape
+    recipe_ids = numpy.empty((num_children, num_slots), dtype=numpy.intp)
+    quantities_g = numpy.empty((num_children, num_slots))
+
+    # Decide which children are random, and which are spliced;
+    is_random = rng.random(num_children) * 100 < random_solution_prob
+    num_random = int(is_random.sum())
+    num_spliced = num_children - num_random
+
+    # Draw the random children, slot by slot, at their typical serving sizes;
+    for slot, candidates in enumerate(candidate_recipe_ids):
+        recipe_ids[is_random, slot] = candidates[rng.integers(len(candidates), size=num_random)]
+    quantities_g[is_random] = recipe_arrays.typical_serving_size_g[recipe_ids[is_random]]
+
+    # Splice the rest from pairs of distinct parents, taking each slot from either parent at random;
+    if num_spliced:
+        p1 = rng.integers(num_parents, size=num_spliced)
+        p2 = rng.integers(num_parents - 1, size=num_spliced)
+        p2 += p2 >= p1
+        from_first = rng.random((num_spliced, num_slots)) < 0.5
+        spliced_ids = numpy.where(from_first, parent_recipe_ids[p1], parent_recipe_ids[p2])
+        spliced_qts = numpy.where(from_first, parent_quantities_g[p1], parent_quantities_g[p2])
+
+        # Mutate some of the spliced children, setting a random slot to 0.5-1.5 typical servings;
+        mutants = numpy.flatnonzero(rng.random(num_spliced) * 100 < mutation_prob)
+        slots = rng.integers(num_slots, size=len(mutants))
+        typical_serving_size_g = recipe_arrays.typical_serving_size_g[spliced_ids[mutants, slots]]
+        spliced_qts[mutants, slots] = rng.uniform(typical_serving_size_g / 2, typical_serving_size_g * 1.5)
+
+        recipe_ids[~is_random] = spliced_ids
+        quantities_g[~is_random] = spliced_qts
+
+    return [Genome(recipe_ids=ids, quantities_g=qts) for ids, qts in zip(recipe_ids, quantities_g)]
@@ -1,20 +1,93 @@
 """Implements functionality associated with saving historical solutions."""
 import json
-from typing import List, Tuple
+import os
+from typing import List, Tuple, Optional
 
 import model
 from optimisation import configs
 
 
+def create_solution_data(
+        fitness: float,
+        meal: 'model.meals.SettableMeal',
+        total_calories: float = configs.goals['total_calories']
+) -> 'model.meals.MealData':
+    """Returns the data recorded in the history for a solution, with quantities scaled to the target calories."""
+    # Calculate the cals scale factor;
+    k = total_calories / meal.num_calories
+    data = {
+        'nutrient_ratios': {},
+        'fitness': fitness,
+        'cost': meal.pricetag * k,
+        'ingredient_quantities': {}
+    }
+    for nutr_name, nutr_ratio_data in meal.nutrient_ratios_data.items():
+        data['nutrient_ratios'][nutr_name] = model.quantity.get_ratio_from_qty_ratio_data(nutr_ratio_data)
+    for idf_name, iq in meal.ingredient_quantities_data.items():
+        data['ingredient_quantities'][model.ingredients.get_ingredient_name_from_df_name(idf_name)] = \
+            iq['quantity_in_g'] * k
+    data.update(meal.persistable_data)
+    return data
+
+
 class History:
-    """Implements functionality to record the evolution history."""
+    """Implements functionality to record the evolution history.
+    Notes:
+        The history is a JSON Lines file, with one [gen, solution_data] record appended per call to
+        record_solution, so recording is O(1) in the number of generations.
+    """
 
-    def __init__(self, history_filepath: str = configs.history_path):
+    def __init__(self, history_filepath: str = configs.history_path,
+                 fsync_every: Optional[int] = configs.history_fsync_every):
+        """
+        Args:
+            history_filepath: Path to the history file, which is emptied when the history is created.
+            fsync_every: Number of records between each fsync, so records survive a crash. Records are only
+                flushed to the OS if not provided.
+        """
         self.history_filepath: str = history_filepath
-        self._historical_solution_data: List[Tuple[int, 'model.meals.MealData']] = []
+        self.fsync_every: Optional[int] = fsync_every
+        self._num_records: int = 0
+        open(self.history_filepath, 'w').close()
 
     def record_solution(self, gen: int, solution_data: 'model.meals.MealData'):
         """Records the solution provided."""
-        self._historical_solution_data.append((gen, solution_data))
-        with open(self.history_filepath, 'w') as fh:
-            json.dump(self._historical_solution_data, fh, indent=2)
+        with open(self.history_filepath, 'a') as fh:
+            fh.write(json.dumps([gen, solution_data]) + '\n')
+            self._num_records += 1
+            if self.fsync_every is not None and self._num_records % self.fsync_every == 0:
+                fh.flush()
+                os.fsync(fh.fileno())
+
+
+class HistoryReader:
+    """Reads the records from a history file incrementally, picking up from where the last read stopped."""
+
+    def __init__(self, history_filepath: str = configs.history_path):
+        self.history_filepath: str = history_filepath
+        self.offset: int = 0
+        self.restarted: bool = False
+
+    def read_new(self) -> List[Tuple[int, 'model.meals.MealData']]:
+        """Returns the records added since the last read.
+        A partly written last line is left for the next read. If the history file has been restarted since
+        the last read, reading starts again from the beginning, and restarted is set.
+        """
+        self.restarted = False
+        if not os.path.exists(self.history_filepath):
+            return []
+        with open(self.history_filepath, 'rb') as fh:
+            # Start again if the history has been restarted since the last read;
+            if os.fstat(fh.fileno()).st_size < self.offset:
+                self.offset = 0
+                self.restarted = True
+            fh.seek(self.offset)
+            raw_data = fh.read()
+        complete_data = raw_data[:raw_data.rfind(b'\n') + 1]
+        self.offset += len(complete_data)
+        return [tuple(json.loads(line)) for line in complete_data.splitlines() if line.strip()]
+
+
+def read_history(history_filepath: str = configs.history_path) -> List[Tuple[int, 'model.meals.MealData']]:
+    """Returns every complete record in the history file."""
+    return HistoryReader(history_filepath).read_new()
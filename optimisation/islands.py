@@ -0,0 +1,189 @@
+"""Island model GA: independent populations evolved in a process pool, exchanging their best members."""
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, TypedDict, Tuple
+
+import numpy
+
+import model
+import optimisation
+import persistence
+from optimisation import configs
+
+TOPOLOGIES = ['ring', 'full']
+
+
+class IslandState(TypedDict):
+    """Picklable snapshot of an island, passed between the coordinating process and the workers."""
+    recipe_ids: 'numpy.ndarray'
+    quantities_g: 'numpy.ndarray'
+    fitnesses: 'numpy.ndarray'
+    generation: int
+    rng: 'numpy.random.Generator'
+
+
+# Per-process state, populated by _init_worker so the precalc data is loaded once per worker;
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(path_into_db: str, ga_configs: Dict, constraints: Dict, goals: Dict) -> None:
+    """Loads the recipe arrays and builds the fitness machinery for this worker process."""
+    persistence.configs.PATH_INTO_DB = path_into_db
+    recipe_arrays = optimisation.load_recipe_arrays()
+    engine = optimisation.build_fitness_engine(goals=goals, recipe_arrays=recipe_arrays)
+    _worker['ga_configs'] = ga_configs
+    _worker['recipe_arrays'] = recipe_arrays
+    _worker['fitness_cache'] = optimisation.FitnessCache(calculate_fitness=engine.calculate_genome_fitness)
+    _worker['candidate_recipe_ids'] = optimisation.get_candidate_recipe_ids(
+        tags=constraints['tags'],
+        flags=constraints['flags'],
+        recipe_arrays=recipe_arrays,
+        serve_time=constraints['time']
+    )
+
+
+def _create_island_population(rng: 'numpy.random.Generator', generation: int = 1) -> 'optimisation.Population':
+    """Creates an empty population of genomes, using the worker's state."""
+    recipe_arrays = _worker['recipe_arrays']
+    candidate_recipe_ids = _worker['candidate_recipe_ids']
+    return optimisation.Population(
+        create_random_member=lambda: optimisation.create_random_genome(candidate_recipe_ids, recipe_arrays, rng),
+        calculate_fitness=_worker['fitness_cache'].calculate_fitness,
+        max_size=_worker['ga_configs']['max_population_size'],
+        rng=rng,
+        generation=generation
+    )
+
+
+def _evolve_island(state: Optional['IslandState'], num_generations: int,
+                   rng: Optional['numpy.random.Generator'] = None
+                   ) -> Tuple['IslandState', List[Tuple[int, float, 'numpy.ndarray', 'numpy.ndarray']]]:
+    """Evolves the island for a number of generations, creating it first if no state is given.
+    Returns the new state, and the generation, fitness, recipe ids and quantities of the fittest member at
+    each generation evolved in this call. The records are kept by the coordinating process, so only the
+    population is passed back and forth between epochs.
+    """
+    best_by_generation = []
+    if state is None:
+        pop = _create_island_population(rng)
+        pop.populate_with_random_members()
+    else:
+        rng = state['rng']
+        pop = _create_island_population(rng, state['generation'])
+        for recipe_ids, quantities_g, fitness in zip(state['recipe_ids'], state['quantities_g'], state['fitnesses']):
+            pop.append(optimisation.Genome(recipe_ids=recipe_ids, quantities_g=quantities_g), fitness=fitness)
+
+    for _ in range(num_generations):
+        optimisation.main.run_genome_generation(
+            population=pop,
+            ga_configs=_worker['ga_configs'],
+            recipe_arrays=_worker['recipe_arrays'],
+            candidate_recipe_ids=_worker['candidate_recipe_ids'],
+            rng=rng
+        )
+        best = pop.fittest_member
+        best_by_generation.append(
+            (pop.generation, pop.highest_fitness_score, best.recipe_ids.copy(), best.quantities_g.copy()))
+
+    members = pop.members
+    return IslandState(
+        recipe_ids=numpy.stack([m.recipe_ids for m in members]),
+        quantities_g=numpy.stack([m.quantities_g for m in members]),
+        fitnesses=pop.fitnesses.copy(),
+        generation=pop.generation,
+        rng=rng
+    ), best_by_generation
+
+
+def get_migration_routes(num_islands: int, topology: str) -> List[Tuple[int, int]]:
+    """Returns a list of (source, destination) island pairs for the topology."""
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown island topology '{topology}', expected one of {TOPOLOGIES}.")
+    if num_islands < 2:
+        return []
+    if topology == 'ring':
+        return [(i, (i + 1) % num_islands) for i in range(num_islands)]
+    return [(i, j) for i in range(num_islands) for j in range(num_islands) if i != j]
+
+
+def migrate(states: List['IslandState'], migration_size: int, topology: str) -> None:
+    """Copies the fittest members of each island over the least fit members of its destinations."""
+    # Take the emigrants before anything is overwritten, so every island sends its own best;
+    emigrants = []
+    for state in states:
+        top = numpy.argsort(state['fitnesses'])[::-1][:migration_size]
+        emigrants.append((state['recipe_ids'][top], state['quantities_g'][top], state['fitnesses'][top]))
+
+    for source, destination in get_migration_routes(len(states), topology):
+        recipe_ids, quantities_g, fitnesses = emigrants[source]
+        dest = states[destination]
+        worst = numpy.argsort(dest['fitnesses'])[:len(fitnesses)]
+        dest['recipe_ids'][worst] = recipe_ids
+        dest['quantities_g'][worst] = quantities_g
+        dest['fitnesses'][worst] = fitnesses
+
+
+def run_islands(
+        ga_configs=configs.ga_configs,
+        constraints=configs.constraints,
+        goals=configs.goals,
+        history_filepath=configs.history_path,
+        island_configs=configs.island_configs,
+        seed: Optional[int] = None,
+        num_workers: Optional[int] = None
+) -> 'model.meals.SettableMeal':
+    """Runs the GA as a set of islands in a process pool, and returns the fittest meal found.
+    Each island has its own generator spawned from the seed, so a seeded run is reproducible regardless of the
+    number of workers. The history records the fittest member across all islands at each generation.
+    """
+    num_islands = island_configs['num_islands']
+    migration_interval = island_configs['migration_interval']
+    topology = island_configs['topology']
+    get_migration_routes(num_islands, topology)  # Validate the topology before starting any workers;
+
+    rngs = [numpy.random.default_rng(s) for s in numpy.random.SeedSequence(seed).spawn(num_islands)]
+    states: List[Optional['IslandState']] = [None] * num_islands
+    best_by_generation: List[List[Tuple[int, float, 'numpy.ndarray', 'numpy.ndarray']]] = \
+        [[] for _ in range(num_islands)]
+
+    logging.info(f"--- Island Optimisation Run Starting ({num_islands} islands) ---")
+    with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_worker,
+            initargs=(persistence.configs.PATH_INTO_DB, ga_configs, constraints, goals)
+    ) as executor:
+        generation = 1
+        while generation < ga_configs['max_generations']:
+            num_generations = min(migration_interval, ga_configs['max_generations'] - generation)
+            futures = [executor.submit(_evolve_island, states[i], num_generations, rngs[i])
+                       for i in range(num_islands)]
+            for i, future in enumerate(futures):
+                states[i], records = future.result()
+                best_by_generation[i].extend(records)
+            generation += num_generations
+            if generation < ga_configs['max_generations']:
+                migrate(states, island_configs['migration_size'], topology)
+            logging.info(f"Generation #{generation}, best fitness {max(s['fitnesses'].max() for s in states)}")
+        if states[0] is None:
+            # No generations to run, so just create the initial populations;
+            futures = [executor.submit(_evolve_island, None, 0, rngs[i]) for i in range(num_islands)]
+            states = [future.result()[0] for future in futures]
+
+    # Merge the island histories, taking the fittest member across the islands at each generation;
+    recipe_arrays = optimisation.load_recipe_arrays()
+    hist = optimisation.History(history_filepath=history_filepath)
+    best_meal = None
+    for records in zip(*best_by_generation):
+        gen, fitness, recipe_ids, quantities_g = max(records, key=lambda record: record[1])
+        best_meal = optimisation.genome_to_meal(
+            optimisation.Genome(recipe_ids=recipe_ids, quantities_g=quantities_g), recipe_arrays)
+        hist.record_solution(gen, optimisation.create_solution_data(fitness, best_meal, goals['total_calories']))
+    if best_meal is None:
+        # Nothing was recorded, so take the fittest member of the initial populations;
+        state = max(states, key=lambda s: s['fitnesses'].max())
+        slot = int(state['fitnesses'].argmax())
+        best_meal = optimisation.genome_to_meal(optimisation.Genome(
+            recipe_ids=state['recipe_ids'][slot], quantities_g=state['quantities_g'][slot]), recipe_arrays)
+    logging.info("Finished optimisation.")
+
+    return best_meal
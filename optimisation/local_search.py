@@ -0,0 +1,84 @@
+"""Memetic local search, solving for the best quantities once a member's recipes have been chosen."""
+import logging
+from typing import Optional
+
+import numpy
+import scipy.optimize
+
+import optimisation
+
+
+def refine_quantities(
+        recipe_ids: 'numpy.ndarray',
+        engine: 'optimisation.FitnessEngine',
+        min_serving_ratio: float = 0.5,
+        max_serving_ratio: float = 1.5
+) -> Optional['numpy.ndarray']:
+    """Returns the quantities for the recipes which maximise fitness, or None if no quantities meet the max cost.
+    Notes:
+        The fitness is the worst nutrient's 1 - |ratio - target|, so maximising it is a minimax problem. The
+        nutrient ratios depend on the quantities divided by their total, so substituting y = q / total and
+        u = 1 / total turns it into a linear program over (y, u, z), minimising the worst deviation z.
+        Quantities are kept between min_serving_ratio and max_serving_ratio typical servings, the same
+        range mutation draws from.
+    """
+    recipe_ids = numpy.asarray(recipe_ids, dtype=numpy.intp)
+    num_slots = len(recipe_ids)
+    recipe_arrays = engine.recipe_arrays
+
+    # Variables are [y (one per slot), u, z];
+    deviations = engine.recipe_nutrient_ratios[recipe_ids].T - engine.target_ratios[:, None]
+    typical_serving_size_g = recipe_arrays.typical_serving_size_g[recipe_ids]
+    minus_z = -numpy.ones((len(deviations), 1))
+    no_u = numpy.zeros((len(deviations), 1))
+    a_ub = [
+        # Each nutrient's deviation from its target lies within +/- z;
+        numpy.hstack([deviations, no_u, minus_z]),
+        numpy.hstack([-deviations, no_u, minus_z]),
+        # The cost, once scaled to the target calories, is within the max cost;
+        numpy.hstack([
+            engine.target_total_calories * recipe_arrays.cost_per_g[recipe_ids]
+            - engine.target_max_cost * recipe_arrays.calories_per_g[recipe_ids],
+            [0, 0]
+        ])[None, :],
+        # Each quantity lies within its serving size bounds;
+        numpy.hstack([numpy.eye(num_slots), -max_serving_ratio * typical_serving_size_g[:, None],
+                      numpy.zeros((num_slots, 1))]),
+        numpy.hstack([-numpy.eye(num_slots), min_serving_ratio * typical_serving_size_g[:, None],
+                      numpy.zeros((num_slots, 1))]),
+    ]
+    a_ub = numpy.vstack(a_ub)
+    a_eq = numpy.hstack([numpy.ones(num_slots), [0, 0]])[None, :]
+    cost = numpy.zeros(num_slots + 2)
+    cost[-1] = 1
+
+    result = scipy.optimize.linprog(
+        c=cost, A_ub=a_ub, b_ub=numpy.zeros(len(a_ub)), A_eq=a_eq, b_eq=[1], bounds=(0, None), method='highs')
+    if result.status != 0:
+        return None
+    y, u = result.x[:num_slots], result.x[num_slots]
+    return y / u
+
+
+def refine_population(
+        population: 'optimisation.Population',
+        engine: 'optimisation.FitnessEngine',
+        num_members: int = 5
+) -> int:
+    """Refines the quantities of the fittest genomes in the population, and returns the number improved.
+    Improved genomes are replaced in the population by their refined copies.
+    """
+    fitnesses = population.fitnesses
+    members = population.members
+    num_improved = 0
+    for slot in numpy.argsort(fitnesses)[::-1][:num_members]:
+        genome = members[slot]
+        quantities_g = refine_quantities(genome.recipe_ids, engine)
+        if quantities_g is None:
+            continue
+        fitness = float(engine.score(genome.recipe_ids, quantities_g)[0])
+        if fitness > fitnesses[slot]:
+            population.replace(genome, optimisation.Genome(genome.recipe_ids.copy(), quantities_g), fitness)
+            num_improved += 1
+    logging.info(f"Local search improved {num_improved} members.")
+    return num_improved
@@ -1,8 +1,10 @@
 """Top level functionality for optimisation module."""
+import json
 import logging
+import os
 import random
-import json
-from typing import List, Dict, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Callable, Optional, Any
 
 import numpy
 
@@ -47,53 +49,170 @@ def run(
         ga_configs=configs.ga_configs,
         constraints=configs.constraints,
         goals=configs.goals,
-        history_filepath=configs.history_path
-):
-    """Runs the GA."""
-
-    # Initialise the various modules;
-    hist = optimisation.History(history_filepath=history_filepath)
-
-    pop = optimisation.Population(
-        create_random_member=lambda: create_random_member(
+        history_filepath=configs.history_path,
+        seed: Optional[int] = None,
+        local_search_configs=configs.local_search_configs,
+        termination: Optional['optimisation.TerminationPolicy'] = None,
+        metrics: Optional['optimisation.Metrics'] = None,
+        profile_filepath: Optional[str] = None,
+        archive_configs=configs.archive_configs,
+        recipe_arrays: Optional['optimisation.RecipeArrays'] = None
+) -> 'model.meals.SettableMeal':
+    """Runs the GA, and returns the fittest meal found. Runs with the same seed are reproducible.
+    If local search is enabled, the quantities of the fittest members are refined every interval generations.
+    The run stops when the termination policy says so, which by default is built from the ga configs, and
+    returns the best member found so far.
+    The time spent in each phase is accumulated in metrics, and emitted to its sinks every generation. If a
+    profile filepath is given, the run is profiled with cProfile and the stats are saved there.
+    If the archive is enabled, seed_fraction of the initial population is seeded from the archived solutions
+    for the nearest goals, and the fittest members are archived when the run finishes.
+    Recipe arrays already built from the loaded precalc data can be passed in, to save rebuilding them.
+    """
+    if termination is None:
+        termination = optimisation.build_termination_policy(ga_configs)
+    if metrics is None:
+        metrics = optimisation.Metrics()
+
+    with optimisation.profiled(profile_filepath):
+        # Initialise the various modules;
+        hist = optimisation.History(history_filepath=history_filepath)
+        if recipe_arrays is None:
+            recipe_arrays = optimisation.load_recipe_arrays()
+        engine = optimisation.build_fitness_engine(goals=goals, recipe_arrays=recipe_arrays)
+        fitness_cache = optimisation.FitnessCache(calculate_fitness=engine.calculate_genome_fitness)
+        rng = numpy.random.default_rng(seed)
+        candidate_recipe_ids = optimisation.get_candidate_recipe_ids(
             tags=constraints['tags'],
-            flags=constraints['flags']
-        ),
-        calculate_fitness=calculate_fitness,
-        on_population_size_change=log_population_size_change,
-        log_fittest_member=hist.record_solution
-    )
+            flags=constraints['flags'],
+            recipe_arrays=recipe_arrays,
+            serve_time=constraints['time']
+        )
+
+        # The population holds compact genomes, which are only converted to meals for logging and results;
+        pop = optimisation.Population(
+            create_random_member=metrics.wrap('create_random_member', lambda: optimisation.create_random_genome(
+                candidate_recipe_ids, recipe_arrays, rng)),
+            calculate_fitness=metrics.wrap('calculate_fitness', fitness_cache.calculate_fitness),
+            on_population_size_change=log_population_size_change,
+            max_size=ga_configs['max_population_size'],
+            log_fittest_member=hist.record_solution,
+            to_meal=lambda genome: optimisation.genome_to_meal(genome, recipe_arrays),
+            rng=rng,
+            total_calories=goals['total_calories']
+        )
+
+        # Begin the run;
+        logging.info("--- Optimisation Run Starting ---")
+        termination.start()
+        logging.info("Beginning population growth.")
+        archive = optimisation.SolutionArchive(archive_configs['path'], archive_configs['max_solutions']) \
+            if archive_configs['enabled'] else None
+        if archive is not None:
+            with metrics.time('seed_from_archive'):
+                pop.extend(archive.get_seed_genomes(
+                    constraints=constraints,
+                    goals=goals,
+                    recipe_arrays=recipe_arrays,
+                    candidate_recipe_ids=candidate_recipe_ids,
+                    num_genomes=round(ga_configs['max_population_size'] * archive_configs['seed_fraction']),
+                    rng=rng
+                ))
+        with metrics.time('populate_with_random_members'):
+            pop.populate_with_random_members()
+        logging.info("Initial population created.")
+
+        # Run the main loop
+        logging.info("Beginning optimisation loop.")
+        while not termination.should_stop(pop, fitness_cache.misses):
+            logging.info(f"Generation #{pop.generation}")
+            run_genome_generation(
+                population=pop,
+                ga_configs=ga_configs,
+                recipe_arrays=recipe_arrays,
+                candidate_recipe_ids=candidate_recipe_ids,
+                rng=rng,
+                metrics=metrics
+            )
+            if local_search_configs['enabled'] and pop.generation % local_search_configs['interval'] == 0:
+                with metrics.time('refine_population'):
+                    optimisation.refine_population(pop, engine, local_search_configs['num_members'])
+            with metrics.time('log_fittest_member'):
+                pop.log_fittest_member()
+            metrics.emit(pop.generation)
+        logging.info(f"Fitness cache: {fitness_cache.hits} hits, {fitness_cache.misses} misses.")
+        if archive is not None:
+            fittest_slots = numpy.argsort(pop.fitnesses)[::-1][:archive.max_solutions]
+            members = pop.members
+            archive.add(constraints, goals, [members[slot] for slot in fittest_slots],
+                        pop.fitnesses[fittest_slots].tolist(), recipe_arrays)
+            archive.save()
+        logging.info("Finished optimisation.")
+
+    return pop.fittest_meal
+
+
+def run_genome_generation(
+        population: 'optimisation.Population',
+        ga_configs: Dict[str, Any],
+        recipe_arrays: 'optimisation.RecipeArrays',
+        candidate_recipe_ids: List['numpy.ndarray'],
+        rng: 'numpy.random.Generator',
+        metrics: Optional['optimisation.Metrics'] = None
+) -> None:
+    """Culls and regrows a population of genomes, advancing it by one generation.
+    Both steps are batched; the cull losers, parents, mutations and random members for the whole generation
+    are drawn in a handful of vectorised calls, and the new members are scored together.
+    """
+    if metrics is None:
+        metrics = optimisation.Metrics()
+    max_population_size = ga_configs['max_population_size']
+
+    # Cull the population back to its minimum level;
+    culled_pop_size = round(max_population_size * (1 - (ga_configs['cull_percentage'] / 100)))
+    logging.info(f"Culling population to {culled_pop_size} members.")
+    with metrics.time('cull_population'):
+        population.remove_slots(optimisation.choose_cull_losers(
+            fitnesses=population.fitnesses,
+            num_to_cull=max(len(population) - culled_pop_size, 0),
+            rng=rng
+        ))
 
-    # Begin the run;
-    logging.info("--- Optimisation Run Starting ---")
-    logging.info("Beginning population growth.")
-    pop.populate_with_random_members()
-    logging.info("Initial population created.")
-
-    # Run the main loop
-    logging.info("Beginning optimisation loop.")
-    # while pop.generation < ga_configs['max_generations'] \
-    #         and pop.highest_fitness_score < ga_configs['acceptable_fitness']:
-    while pop.generation < ga_configs['max_generations']:
-        logging.info(f"Generation #{pop.generation}")
-        cull_population(population=pop)
-        regrow_population(population=pop)
-        pop.inc_generation()
-        pop.log_fittest_member()
-    logging.info("Finished optimisation.")
+    # Breed the survivors back up to the maximum level;
+    logging.info(f"Regrowing population to {max_population_size} members.")
+    with metrics.time('regrow_population'):
+        survivors = population.members
+        with metrics.time('breed_genomes'):
+            children = optimisation.breed_genomes(
+                parent_recipe_ids=numpy.stack([genome.recipe_ids for genome in survivors]),
+                parent_quantities_g=numpy.stack([genome.quantities_g for genome in survivors]),
+                num_children=max(max_population_size - len(population), 0),
+                candidate_recipe_ids=candidate_recipe_ids,
+                recipe_arrays=recipe_arrays,
+                mutation_prob=ga_configs['mutation_probability_percentage'],
+                random_solution_prob=ga_configs['random_solution_intro_percentage'],
+                rng=rng
+            )
+        population.extend(children)
+    population.inc_generation()
 
 
 def cull_population(
         population: 'optimisation.Population',
         max_population_size: int = configs.ga_configs['max_population_size'],
-        cull_percentage: float = configs.ga_configs['cull_percentage']
+        cull_percentage: float = configs.ga_configs['cull_percentage'],
+        calculate_fitness: Optional[Callable[..., List[float]]] = None
 ) -> None:
-    """Culls the population to the minimum level."""
+    """Culls the population to the minimum level.
+    Members are compared on the fitness stored by the population, unless a calculate_fitness function is given.
+    """
     culled_pop_size = round(max_population_size * (1 - (cull_percentage / 100)))
     logging.info(f"Culling population to {culled_pop_size} members.")
     while len(population) > culled_pop_size:
         m1, m2, = population.choose_two_random_members()
-        m1f, m2f = calculate_fitness(m1, m2)
+        if calculate_fitness is None:
+            m1f, m2f = population.get_fitness(m1), population.get_fitness(m2)
+        else:
+            m1f, m2f = calculate_fitness(m1, m2)
         if m1f < m2f:
             population.remove(m1)
         else:
@@ -101,8 +220,13 @@ def cull_population(
     logging.info("Population culling complete.")
 
 
-def roll_dice(true_probability: float = configs.ga_configs['mutation_probability_percentage']) -> bool:
+def roll_dice(
+        true_probability: float = configs.ga_configs['mutation_probability_percentage'],
+        rng: Optional['numpy.random.Generator'] = None
+) -> bool:
     """Returns True/False to indicate if the population should mutate."""
+    if rng is not None:
+        return rng.random() * 100 < true_probability
     point = random.choice(numpy.linspace(0, 100, num=100))
     if point < true_probability:
         return True
@@ -110,37 +234,52 @@ def roll_dice(true_probability: float = configs.ga_configs['mutation_probability
         return False
 
 
-def should_create_random_member(mutation_prob: float = configs.ga_configs['random_solution_intro_percentage']) -> bool:
+def should_create_random_member(
+        mutation_prob: float = configs.ga_configs['random_solution_intro_percentage'],
+        rng: Optional['numpy.random.Generator'] = None
+) -> bool:
     """Returns True/False to indicate if a random member should be created."""
-    return roll_dice(mutation_prob)
+    return roll_dice(mutation_prob, rng)
 
 
-def should_mutate(mutation_prob: float = configs.ga_configs['mutation_probability_percentage']) -> bool:
+def should_mutate(
+        mutation_prob: float = configs.ga_configs['mutation_probability_percentage'],
+        rng: Optional['numpy.random.Generator'] = None
+) -> bool:
     """Returns True/False to indicate if a member should be mutated."""
-    return roll_dice(mutation_prob)
+    return roll_dice(mutation_prob, rng)
 
 
 def regrow_population(
         population: 'optimisation.Population',
         max_population_size: int = configs.ga_configs['max_population_size'],
         mutation_prob: float = configs.ga_configs['mutation_probability_percentage'],
-        random_solution_prob: float = configs.ga_configs['random_solution_intro_percentage']
+        random_solution_prob: float = configs.ga_configs['random_solution_intro_percentage'],
+        create_member: Optional[Callable[[], Any]] = None,
+        splice: Optional[Callable[[Any, Any], Any]] = None,
+        mutate: Optional[Callable[[Any], None]] = None,
+        rng: Optional['numpy.random.Generator'] = None
 ) -> None:
-    """Regrows the population back to correct level."""
+    """Regrows the population back to correct level.
+    The operators default to the SettableMeal versions, and can be swapped for those of another member type.
+    """
+    create_member = create_random_member if create_member is None else create_member
+    splice = splice_members if splice is None else splice
+    mutate = mutate_member if mutate is None else mutate
     logging.info(f"Regrowing population to {max_population_size} members.")
     while len(population) < max_population_size:
         # Roll the dice to figure if we should bring in a whole new member;
         # Yes we should;
-        if should_create_random_member(mutation_prob):
-            m = create_random_member()
+        if should_create_random_member(mutation_prob, rng):
+            m = create_member()
             logging.debug("Mutation: Solution randomly created.")
         # No, we should create the new one from two surviving parents in the population;
         else:
-            m = splice_members(*population.choose_two_random_members())
+            m = splice(*population.choose_two_random_members())
             # Should we mutate the child?
             # Yes - go ahead;
-            if should_mutate(random_solution_prob):
-                mutate_member(m)
+            if should_mutate(random_solution_prob, rng):
+                mutate(m)
                 logging.debug("Mutation: Spliced solution mutated.")
         population.append(m)
     logging.info(f"Finished regrowing population.")
@@ -188,16 +327,15 @@ def splice_members(member_1: 'model.meals.SettableMeal',
 
 def create_random_member(
         tags: List[str] = configs.constraints['tags'],
-        flags: Dict[str, bool] = configs.constraints['flags']
+        flags: Dict[str, bool] = configs.constraints['flags'],
+        serve_time: Optional[str] = configs.constraints['time']
 ) -> 'model.meals.SettableMeal':
-    """Creates a random member of the population, with specified tags and flags."""
+    """Creates a random member of the population, with specified tags and flags, servable at the time."""
+    candidate_pools = optimisation.get_default_candidate_pools()
     meal = model.meals.SettableMeal()
     for tag in tags:
-        recipe_sets = [set(persistence.get_recipe_df_names_by_tag(tag))]
-        for flag, value in flags.items():
-            recipe_sets.append(set(persistence.get_recipe_df_names_by_flag(flag, value)))
-        possible_df_names = set.intersection(*recipe_sets)
-        df_name = random.choice(list(possible_df_names))
+        pool = candidate_pools.get_pool(tag, flags, serve_time)
+        df_name = candidate_pools.recipe_arrays.df_names[pool[random.randrange(len(pool))]]
         r_unique_name = model.recipes.get_unique_name_for_datafile_name(df_name)
         typical_serving_size = persistence.get_precalc_data_for_recipe(df_name)['typical_serving_size_g']
         meal.add_recipe(recipe_unique_name=r_unique_name, recipe_qty_data=model.quantity.QuantityData(
@@ -272,39 +410,62 @@ def calculate_fitness(
     return fs
 
 
+def _run_fitness_rep(
+        ga_configs: Dict[str, Any],
+        constraints: Dict[str, Any],
+        goals: Dict[str, Any],
+        history_filepath: str,
+        seed: int,
+        path_into_db: str
+) -> Dict[int, float]:
+    """Runs a single repetition in a worker process, and returns its fitness history by generation."""
+    persistence.configs.PATH_INTO_DB = path_into_db
+    run(ga_configs=ga_configs, constraints=constraints, goals=goals, history_filepath=history_filepath, seed=seed)
+    # Collect the fitness hist for this repetition;
+    return {gen: solution_data['fitness'] for gen, solution_data in optimisation.read_history(history_filepath)}
+
+
 def run_fitness_reps(
-        output_file:str,
+        output_file: str,
         num_reps=20,
         ga_configs=configs.ga_configs,
         set_ga_configs: Dict = None,
         set_goals: Dict = None,
         constraints=configs.constraints,
-        history_filepath=configs.history_path
+        history_filepath=configs.history_path,
+        seed: Optional[int] = None,
+        seeds: Optional[List[int]] = None,
+        num_workers: Optional[int] = None
 ):
-    rep = 1
-    fitness_scores: Dict[int, dict] = {}
-
+    """Runs repetitions of the GA concurrently in a process pool, and saves their fitness histories
+    to the output file as {rep: {gen: fitness}}.
+    Each rep writes its own history file alongside history_filepath, and runs with its own seed. The
+    seeds are drawn from the seed argument, unless a seed for every rep is given explicitly.
+    """
     # Apply any config changes;
     if set_ga_configs is not None:
-        for config, value in set_ga_configs.items():
-            ga_configs[config] = value
-    if set_goals is not None:
-        configs.goals = set_goals
-
-    while rep <= num_reps:
-        # Run the rep;
-        run(ga_configs=ga_configs, constraints=constraints, history_filepath=configs.history_path)
-        # Open the logfile and read the data;
-        with open(history_filepath, 'r') as fh:
-            raw_data = fh.read()
-            data = json.loads(raw_data)
-        # Collect the fitness hist for this repetition;
-        fitness_scores[rep] = {}
-        # Work through each entry in the data;
-        for gen in data:
-            fitness_scores[rep][gen[0]] = gen[1]['fitness']
-        # Increment the repetition counter
-        rep += 1
+        ga_configs = {**ga_configs, **set_ga_configs}
+    goals = configs.goals if set_goals is None else set_goals
+
+    # Work out the seed for each rep;
+    if seeds is None:
+        seeds = [int(s) for s in numpy.random.SeedSequence(seed).generate_state(num_reps)]
+    elif len(seeds) != num_reps:
+        raise ValueError(f"Expected {num_reps} seeds, got {len(seeds)}.")
+    logging.info(f"Running {num_reps} reps with seeds {seeds}.")
+
+    # Run the reps;
+    root, ext = os.path.splitext(history_filepath)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            rep: executor.submit(
+                _run_fitness_rep,
+                ga_configs, constraints, goals, f"{root}.rep{rep}{ext}", seeds[rep - 1],
+                persistence.configs.PATH_INTO_DB
+            ) for rep in range(1, num_reps + 1)
+        }
+        fitness_scores: Dict[int, dict] = {rep: future.result() for rep, future in futures.items()}
+
     # Save the data;
     with open(output_file, 'w') as fh:
         json.dump(fitness_scores, fh, indent=2)
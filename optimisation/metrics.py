@@ -0,0 +1,101 @@
+"""Per-phase timing and call counts for optimisation runs, emitted to pluggable sinks."""
+import contextlib
+import cProfile
+import functools
+import json
+import logging
+import time
+from typing import Dict, List, Callable, Optional, Any, Iterator
+
+MetricsRecord = Dict[str, Any]
+
+
+class Metrics:
+    """Accumulates the time spent in, and the number of calls to, each named phase of a run.
+    Notes:
+        Sinks are called with a record of the cumulative totals each time emit is called; a list's append
+        method makes an in-memory sink.
+    """
+
+    def __init__(self, sinks: Optional[List[Callable[[MetricsRecord], None]]] = None):
+        self.sinks: List[Callable[[MetricsRecord], None]] = [] if sinks is None else sinks
+        self._seconds: Dict[str, float] = {}
+        self._calls: Dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """Times the block as one call to the phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        """Returns the function, timing each call to it as a call to the phase."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.time(phase):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def record(self, phase: str, seconds: float, calls: int = 1) -> None:
+        """Adds the time and calls to the phase's totals."""
+        self._seconds[phase] = self._seconds.get(phase, 0) + seconds
+        self._calls[phase] = self._calls.get(phase, 0) + calls
+
+    def get_seconds(self, phase: str) -> float:
+        """Returns the cumulative time spent in the phase."""
+        return self._seconds.get(phase, 0)
+
+    def get_calls(self, phase: str) -> int:
+        """Returns the number of calls made to the phase."""
+        return self._calls.get(phase, 0)
+
+    @property
+    def phases(self) -> Dict[str, Dict[str, float]]:
+        """Returns the cumulative seconds and calls for each phase."""
+        return {phase: {'seconds': seconds, 'calls': self._calls[phase]} for phase, seconds in self._seconds.items()}
+
+    def emit(self, generation: int) -> None:
+        """Sends the current totals to every sink."""
+        record = {'generation': generation, 'phases': self.phases}
+        for sink in self.sinks:
+            sink(record)
+
+
+def log_metrics(record: MetricsRecord) -> None:
+    """Sink which writes the record to the log."""
+    phases = ", ".join(f"{phase} {round(totals['seconds'], 3)}s/{totals['calls']}"
+                       for phase, totals in record['phases'].items())
+    logging.info(f"Metrics at generation #{record['generation']}: {phases}")
+
+
+class JsonlMetricsWriter:
+    """Sink which appends each record to a JSON Lines file."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        open(self.filepath, 'w').close()
+
+    def __call__(self, record: MetricsRecord) -> None:
+        with open(self.filepath, 'a') as fh:
+            fh.write(json.dumps(record) + '\n')
+
+
+@contextlib.contextmanager
+def profiled(profile_filepath: Optional[str] = None) -> Iterator[None]:
+    """Profiles the block with cProfile and dumps the stats to the file, if a file is given."""
+    if profile_filepath is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_filepath)
+        logging.info(f"Profile saved to {profile_filepath}.")
@@ -0,0 +1,149 @@
+"""Exact solver backend, choosing the recipes and quantities for a meal with a mixed-integer linear program."""
+import logging
+from typing import List, Optional, Tuple
+
+import numpy
+import scipy.optimize
+import scipy.sparse
+
+import model
+import optimisation
+from optimisation import configs
+
+
+def solve_meal(
+        engine: 'optimisation.FitnessEngine',
+        candidate_recipe_ids: List['numpy.ndarray'],
+        min_serving_ratio: float = configs.milp_configs['min_serving_ratio'],
+        max_serving_ratio: float = configs.milp_configs['max_serving_ratio'],
+        time_limit: Optional[float] = configs.milp_configs['time_limit']
+) -> Optional[Tuple['optimisation.Genome', float]]:
+    """Returns the genome with the highest fitness, choosing one candidate per slot, and its fitness.
+    Returns None if no choice of recipes and quantities meets the max cost.
+    Notes:
+        This extends the linear program in local_search.refine_quantities with a binary choice per candidate.
+        Each candidate has a quantity share y (its quantity over the total) and a binary x, selecting it for
+        its slot, with u = 1 / total. Every nutrient's ratio is then linear in y, and the worst deviation z
+        from the targets is minimised. The product x * u is carried by a variable v per candidate, which is
+        zero unless the candidate is selected, and whose sum over each slot is u. A selected candidate's
+        share then lies between min_serving_ratio and max_serving_ratio typical servings times v, which keeps
+        the relaxation tight enough for the solver to prune most choices without branching on them.
+        If the time limit is reached, the best meal found so far is returned.
+    """
+    recipe_arrays = engine.recipe_arrays
+    recipe_ids = numpy.concatenate(candidate_recipe_ids).astype(numpy.intp)
+    num_slots = len(candidate_recipe_ids)
+    slots = numpy.repeat(numpy.arange(num_slots), [len(c) for c in candidate_recipe_ids])
+    n = len(recipe_ids)
+    min_qty_g = min_serving_ratio * recipe_arrays.typical_serving_size_g[recipe_ids]
+    max_qty_g = max_serving_ratio * recipe_arrays.typical_serving_size_g[recipe_ids]
+
+    # Bound u by the lightest and heaviest meals the serving ranges allow;
+    min_total_g = sum(min_qty_g[slots == slot].min() for slot in range(num_slots))
+    max_total_g = sum(max_qty_g[slots == slot].max() for slot in range(num_slots))
+    max_u = 1 / min_total_g
+
+    # Variables are [y (one per candidate), x (one per candidate), v (one per candidate), u, z];
+    y, x, v, u, z = slice(0, n), slice(n, 2 * n), slice(2 * n, 3 * n), 3 * n, 3 * n + 1
+    num_vars = 3 * n + 2
+    rows, lower, upper = [], [], []
+
+    def add_rows(lb, ub, *blocks):
+        """Adds rows of constraints between the bounds, given as (variables, coefficients) blocks."""
+        num_rows = blocks[0][1].shape[0]
+        data, row_indices, col_indices = [], [], []
+        for variables, coefs in blocks:
+            coefs = scipy.sparse.coo_matrix(coefs)
+            data.append(coefs.data)
+            row_indices.append(coefs.row)
+            col_indices.append(coefs.col + (variables.start if isinstance(variables, slice) else variables))
+        rows.append(scipy.sparse.coo_matrix(
+            (numpy.concatenate(data), (numpy.concatenate(row_indices), numpy.concatenate(col_indices))),
+            shape=(num_rows, num_vars)))
+        lower.append(numpy.broadcast_to(lb, num_rows))
+        upper.append(numpy.broadcast_to(ub, num_rows))
+
+    eye = scipy.sparse.identity(n)
+    ones = numpy.ones((num_slots, 1))
+    slot_sums = scipy.sparse.csr_matrix((numpy.ones(n), (slots, numpy.arange(n))), shape=(num_slots, n))
+    deviations = engine.recipe_nutrient_ratios[recipe_ids].T - engine.target_ratios[:, None]
+    minus_z = -numpy.ones((len(deviations), 1))
+    inf = numpy.inf
+    # Each nutrient's deviation from its target lies within +/- z;
+    add_rows(-inf, 0, (y, deviations), (z, minus_z))
+    add_rows(-inf, 0, (y, -deviations), (z, minus_z))
+    # The shares add up to the whole meal;
+    add_rows(1, 1, (y, numpy.ones((1, n))))
+    # Each slot has exactly one recipe selected, and only the selected recipe carries u;
+    add_rows(1, 1, (x, slot_sums))
+    add_rows(0, 0, (v, slot_sums), (u, -ones))
+    add_rows(-inf, 0, (v, eye), (x, scipy.sparse.diags(-max_u * numpy.ones(n))))
+    # A selected candidate's quantity lies within its serving size bounds;
+    add_rows(-inf, 0, (y, eye), (v, scipy.sparse.diags(-max_qty_g)))
+    add_rows(0, inf, (y, eye), (v, scipy.sparse.diags(-min_qty_g)))
+    # The cost, once scaled to the target calories, is within the max cost;
+    add_rows(-inf, 0, (y, (engine.target_total_calories * recipe_arrays.cost_per_g[recipe_ids]
+                           - engine.target_max_cost * recipe_arrays.calories_per_g[recipe_ids])[None, :]))
+
+    constraints = scipy.optimize.LinearConstraint(
+        scipy.sparse.vstack(rows), numpy.concatenate(lower), numpy.concatenate(upper))
+    objective = numpy.zeros(num_vars)
+    objective[z] = 1
+    integrality = numpy.zeros(num_vars)
+    integrality[x] = 1
+    lb, ub = numpy.zeros(num_vars), numpy.ones(num_vars)
+    ub[v] = max_u
+    lb[u], ub[u] = 1 / max_total_g, max_u
+    ub[z] = inf
+    bounds = scipy.optimize.Bounds(lb=lb, ub=ub)
+
+    result = scipy.optimize.milp(c=objective, constraints=constraints, integrality=integrality, bounds=bounds,
+                                 options={} if time_limit is None else {'time_limit': time_limit})
+    if result.x is None:
+        return None
+    logging.info(f"MILP solver: {result.message}")
+
+    # Read the selected candidate and its quantity for each slot;
+    shares, chosen = result.x[y], result.x[x]
+    selected = numpy.array([numpy.flatnonzero(slots == slot)[numpy.argmax(chosen[slots == slot])]
+                            for slot in range(num_slots)])
+    genome = optimisation.Genome(recipe_ids=recipe_ids[selected], quantities_g=shares[selected] / result.x[u])
+    return genome, float(engine.score(genome.recipe_ids, genome.quantities_g)[0])
+
+
+def run_milp(
+        constraints=configs.constraints,
+        goals=configs.goals,
+        history_filepath=configs.history_path,
+        milp_configs=configs.milp_configs
+) -> 'model.meals.SettableMeal':
+    """Solves for the fittest meal, and returns it, recording it in the history as generation 1.
+    Raises ValueError if no meal meets the constraints and the max cost.
+    """
+    hist = optimisation.History(history_filepath=history_filepath)
+    recipe_arrays = optimisation.load_recipe_arrays()
+    engine = optimisation.build_fitness_engine(goals=goals, recipe_arrays=recipe_arrays)
+    candidate_recipe_ids = optimisation.get_candidate_recipe_ids(
+        tags=constraints['tags'],
+        flags=constraints['flags'],
+        recipe_arrays=recipe_arrays,
+        serve_time=constraints['time']
+    )
+    if any(len(candidates) == 0 for candidates in candidate_recipe_ids):
+        raise ValueError("No recipes meet the tags, flags and time of the constraints.")
+
+    logging.info("--- MILP Optimisation Run Starting ---")
+    solution = solve_meal(
+        engine=engine,
+        candidate_recipe_ids=candidate_recipe_ids,
+        min_serving_ratio=milp_configs['min_serving_ratio'],
+        max_serving_ratio=milp_configs['max_serving_ratio'],
+        time_limit=milp_configs['time_limit']
+    )
+    if solution is None:
+        raise ValueError("No meal meets the constraints and the max cost.")
+    genome, fitness = solution
+    meal = optimisation.genome_to_meal(genome, recipe_arrays)
+    hist.record_solution(1, optimisation.create_solution_data(fitness, meal, goals['total_calories']))
+    logging.info(f"Finished optimisation, fitness {fitness}.")
+    return meal
@@ -0,0 +1,173 @@
+"""Multi-objective optimisation, returning the Pareto front of nutrient error, cost and calorie deviation (NSGA-II)."""
+import logging
+from typing import List, Optional, TypedDict
+
+import numpy
+
+import model
+import optimisation
+from optimisation import configs
+
+OBJECTIVE_NAMES = ['nutrient_error', 'cost', 'calorie_deviation']
+
+
+class ParetoSolution(TypedDict):
+    """A meal on the Pareto front, with its objectives."""
+    meal: 'model.meals.SettableMeal'
+    nutrient_error: float
+    cost: float
+    calorie_deviation: float
+
+
+def compute_objectives(
+        engine: 'optimisation.FitnessEngine',
+        recipe_ids: 'numpy.ndarray',
+        quantities_g: 'numpy.ndarray'
+) -> 'numpy.ndarray':
+    """Returns a (members x objectives) array of the objectives to minimise, in the order of OBJECTIVE_NAMES.
+    Notes:
+        The nutrient error is the worst nutrient's |ratio - target|, so it is 1 - the single objective fitness
+        before any cost penalty. The cost is that of the meal as it is, and the calorie deviation is its
+        calories' relative distance from the target, since the meal is no longer scaled to meet it.
+    """
+    nutrient_error = numpy.abs(engine.nutrient_ratios(recipe_ids, quantities_g) - engine.target_ratios).max(axis=1)
+    cost = engine.total_cost(recipe_ids, quantities_g)
+    calorie_deviation = numpy.abs(engine.total_calories(recipe_ids, quantities_g) - engine.target_total_calories) / \
+        engine.target_total_calories
+    return numpy.stack([nutrient_error, cost, calorie_deviation], axis=1)
+
+
+def non_dominated_sort(objectives: 'numpy.ndarray') -> 'numpy.ndarray':
+    """Returns the front of each member, where front 0 is non-dominated, front 1 is only dominated by front 0...
+    The dominance relation between every pair of members is built in one broadcast comparison, then fronts are
+    peeled off by counting the dominators of each member which have not yet been assigned a front.
+    """
+    no_worse = (objectives[:, None, :] <= objectives[None, :, :]).all(axis=2)
+    better = (objectives[:, None, :] < objectives[None, :, :]).any(axis=2)
+    # dominates[i, j] is True if member i dominates member j;
+    dominates = no_worse & better
+    num_dominators = dominates.sum(axis=0)
+    fronts = numpy.full(len(objectives), -1)
+    front = 0
+    current = numpy.flatnonzero(num_dominators == 0)
+    while len(current):
+        fronts[current] = front
+        num_dominators = num_dominators - dominates[current].sum(axis=0)
+        num_dominators[fronts >= 0] = -1
+        current = numpy.flatnonzero(num_dominators == 0)
+        front += 1
+    return fronts
+
+
+def crowding_distance(objectives: 'numpy.ndarray', fronts: 'numpy.ndarray') -> 'numpy.ndarray':
+    """Returns the crowding distance of each member within its front; the members at either end of a front,
+    for any objective, are given infinite distance so they are always preferred.
+    """
+    distances = numpy.zeros(len(objectives))
+    for front in numpy.unique(fronts):
+        members = numpy.flatnonzero(fronts == front)
+        front_objectives = objectives[members]
+        order = numpy.argsort(front_objectives, axis=0)
+        sorted_objectives = numpy.take_along_axis(front_objectives, order, axis=0)
+        spans = sorted_objectives[-1] - sorted_objectives[0]
+        spans[spans == 0] = 1
+        # Each interior member's contribution is the gap between its neighbours, normalised by the span;
+        gaps = numpy.zeros_like(sorted_objectives)
+        gaps[1:-1] = (sorted_objectives[2:] - sorted_objectives[:-2]) / spans
+        gaps[0] = gaps[-1] = numpy.inf
+        front_distances = numpy.zeros(len(members))
+        for objective in range(objectives.shape[1]):
+            front_distances[order[:, objective]] += gaps[:, objective]
+        distances[members] = front_distances
+    return distances
+
+
+def select_survivors(objectives: 'numpy.ndarray', num_survivors: int) -> 'numpy.ndarray':
+    """Returns the indices of the members to keep, by front and then by crowding distance, best first."""
+    fronts = non_dominated_sort(objectives)
+    distances = crowding_distance(objectives, fronts)
+    return numpy.lexsort((-distances, fronts))[:num_survivors]
+
+
+def choose_parents(
+        fronts: 'numpy.ndarray',
+        distances: 'numpy.ndarray',
+        num_parents: int,
+        rng: 'numpy.random.Generator'
+) -> 'numpy.ndarray':
+    """Returns the indices of parents chosen by binary tournaments, won by the lower front, then the less crowded."""
+    pairs = rng.integers(len(fronts), size=(num_parents, 2))
+    first, second = pairs[:, 0], pairs[:, 1]
+    first_wins = (fronts[first] < fronts[second]) | \
+                 ((fronts[first] == fronts[second]) & (distances[first] >= distances[second]))
+    return numpy.where(first_wins, first, second)
+
+
+def run_pareto(
+        ga_configs=configs.ga_configs,
+        constraints=configs.constraints,
+        goals=configs.goals,
+        history_filepath=configs.history_path,
+        seed: Optional[int] = None
+) -> List['ParetoSolution']:
+    """Runs NSGA-II for max_generations, and returns the final Pareto front, cheapest first.
+    Each generation, parents chosen by tournament breed a full population of children, and the best of the
+    parents and children together (by front, then crowding distance) survive. The history records the
+    objectives of the front at every generation.
+    """
+    hist = optimisation.History(history_filepath=history_filepath)
+    recipe_arrays = optimisation.load_recipe_arrays()
+    engine = optimisation.build_fitness_engine(goals=goals, recipe_arrays=recipe_arrays)
+    rng = numpy.random.default_rng(seed)
+    candidate_recipe_ids = optimisation.get_candidate_recipe_ids(
+        tags=constraints['tags'],
+        flags=constraints['flags'],
+        recipe_arrays=recipe_arrays,
+        serve_time=constraints['time']
+    )
+    population_size = ga_configs['max_population_size']
+
+    logging.info("--- Pareto Optimisation Run Starting ---")
+    genomes = [optimisation.create_random_genome(candidate_recipe_ids, recipe_arrays, rng)
+               for _ in range(population_size)]
+    recipe_ids = numpy.stack([genome.recipe_ids for genome in genomes])
+    quantities_g = numpy.stack([genome.quantities_g for genome in genomes])
+    objectives = compute_objectives(engine, recipe_ids, quantities_g)
+
+    for generation in range(1, ga_configs['max_generations'] + 1):
+        # Breed a full population of children from tournament winners;
+        fronts = non_dominated_sort(objectives)
+        parents = choose_parents(fronts, crowding_distance(objectives, fronts), population_size, rng)
+        children = optimisation.breed_genomes(
+            parent_recipe_ids=recipe_ids[parents],
+            parent_quantities_g=quantities_g[parents],
+            num_children=population_size,
+            candidate_recipe_ids=candidate_recipe_ids,
+            recipe_arrays=recipe_arrays,
+            mutation_prob=ga_configs['mutation_probability_percentage'],
+            random_solution_prob=ga_configs['random_solution_intro_percentage'],
+            rng=rng
+        )
+        child_recipe_ids = numpy.stack([genome.recipe_ids for genome in children])
+        child_quantities_g = numpy.stack([genome.quantities_g for genome in children])
+
+        # Pool parents and children, dropping duplicates which would crowd the front;
+        recipe_ids = numpy.concatenate([recipe_ids, child_recipe_ids])
+        quantities_g = numpy.concatenate([quantities_g, child_quantities_g])
+        objectives = numpy.concatenate([objectives, compute_objectives(engine, child_recipe_ids, child_quantities_g)])
+        _, unique = numpy.unique(numpy.hstack([recipe_ids, quantities_g]), axis=0, return_index=True)
+        unique = numpy.sort(unique)
+        survivors = unique[select_survivors(objectives[unique], population_size)]
+        recipe_ids, quantities_g, objectives = recipe_ids[survivors], quantities_g[survivors], objectives[survivors]
+
+        front = objectives[non_dominated_sort(objectives) == 0]
+        logging.info(f"Generation #{generation}: {len(front)} members on the front.")
+        hist.record_solution(generation, {'front': [dict(zip(OBJECTIVE_NAMES, row)) for row in front.tolist()]})
+    logging.info("Finished optimisation.")
+
+    on_front = numpy.flatnonzero(non_dominated_sort(objectives) == 0)
+    on_front = on_front[numpy.argsort(objectives[on_front, 1])]
+    return [ParetoSolution(
+        meal=optimisation.genome_to_meal(optimisation.Genome(recipe_ids[i], quantities_g[i]), recipe_arrays),
+        **dict(zip(OBJECTIVE_NAMES, objectives[i].tolist()))
+    ) for i in on_front]
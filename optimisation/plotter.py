@@ -1,6 +1,4 @@
 """Graphing functionality to display results from the optimiser."""
-import copy
-import json
 from typing import List, Dict
 
 from matplotlib import animation
@@ -56,7 +54,14 @@ class Plotter:
             linestyle='--'
         )
         self.target_nutr_lines = {}
+        # Keep the plotted data, so each frame only needs to read the new records;
+        self._history_reader = optimisation.HistoryReader(configs.history_path)
+        self._gens: List[int] = []
+        self._fitnesses: List[float] = []
+        self._costs_gbp: List[float] = []
+        self._target_nutrs: Dict[str, List[float]] = {}
         for nutr_name in target_nutrient_ratios.keys():
+            self._target_nutrs[nutr_name] = []
             # Horizontal lines marking targets.
             # _ = self.target_ratio_ax.axhline(
             #     y=target_nutrient_ratios[nutr_name],
@@ -78,51 +83,38 @@ class Plotter:
 
     def run(self, _):
         """Update function."""
-        # Create lists for the data;
-        gens = []
-        fitnesses = []
-        target_nutrs = {nut_name: [] for nut_name in self.target_nutr_lines.keys()}
-        costs_gbp: List[float] = []
-
-        # Open the logfile and read the data;
-        with open(configs.history_path, 'r') as fh:
-            raw_data = fh.read()
-            data = json.loads(raw_data)
-        # Work through each entry in the data;
-        for row in data:
-            # Grab the generation number;
-            gens.append(row[0])
-
-            cost = row[1]['cost']
-            fitness = row[1]['fitness']
-
-            # Create a meal instance from the data;
-            # First grab the meal data;
-            md = copy.copy(row[1])
-            del md['nutrient_ratios']
-            del md['fitness']
-            del md['cost']
-            del md['ingredient_quantities']
-            m = model.meals.SettableMeal(meal_data=md)
-
-            # Calculate the fitness of the instance;
-            fitnesses.append(fitness)
-
-            # Append the nutreint ratios to their respective datalines;
-            for nut_name in self.target_nutr_lines.keys():
-                target_nutrs[nut_name].append(m.get_nutrient_ratio(nut_name).subject_g_per_host_g)
-
-            # Append the cost;
-            costs_gbp.append(cost)
-
-        self.fitness_hist_line.set_data(gens, fitnesses)
-        self.cost_hist_line.set_data(gens, costs_gbp)
+        # Read any records added since the last frame;
+        new_data = self._history_reader.read_new()
+        if self._history_reader.restarted:
+            self._clear_data()
+        if len(new_data) == 0:
+            return
+
+        # Append the new records to the datalines, using the nutrient ratios stored in the history;
+        for gen, solution_data in new_data:
+            self._gens.append(gen)
+            self._fitnesses.append(solution_data['fitness'])
+            self._costs_gbp.append(solution_data['cost'])
+            for nut_name, ratios in self._target_nutrs.items():
+                ratios.append(solution_data['nutrient_ratios'].get(
+                    model.nutrients.get_nutrient_primary_name(nut_name), 0))
+
+        self.fitness_hist_line.set_data(self._gens, self._fitnesses)
+        self.cost_hist_line.set_data(self._gens, self._costs_gbp)
         for nut_name, line in self.target_nutr_lines.items():
-            line[0].set_data(gens, target_nutrs[nut_name])
+            line[0].set_data(self._gens, self._target_nutrs[nut_name])
 
         self.fitness_hist_ax.relim()
         self.fitness_hist_ax.autoscale_view()
 
+    def _clear_data(self) -> None:
+        """Clears the plotted data, ready to plot a new history."""
+        self._gens.clear()
+        self._fitnesses.clear()
+        self._costs_gbp.clear()
+        for ratios in self._target_nutrs.values():
+            ratios.clear()
+
 
 plotter = Plotter()
 plt.show()
@@ -1,7 +1,9 @@
 """Population class, used for collecting and managing solutions."""
 import logging
 import random
-from typing import Optional, List, Callable
+from typing import Optional, List, Callable, Any, Dict
+
+import numpy
 
 import model
 import optimisation
@@ -9,30 +11,76 @@ from optimisation import configs
 
 
 class Population:
-    """Models a population of solutions."""
+    """Models a population of solutions.
+    Notes:
+        Members are held in a slot list, with a map from member identity to slot and a parallel array of
+        fitness scores. Membership checks, removal (by swapping the last member into the freed slot) and
+        random selection are all O(1).
+    """
 
     def __init__(
             self,
-            create_random_member: Callable[[], 'model.meals.SettableMeal'],
-            calculate_fitness: Callable[['model.meals.SettableMeal'], List[float]],
+            create_random_member: Callable[[], Any],
+            calculate_fitness: Callable[..., List[float]],
             on_population_size_change: Optional[Callable[[int], None]] = None,
             max_size: int = configs.ga_configs["max_population_size"],
-            log_fittest_member: Optional[Callable[[int, 'model.meals.MealData'], None]] = None
+            log_fittest_member: Optional[Callable[[int, 'model.meals.MealData'], None]] = None,
+            to_meal: Optional[Callable[[Any], 'model.meals.SettableMeal']] = None,
+            rng: Optional['numpy.random.Generator'] = None,
+            generation: int = 1,
+            total_calories: float = configs.goals['total_calories']
     ):
+        """
+        Args:
+            create_random_member: Returns a new random member.
+            calculate_fitness: Returns the fitness of each member passed to it.
+            on_population_size_change: Called with the new size whenever the population grows or shrinks.
+            max_size: Population size to grow to.
+            log_fittest_member: Called with the generation and data for the fittest member.
+            to_meal: Converts members to SettableMeal instances where the model is needed. Members are
+                assumed to be SettableMeal instances already if not provided.
+            rng: Generator used to select members, so seeded runs are reproducible. The random module is
+                used if not provided.
+            generation: Generation to start counting from, when resuming a population.
+            total_calories: Target calories of the run, which the fittest member's quantities are scaled to when
+                it is logged.
+        """
         self._log_fittest_member = log_fittest_member
+        self._to_meal = to_meal
+        self._rng = rng
+        self._total_calories = total_calories
         self._calculate_fitness = calculate_fitness
         self._max_size = max_size
         self._create_random_member = create_random_member
         self._on_population_size_change = on_population_size_change
 
-        self._population = []
+        self._population: List[Any] = []
+        self._slots: Dict[int, int] = {}
+        self._fitnesses: 'numpy.ndarray' = numpy.zeros(max(max_size, 1))
         self._highest_fitness_score: Optional[float] = None
         self._fittest_member: Optional['model.meals.SettableMeal'] = None
-        self._generation: int = 1
+        self._generation: int = generation
 
     def __len__(self):
         return len(self._population)
 
+    def __contains__(self, member: Any) -> bool:
+        return id(member) in self._slots
+
+    @property
+    def members(self) -> List[Any]:
+        """Returns a list of the members in the population."""
+        return list(self._population)
+
+    @property
+    def fitnesses(self) -> 'numpy.ndarray':
+        """Returns the fitness of each member, in the same order as members."""
+        return self._fitnesses[:len(self._population)]
+
+    def get_fitness(self, member: Any) -> float:
+        """Returns the stored fitness of the member."""
+        return float(self._fitnesses[self._slots[id(member)]])
+
     def populate_with_random_members(self):
         """Increases the population size to maximum by generating random members."""
         while len(self._population) < self._max_size:
@@ -40,13 +88,15 @@ class Population:
 
     def choose_two_random_members(self):
         """Selects two members from the population at random."""
-        m1 = random.choice(self._population)
-        m2 = random.choice(self._population)
-        # Prevent the same member being returned twice;
-        while m1 is m2:
-            m2 = random.choice(self._population)
-
-        return m1, m2
+        n = len(self._population)
+        if self._rng is not None:
+            i1, i2 = self._rng.integers(n), self._rng.integers(n - 1)
+        else:
+            i1, i2 = random.randrange(n), random.randrange(n - 1)
+        # Prevent the same member being returned twice, by skipping over the first choice;
+        if i2 >= i1:
+            i2 += 1
+        return self._population[i1], self._population[i2]
 
     @property
     def generation(self) -> int:
@@ -63,25 +113,19 @@ class Population:
         return self._highest_fitness_score
 
     @property
-    def fittest_member(self) -> 'model.meals.SettableMeal':
+    def fittest_member(self) -> Any:
         """Returns the fittest member in the population."""
         return self._fittest_member
 
+    @property
+    def fittest_meal(self) -> 'model.meals.SettableMeal':
+        """Returns the fittest member in the population as a SettableMeal instance."""
+        if self._to_meal is None:
+            return self._fittest_member
+        return self._to_meal(self._fittest_member)
+
     def log_fittest_member(self) -> None:
-        fitness, member = self.highest_fitness_score, self.fittest_member
-        # Calculate the cals scale factor;
-        k = configs.goals['total_calories'] / member.num_calories
-        data = {
-            'nutrient_ratios': {},
-            'fitness': fitness,
-            'cost': member.pricetag * k,
-            'ingredient_quantities': {}
-        }
-        for nutr_name, nutr_ratio_data in member.nutrient_ratios_data.items():
-            data['nutrient_ratios'][nutr_name] = model.quantity.get_ratio_from_qty_ratio_data(nutr_ratio_data)
-        for idf_name, iq in member.ingredient_quantities_data.items():
-            data['ingredient_quantities'][model.ingredients.get_ingredient_name_from_df_name(idf_name)] = iq['quantity_in_g'] * k
-        data.update(member.persistable_data)
+        data = optimisation.create_solution_data(self.highest_fitness_score, self.fittest_meal, self._total_calories)
         self._log_fittest_member(self._generation, data)
 
     def _update_fittest_member(self, fitness, member):
@@ -104,25 +148,68 @@ class Population:
         #     data.update(member.persistable_data)
         #     self._log_fittest_member(self._generation, data)
 
-    def append(self, member: 'model.meals.SettableMeal'):
-        """Adds member to population."""
+    def append(self, member: Any, fitness: Optional[float] = None):
+        """Adds member to population, calculating its fitness unless it is provided."""
         # Prevent a member being added twice;
-        if member in self._population:
+        if member in self:
             raise ValueError("Member cannot be added to population twice.")
         # Calculate the fitness of the new member;
-        fitness = optimisation.calculate_fitness(member)[0]
+        if fitness is None:
+            fitness = self._calculate_fitness(member)[0]
         # If this is the first member, or beats the current best member, update the fittest member;
         if len(self._population) == 0 or fitness > self.highest_fitness_score:
             logging.info(f"-> New best solution: {fitness} <-")
             self._update_fittest_member(fitness, member)
-        # Add it to the population;
+        # Add it to the next free slot, growing the fitness array if it is full;
+        slot = len(self._population)
+        if slot == len(self._fitnesses):
+            self._fitnesses = numpy.concatenate([self._fitnesses, numpy.zeros(len(self._fitnesses))])
         self._population.append(member)
+        self._slots[id(member)] = slot
+        self._fitnesses[slot] = fitness
+        # Trigger the on_size_change;
+        if self._on_population_size_change is not None:
+            self._on_population_size_change(len(self._population))
+
+    def remove(self, member: Any) -> None:
+        # Move the last member into the removed member's slot;
+        slot = self._slots.pop(id(member))
+        last = self._population.pop()
+        if last is not member:
+            self._population[slot] = last
+            self._slots[id(last)] = slot
+            self._fitnesses[slot] = self._fitnesses[len(self._population)]
         # Trigger the on_size_change;
         if self._on_population_size_change is not None:
             self._on_population_size_change(len(self._population))
 
-    def remove(self, member: 'model.meals.SettableMeal') -> None:
-        self._population.remove(member)
+    def extend(self, members: List[Any], fitnesses: Optional[List[float]] = None) -> None:
+        """Adds the members to the population, calculating their fitnesses in one batch unless they are provided."""
+        if fitnesses is None:
+            fitnesses = self._calculate_fitness(*members) if len(members) else []
+        for member, fitness in zip(members, fitnesses):
+            self.append(member, fitness)
+
+    def remove_slots(self, slots: 'numpy.ndarray') -> None:
+        """Removes the members in the given slots, compacting the survivors in their original order."""
+        keep = numpy.ones(len(self._population), dtype=bool)
+        keep[slots] = False
+        num_kept = int(keep.sum())
+        self._fitnesses[:num_kept] = self._fitnesses[:len(keep)][keep]
+        self._population = [member for member, kept in zip(self._population, keep) if kept]
+        self._slots = {id(member): slot for slot, member in enumerate(self._population)}
         # Trigger the on_size_change;
         if self._on_population_size_change is not None:
             self._on_population_size_change(len(self._population))
+
+    def replace(self, member: Any, new_member: Any, fitness: float) -> None:
+        """Puts the new member into the slot held by member, with the fitness provided."""
+        if new_member in self:
+            raise ValueError("Member cannot be added to population twice.")
+        slot = self._slots.pop(id(member))
+        self._population[slot] = new_member
+        self._slots[id(new_member)] = slot
+        self._fitnesses[slot] = fitness
+        if fitness > self.highest_fitness_score:
+            logging.info(f"-> New best solution: {fitness} <-")
+            self._update_fittest_member(fitness, new_member)
@@ -0,0 +1,412 @@
+"""Resident optimisation service: an asyncio HTTP front end over a pool of warm worker processes.
+
+Routes:
+    POST /jobs                  Submits a job, and returns its id. The body is a JSON object with any of
+                                ga_configs (merged over the defaults), constraints, goals and seed.
+    GET /jobs                   Returns a summary of every job.
+    GET /jobs/<id>              Returns a summary of the job, including its result once finished.
+    GET /jobs/<id>/progress     Streams the job's progress as JSON Lines, one per generation, until it ends.
+    DELETE /jobs/<id>           Cancels the job. A running job stops at the end of its current generation,
+                                and keeps the fittest meal found so far as its result.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import optimisation
+import persistence
+from optimisation import configs
+
+ENDED_JOB_STATES = ['finished', 'cancelled', 'failed']
+REQUEST_KEYS = ['ga_configs', 'constraints', 'goals', 'seed']
+HTTP_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large'}
+
+# Per-process state, populated by warm_worker so the precalc data is loaded once per process;
+_worker: Dict[str, Any] = {}
+
+
+def warm_worker(path_into_db: str) -> None:
+    """Loads the precalc data, recipe index and recipe arrays into this process, unless already loaded.
+    Notes:
+        The service calls this before starting its pool, so workers forked from it inherit the warm caches
+        and share their memory until it is written to. Workers which are not forked load their own.
+    """
+    if _worker.get('path_into_db') == path_into_db:
+        return
+    persistence.configs.PATH_INTO_DB = path_into_db
+    _worker['recipe_arrays'] = optimisation.load_recipe_arrays()
+    persistence.get_recipe_index()
+    _worker['path_into_db'] = path_into_db
+
+
+class JobProgressPolicy(optimisation.TerminationPolicy):
+    """Wraps a termination policy, reporting each generation to the progress queue and stopping on cancellation."""
+
+    def __init__(
+            self,
+            job_id: str,
+            policy: 'optimisation.TerminationPolicy',
+            progress_queue: 'multiprocessing.Queue',
+            cancel_event: 'multiprocessing.Event'
+    ):
+        self.job_id = job_id
+        self.policy = policy
+        self.progress_queue = progress_queue
+        self.cancel_event = cancel_event
+        self.progress: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        self.policy.start()
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        self.progress = {
+            'job_id': self.job_id,
+            'generation': population.generation,
+            'fitness': population.highest_fitness_score,
+            'evaluations': num_evaluations
+        }
+        self.progress_queue.put(self.progress)
+        # Check the policy even when cancelled, so it sees every generation;
+        stop = self.policy.should_stop(population, num_evaluations)
+        return self.cancel_event.is_set() or stop
+
+
+def parse_job_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns the job request with the defaults filled in, raising ValueError if it is invalid."""
+    if not isinstance(request, dict):
+        raise ValueError("The job request must be a JSON object.")
+    unknown_keys = set(request.keys()) - set(REQUEST_KEYS)
+    if unknown_keys:
+        raise ValueError(f"Unknown job request keys: {sorted(unknown_keys)}.")
+    ga_configs = request.get('ga_configs', {})
+    if not isinstance(ga_configs, dict):
+        raise ValueError("ga_configs must be a JSON object.")
+    seed = request.get('seed')
+    if seed is not None and not isinstance(seed, int):
+        raise ValueError("seed must be an integer.")
+    return {
+        'ga_configs': {**configs.ga_configs, **ga_configs},
+        'constraints': request.get('constraints', configs.constraints),
+        'goals': request.get('goals', configs.goals),
+        'seed': seed
+    }
+
+
+def run_job(
+        job_id: str,
+        request: Dict[str, Any],
+        progress_queue: 'multiprocessing.Queue',
+        cancel_event: 'multiprocessing.Event',
+        path_into_db: str
+) -> Dict[str, Any]:
+    """Runs the job in a worker process, and returns its result."""
+    warm_worker(path_into_db)
+    policy = JobProgressPolicy(job_id, optimisation.build_termination_policy(request['ga_configs']), progress_queue,
+                               cancel_event)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        meal = optimisation.main.run(
+            ga_configs=request['ga_configs'],
+            constraints=request['constraints'],
+            goals=request['goals'],
+            history_filepath=os.path.join(tmp_dir, 'history.jsonl'),
+            seed=request['seed'],
+            termination=policy,
+            recipe_arrays=_worker['recipe_arrays']
+        )
+    return {
+        'meal': meal.persistable_data,
+        'fitness': policy.progress['fitness'],
+        'generation': policy.progress['generation'],
+        'evaluations': policy.progress['evaluations'],
+        'cancelled': cancel_event.is_set()
+    }
+
+
+class Job:
+    """Tracks a job submitted to the service."""
+
+    def __init__(self, job_id: str, request: Dict[str, Any], cancel_event: 'multiprocessing.Event'):
+        self.job_id = job_id
+        self.request = request
+        self.cancel_event = cancel_event
+        self.state: str = 'queued'
+        self.progress: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.executor_future: Optional['Future'] = None
+        self.future: Optional['asyncio.Future'] = None
+        self.changed = asyncio.Condition()
+
+    @property
+    def ended(self) -> bool:
+        """Returns True if the job has finished, been cancelled, or failed."""
+        return self.state in ENDED_JOB_STATES
+
+    @property
+    def summary(self) -> Dict[str, Any]:
+        """Returns the job's state, latest progress and result, for the API."""
+        return {
+            'job_id': self.job_id,
+            'state': self.state,
+            'progress': self.progress[-1] if self.progress else None,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+class OptimisationService:
+    """Accepts optimisation jobs over HTTP, and runs them in a pool of worker processes.
+    Notes:
+        The caches are warmed in this process before the pool starts, so forked workers begin warm. Workers
+        report each generation through a shared queue, which a relay thread feeds back onto the event loop.
+    """
+
+    def __init__(
+            self,
+            num_workers: Optional[int] = configs.service_configs['num_workers'],
+            path_into_db: Optional[str] = None,
+            max_ended_jobs: int = configs.service_configs['max_ended_jobs'],
+            executor: Optional['Executor'] = None,
+            job_runner: Callable[..., Dict[str, Any]] = run_job
+    ):
+        """
+        Args:
+            num_workers: Number of worker processes. Defaults to the number of CPUs.
+            path_into_db: Database to load. Defaults to persistence.configs.PATH_INTO_DB.
+            max_ended_jobs: Number of ended jobs to keep; the oldest are forgotten first.
+            executor: Executor to run the jobs on, in place of the service's own process pool.
+            job_runner: Runs a job, with the same signature as run_job.
+        """
+        self.num_workers = num_workers
+        self.path_into_db = persistence.configs.PATH_INTO_DB if path_into_db is None else path_into_db
+        self.max_ended_jobs = max_ended_jobs
+        self.jobs: Dict[str, 'Job'] = {}
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._job_runner = job_runner
+        self._manager: Optional['multiprocessing.managers.SyncManager'] = None
+        self._progress_queue: Optional['multiprocessing.Queue'] = None
+        self._relay_thread: Optional[threading.Thread] = None
+        self._loop: Optional['asyncio.AbstractEventLoop'] = None
+
+    async def start(self) -> None:
+        """Warms the caches, then starts the worker pool and the progress relay."""
+        self._loop = asyncio.get_running_loop()
+        if self._owns_executor:
+            logging.info("Warming caches.")
+            warm_worker(self.path_into_db)
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+            # Start the workers now, rather than on the first job, so they are not forked holding a client socket;
+            await self._loop.run_in_executor(self._executor, warm_worker, self.path_into_db)
+        self._manager = multiprocessing.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._relay_thread = threading.Thread(target=self._relay_progress, daemon=True)
+        self._relay_thread.start()
+
+    async def close(self) -> None:
+        """Cancels any unfinished jobs, and shuts down the worker pool and the progress relay."""
+        for job in self.jobs.values():
+            if not job.ended:
+                self.cancel(job.job_id)
+        pending = [job.future for job in self.jobs.values() if job.future is not None and not job.future.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._progress_queue.put(None)
+        await self._loop.run_in_executor(None, self._relay_thread.join)
+        if self._owns_executor:
+            self._executor.shutdown()
+        self._manager.shutdown()
+
+    def _relay_progress(self) -> None:
+        """Moves progress records from the workers onto the event loop, until sent None."""
+        while True:
+            record = self._progress_queue.get()
+            if record is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_progress, record)
+
+    def _on_progress(self, record: Dict[str, Any]) -> None:
+        job = self.jobs.get(record['job_id'])
+        if job is None or job.ended:
+            return
+        job.state = 'running'
+        job.progress.append(record)
+        self._loop.create_task(self._notify(job))
+
+    async def _notify(self, job: 'Job') -> None:
+        async with job.changed:
+            job.changed.notify_all()
+
+    def submit(self, request: Dict[str, Any]) -> 'Job':
+        """Queues the job, raising ValueError if the request is invalid."""
+        job = Job(str(uuid.uuid4()), parse_job_request(request), self._manager.Event())
+        self.jobs[job.job_id] = job
+        job.executor_future = self._executor.submit(
+            self._job_runner, job.job_id, job.request, self._progress_queue, job.cancel_event, self.path_into_db)
+        job.future = asyncio.wrap_future(job.executor_future)
+        job.future.add_done_callback(lambda future: self._on_job_done(job, future))
+        logging.info(f"Job {job.job_id} queued.")
+        return job
+
+    def _on_job_done(self, job: 'Job', future: 'asyncio.Future') -> None:
+        if future.cancelled():
+            job.state = 'cancelled'
+        elif future.exception() is not None:
+            job.state = 'failed'
+            job.error = repr(future.exception())
+        else:
+            job.result = future.result()
+            job.state = 'cancelled' if job.result['cancelled'] else 'finished'
+            # The relay can lag behind the result, so make sure the final generation is in the progress;
+            if not job.progress or job.progress[-1]['generation'] < job.result['generation']:
+                job.progress.append({'job_id': job.job_id, 'generation': job.result['generation'],
+                                     'fitness': job.result['fitness'], 'evaluations': job.result['evaluations']})
+        logging.info(f"Job {job.job_id} {job.state}.")
+        self._loop.create_task(self._notify(job))
+        self._forget_ended_jobs()
+
+    def _forget_ended_jobs(self) -> None:
+        ended = [job_id for job_id, job in self.jobs.items() if job.ended]
+        for job_id in ended[:max(len(ended) - self.max_ended_jobs, 0)]:
+            del self.jobs[job_id]
+
+    def cancel(self, job_id: str) -> 'Job':
+        """Cancels the job, raising KeyError if there is no such job."""
+        job = self.jobs[job_id]
+        job.cancel_event.set()
+        # Only succeeds if no worker has picked the job up yet, otherwise the worker sees the cancel event;
+        job.executor_future.cancel()
+        return job
+
+    async def stream_progress(self, job_id: str):
+        """Yields each progress record of the job as it arrives, until the job ends."""
+        job = self.jobs[job_id]
+        num_sent = 0
+        while True:
+            async with job.changed:
+                await job.changed.wait_for(lambda: len(job.progress) > num_sent or job.ended)
+            for record in job.progress[num_sent:]:
+                yield record
+            num_sent = len(job.progress)
+            if job.ended:
+                return
+
+    async def handle_request(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Routes a request, and returns the status code and the JSON response, or an async iterator to stream."""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if len(parts) == 0 or parts[0] != 'jobs' or len(parts) > 3 or (len(parts) == 3 and parts[2] != 'progress'):
+            return 404, {'error': f"No route for {path}."}
+        if len(parts) == 1:
+            if method == 'GET':
+                return 200, [job.summary for job in self.jobs.values()]
+            if method == 'POST':
+                try:
+                    job = self.submit(json.loads(body or b'{}'))
+                except ValueError as err:
+                    return 400, {'error': str(err)}
+                return 202, job.summary
+            return 405, {'error': f"{method} is not allowed on {path}."}
+        if parts[1] not in self.jobs:
+            return 404, {'error': f"No job {parts[1]}."}
+        if len(parts) == 3:
+            if method != 'GET':
+                return 405, {'error': f"{method} is not allowed on {path}."}
+            return 200, self.stream_progress(parts[1])
+        if method == 'GET':
+            return 200, self.jobs[parts[1]].summary
+        if method == 'DELETE':
+            return 202, self.cancel(parts[1]).summary
+        return 405, {'error': f"{method} is not allowed on {path}."}
+
+    async def _handle_connection(self, reader: 'asyncio.StreamReader', writer: 'asyncio.StreamWriter') -> None:
+        """Serves one HTTP request on the connection, then closes it."""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            content_length = _parse_content_length(headers.get('content-length', '0'))
+            if len(request_line) != 3:
+                status, response = 400, {'error': "Malformed request line."}
+            elif content_length is None:
+                status, response = 400, {'error': "Malformed Content-Length header."}
+            elif content_length > configs.service_configs['max_request_bytes']:
+                status, response = 413, {'error': "Request body too large."}
+            else:
+                body = await reader.readexactly(content_length)
+                status, response = await self.handle_request(request_line[0].upper(), request_line[1], body)
+
+            # Stream iterators as JSON Lines, with the body ending when the connection closes;
+            if hasattr(response, '__aiter__'):
+                writer.write(_get_response_head(status, 'application/x-ndjson'))
+                async for record in response:
+                    writer.write(json.dumps(record).encode() + b'\n')
+                    await writer.drain()
+            else:
+                payload = json.dumps(response).encode()
+                writer.write(_get_response_head(status, 'application/json', len(payload)) + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(
+            self,
+            host: str = configs.service_configs['host'],
+            port: int = configs.service_configs['port'],
+            unix_socket_path: Optional[str] = None
+    ) -> None:
+        """Starts the service, and serves requests until cancelled, on a Unix socket if a path is given."""
+        await self.start()
+        try:
+            if unix_socket_path is not None:
+                server = await asyncio.start_unix_server(self._handle_connection, path=unix_socket_path)
+                logging.info(f"Serving on {unix_socket_path}.")
+            else:
+                server = await asyncio.start_server(self._handle_connection, host=host, port=port)
+                logging.info(f"Serving on http://{host}:{port}.")
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+
+def _parse_content_length(value: str) -> Optional[int]:
+    """Returns the Content-Length header value as a number of bytes, or None if it isn't a non-negative integer."""
+    try:
+        content_length = int(value)
+    except ValueError:
+        return None
+    return content_length if content_length >= 0 else None
+
+
+def _get_response_head(status: int, content_type: str, content_length: Optional[int] = None) -> bytes:
+    """Returns the status line and headers of a response."""
+    head = f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\nContent-Type: {content_type}\r\nConnection: close\r\n"
+    if content_length is not None:
+        head += f"Content-Length: {content_length}\r\n"
+    return (head + "\r\n").encode('latin-1')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s: %(message)s'
+    )
+    try:
+        asyncio.run(OptimisationService().serve(unix_socket_path=configs.service_configs['unix_socket_path']))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,159 @@
+"""Archive of the fittest solutions from finished runs, used to warm start runs on similar goals."""
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Any, Optional, TypedDict
+
+import numpy
+
+import model
+import optimisation
+from optimisation import configs
+
+# Smallest calories or max cost logged in a goal vector, so zero goals can still be compared;
+MIN_LOGGED_GOAL = 1e-3
+
+
+class ArchivedSolution(TypedDict):
+    """A solution, held by recipe datafile name so it survives changes to the recipe arrays."""
+    recipe_df_names: List[str]
+    quantities_g: List[float]
+    fitness: float
+
+
+class ArchiveEntry(TypedDict):
+    """The fittest solutions found for one set of tags and goals."""
+    tags: List[str]
+    goal_vector: Dict[str, float]
+    solutions: List[ArchivedSolution]
+
+
+def get_goal_vector(constraints: Dict[str, Any], goals: Dict[str, Any]) -> Dict[str, float]:
+    """Returns the goals and flags as a vector of comparable components, keyed by component name.
+    Notes:
+        Target ratios are already on a 0-1 scale. Calories and max cost are logged, so a difference between
+        them is a relative one. They are raised to MIN_LOGGED_GOAL first, since a max cost of zero is allowed.
+        Flags are 1 if required, 0 if forbidden and omitted if not set.
+    """
+    goal_vector = {}
+    for nutr_name, target_ratio in goals['target_nutrient_ratios'].items():
+        goal_vector[f"ratio:{model.nutrients.get_nutrient_primary_name(nutr_name)}"] = float(target_ratio)
+    goal_vector['log_total_calories'] = math.log(max(goals['total_calories'], MIN_LOGGED_GOAL))
+    goal_vector['log_max_cost'] = math.log(max(goals['max_cost'], MIN_LOGGED_GOAL))
+    for flag_name, flag_value in constraints['flags'].items():
+        if flag_value is not None:
+            goal_vector[f"flag:{flag_name}"] = float(flag_value)
+    return goal_vector
+
+
+def get_goal_distance(goal_vector_1: Dict[str, float], goal_vector_2: Dict[str, float]) -> float:
+    """Returns the Euclidean distance between two goal vectors, treating missing components as zero."""
+    components = set(goal_vector_1.keys()) | set(goal_vector_2.keys())
+    return math.sqrt(sum((goal_vector_1.get(c, 0) - goal_vector_2.get(c, 0)) ** 2 for c in components))
+
+
+def _get_entry_key(tags: List[str], goal_vector: Dict[str, float]) -> str:
+    """Returns the key of the archive entry for the tags and goal vector."""
+    return json.dumps({'tags': tags, 'goal_vector': goal_vector}, sort_keys=True)
+
+
+class SolutionArchive:
+    """Stores the fittest genomes of finished runs in a JSON file, keyed by their tags and goal vector.
+    Notes:
+        Genomes only make sense for the tags they were created for, since each slot holds a recipe for one
+        tag, so runs are only warm started from entries with the same tags. Archived recipes which have
+        since been deleted, or which the new constraints rule out, are skipped when seeding.
+    """
+
+    def __init__(
+            self,
+            filepath: str = configs.archive_configs['path'],
+            max_solutions: int = configs.archive_configs['max_solutions']
+    ):
+        self.filepath = filepath
+        self.max_solutions = max_solutions
+        self._entries: Dict[str, 'ArchiveEntry'] = {}
+        if os.path.exists(self.filepath):
+            with open(self.filepath, 'r') as fh:
+                self._entries = json.load(fh)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Writes the archive to its file, replacing the file only once the write has finished."""
+        tmp_filepath = f"{self.filepath}.tmp"
+        with open(tmp_filepath, 'w') as fh:
+            json.dump(self._entries, fh, indent=2, sort_keys=True)
+        os.replace(tmp_filepath, self.filepath)
+
+    def add(
+            self,
+            constraints: Dict[str, Any],
+            goals: Dict[str, Any],
+            genomes: List['optimisation.Genome'],
+            fitnesses: List[float],
+            recipe_arrays: 'optimisation.RecipeArrays'
+    ) -> None:
+        """Adds the genomes to the entry for the constraints and goals, keeping only the fittest solutions."""
+        goal_vector = get_goal_vector(constraints, goals)
+        entry = self._entries.setdefault(_get_entry_key(constraints['tags'], goal_vector), ArchiveEntry(
+            tags=list(constraints['tags']), goal_vector=goal_vector, solutions=[]))
+        solutions = {(tuple(s['recipe_df_names']), tuple(s['quantities_g'])): s for s in entry['solutions']}
+        for genome, fitness in zip(genomes, fitnesses):
+            solution = ArchivedSolution(
+                recipe_df_names=[recipe_arrays.df_names[recipe_id] for recipe_id in genome.recipe_ids],
+                quantities_g=genome.quantities_g.tolist(),
+                fitness=float(fitness)
+            )
+            solutions[(tuple(solution['recipe_df_names']), tuple(solution['quantities_g']))] = solution
+        entry['solutions'] = sorted(solutions.values(), key=lambda s: s['fitness'], reverse=True)[:self.max_solutions]
+
+    def get_nearest_entry(self, constraints: Dict[str, Any], goals: Dict[str, Any]) -> Optional['ArchiveEntry']:
+        """Returns the entry with the same tags and the nearest goal vector, or None if there are none."""
+        goal_vector = get_goal_vector(constraints, goals)
+        entries = [entry for entry in self._entries.values() if entry['tags'] == list(constraints['tags'])]
+        if len(entries) == 0:
+            return None
+        return min(entries, key=lambda entry: get_goal_distance(entry['goal_vector'], goal_vector))
+
+    def get_seed_genomes(
+            self,
+            constraints: Dict[str, Any],
+            goals: Dict[str, Any],
+            recipe_arrays: 'optimisation.RecipeArrays',
+            candidate_recipe_ids: List['numpy.ndarray'],
+            num_genomes: int,
+            rng: 'numpy.random.Generator'
+    ) -> List['optimisation.Genome']:
+        """Returns up to num_genomes genomes to seed a population, from the entry nearest the goals.
+        The archived solutions are used fittest first, and once each has been used the rest are mutated copies
+        of them. No genomes are returned if no archived solution is still valid for the constraints.
+        """
+        entry = self.get_nearest_entry(constraints, goals)
+        if entry is None:
+            return []
+
+        # Keep the solutions whose recipes still exist, and can still fill their slots;
+        archived = []
+        for solution in entry['solutions']:
+            if not all(df_name in recipe_arrays.recipe_ids for df_name in solution['recipe_df_names']):
+                continue
+            recipe_ids = numpy.array([recipe_arrays.recipe_ids[df_name] for df_name in solution['recipe_df_names']],
+                                     dtype=numpy.intp)
+            if all(numpy.isin(recipe_id, candidates) for recipe_id, candidates in
+                   zip(recipe_ids, candidate_recipe_ids)):
+                archived.append(optimisation.Genome(recipe_ids=recipe_ids, quantities_g=solution['quantities_g']))
+        if len(archived) == 0:
+            return []
+
+        genomes = []
+        for i in range(num_genomes):
+            source = archived[i % len(archived)]
+            genome = optimisation.Genome(recipe_ids=source.recipe_ids.copy(), quantities_g=source.quantities_g.copy())
+            if i >= len(archived):
+                optimisation.mutate_genome(genome, recipe_arrays, rng)
+            genomes.append(genome)
+        logging.info(f"Seeded {len(genomes)} members from {len(archived)} archived solutions.")
+        return genomes
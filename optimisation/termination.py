@@ -0,0 +1,142 @@
+"""Termination policies, deciding when an optimisation run should stop."""
+import abc
+import logging
+import time
+from typing import Optional, Dict, Any, Callable
+
+import optimisation
+
+
+class TerminationPolicy(abc.ABC):
+    """Abstract base class for termination policies, which are checked once per generation."""
+
+    def start(self) -> None:
+        """Called when the run starts, before the initial population is created."""
+        pass
+
+    @abc.abstractmethod
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        """Returns True/False to indicate if the run should stop."""
+        raise NotImplementedError
+
+
+class MaxGenerations(TerminationPolicy):
+    """Stops once the population reaches the generation."""
+
+    def __init__(self, max_generations: int):
+        self.max_generations = max_generations
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        return population.generation >= self.max_generations
+
+
+class WallClockDeadline(TerminationPolicy):
+    """Stops once the time since the run started exceeds the deadline."""
+
+    def __init__(self, max_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_seconds = max_seconds
+        self._clock = clock
+        self._start_time: Optional[float] = None
+
+    def start(self) -> None:
+        self._start_time = self._clock()
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        if self._start_time is None:
+            self.start()
+        return self._clock() - self._start_time >= self.max_seconds
+
+
+class StallDetection(TerminationPolicy):
+    """Stops once the highest fitness score has not improved for a number of generations."""
+
+    def __init__(self, num_generations: int, min_improvement: float = 0):
+        self.num_generations = num_generations
+        self.min_improvement = min_improvement
+        self._best_fitness: Optional[float] = None
+        self._best_generation: Optional[int] = None
+
+    def start(self) -> None:
+        self._best_fitness = None
+        self._best_generation = None
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        if self._best_fitness is None or \
+                population.highest_fitness_score > self._best_fitness + self.min_improvement:
+            self._best_fitness = population.highest_fitness_score
+            self._best_generation = population.generation
+        return population.generation - self._best_generation >= self.num_generations
+
+
+class TargetFitness(TerminationPolicy):
+    """Stops once the highest fitness score reaches the target."""
+
+    def __init__(self, target_fitness: float):
+        self.target_fitness = target_fitness
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        return population.highest_fitness_score >= self.target_fitness
+
+
+class EvaluationBudget(TerminationPolicy):
+    """Stops once the number of fitness evaluations reaches the budget."""
+
+    def __init__(self, max_evaluations: int):
+        self.max_evaluations = max_evaluations
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        return num_evaluations >= self.max_evaluations
+
+
+class AnyOf(TerminationPolicy):
+    """Stops once any of the policies would stop."""
+
+    def __init__(self, *policies: 'TerminationPolicy'):
+        self.policies = policies
+
+    def start(self) -> None:
+        for policy in self.policies:
+            policy.start()
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        # Check every policy, so each sees every generation;
+        stops = [policy.should_stop(population, num_evaluations) for policy in self.policies]
+        for policy, stop in zip(self.policies, stops):
+            if stop:
+                logging.info(f"Stopping: {policy.__class__.__name__} reached.")
+        return any(stops)
+
+
+class AllOf(TerminationPolicy):
+    """Stops once all of the policies would stop."""
+
+    def __init__(self, *policies: 'TerminationPolicy'):
+        self.policies = policies
+
+    def start(self) -> None:
+        for policy in self.policies:
+            policy.start()
+
+    def should_stop(self, population: 'optimisation.Population', num_evaluations: int) -> bool:
+        stops = [policy.should_stop(population, num_evaluations) for policy in self.policies]
+        return all(stops)
+
+
+def build_termination_policy(ga_configs: Dict[str, Any]) -> 'TerminationPolicy':
+    """Returns a policy which stops when any of the limits set in the ga configs is reached.
+    max_generations is required; target_fitness, max_seconds, stall_generations and max_evaluations
+    are each skipped if missing or None.
+    Notes:
+        acceptable_fitness is not a stopping limit, so configs which set it still run for max_generations,
+        and every run of them has the same length. Set target_fitness to stop once the fitness is reached.
+    """
+    policies = [MaxGenerations(ga_configs['max_generations'])]
+    if ga_configs.get('target_fitness') is not None:
+        policies.append(TargetFitness(ga_configs['target_fitness']))
+    if ga_configs.get('max_seconds') is not None:
+        policies.append(WallClockDeadline(ga_configs['max_seconds']))
+    if ga_configs.get('stall_generations') is not None:
+        policies.append(StallDetection(ga_configs['stall_generations']))
+    if ga_configs.get('max_evaluations') is not None:
+        policies.append(EvaluationBudget(ga_configs['max_evaluations']))
+    return AnyOf(*policies)
@@ -4,7 +4,9 @@ from .main import (
     load_instance,
     load_datafile,
     read_index,
+    read_reverse_index,
     delete_instances,
+    batch_writes,
     check_unique_value_available,
     count_saved_instances,
     search_for_unique_values,
@@ -12,12 +14,18 @@ from .main import (
     get_unique_value_from_datafile_name,
     get_datafile_name_for_unique_value,
     get_precalc_data_for_recipe,
+    get_precalc_data_for_recipes,
     get_recipe_df_names_by_tag,
     get_recipe_df_names_by_flag,
     cache
 )
+from .backends import StorageBackend, JSONBackend, SQLiteBackend, get_backend, import_json_database
+from .precalc_store import PrecalcStore, write_precalc_store, get_precalc_store, rebuild_precalc_store
+from . import precalc_maintenance
+from .recipe_index import RecipeIndex, get_recipe_index, query_recipe_df_names
 from .supports_persistence import (
     YieldsPersistableData,
+    YieldsPrecalcData,
     CanLoadData,
     SupportsPersistence
 )
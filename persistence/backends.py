@@ -0,0 +1,232 @@
+"""Storage backends, holding the index and datafiles of each persistable class.
+Each class' collection is identified by its path into the database (cls.get_path_into_db()).
+"""
+import abc
+import contextlib
+import json
+import os
+import sqlite3
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+
+import persistence
+
+
+class StorageBackend(abc.ABC):
+    """ABC for the storage underneath the persistence API."""
+
+    @abc.abstractmethod
+    def read_index(self, db_path: str) -> Dict[str, str]:
+        """Returns the collection's unique values, keyed by datafile name."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read_datafile(self, db_path: str, datafile_name: str) -> Dict[str, Any]:
+        """Returns the data saved in the named datafile."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def write_datafile(self, db_path: str, datafile_name: str, unique_value: str, data: Dict[str, Any]) -> None:
+        """Creates or overwrites the named datafile, with its index entry."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_datafile(self, db_path: str, datafile_name: str) -> None:
+        """Deletes the named datafile, with its index entry."""
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        """Groups the writes made inside the block; by default, each write is applied as it is made."""
+        yield
+
+
+class JSONBackend(StorageBackend):
+    """Stores each datafile as a json file in its collection's directory, alongside an index.json.
+    Notes:
+        The backend keeps its own copy of each index it has read. The index file is rewritten in full
+        after each write, or once per collection at the end of a batch.
+    """
+
+    def __init__(self):
+        self._batch_depth = 0
+        self._indexes: Dict[str, Dict[str, str]] = {}
+        self._unwritten_indexes: Set[str] = set()
+
+    def read_index(self, db_path: str) -> Dict[str, str]:
+        return dict(self._get_index(db_path))
+
+    def read_datafile(self, db_path: str, datafile_name: str) -> Dict[str, Any]:
+        return _read_json(f"{db_path}/{datafile_name}.json")
+
+    def write_datafile(self, db_path: str, datafile_name: str, unique_value: str, data: Dict[str, Any]) -> None:
+        _write_json(f"{db_path}/{datafile_name}.json", data)
+        self._get_index(db_path)[datafile_name] = unique_value
+        self._write_index(db_path)
+
+    def delete_datafile(self, db_path: str, datafile_name: str) -> None:
+        self._get_index(db_path).pop(datafile_name, None)
+        self._write_index(db_path)
+        os.remove(f"{db_path}/{datafile_name}.json")
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                for db_path in self._unwritten_indexes:
+                    _write_json(f"{db_path}/index.json", self._indexes[db_path])
+                self._unwritten_indexes = set()
+
+    def _get_index(self, db_path: str) -> Dict[str, str]:
+        """Returns the backend's copy of the collection's index, reading it on first use."""
+        if db_path not in self._indexes:
+            self._indexes[db_path] = _read_json(f"{db_path}/index.json")
+        return self._indexes[db_path]
+
+    def _write_index(self, db_path: str) -> None:
+        """Writes the collection's index, or holds it until the end of the batch."""
+        if self._batch_depth > 0:
+            self._unwritten_indexes.add(db_path)
+        else:
+            _write_json(f"{db_path}/index.json", self._indexes[db_path])
+
+
+class SQLiteBackend(StorageBackend):
+    """Stores every collection in a single SQLite database, one row per datafile.
+    Notes:
+        Rows are keyed by collection and datafile name, with a unique index over the collection and
+        unique value. Outside a batch each write commits on its own; a batch is a single transaction,
+        and if it fails, it is rolled back and the persistence cache is reset to match the database.
+    """
+
+    def __init__(self, filepath: Optional[str] = None):
+        self.filepath = filepath
+        self._batch_depth = 0
+        self._connections: Dict[Tuple[int, str], 'sqlite3.Connection'] = {}
+
+    @property
+    def connection(self) -> 'sqlite3.Connection':
+        """Returns this process' connection to the database, creating the table on first use."""
+        filepath = self.filepath if self.filepath is not None else \
+            f"{persistence.configs.PATH_INTO_DB}/{persistence.configs.SQLITE_DB_FILENAME}"
+        # Connections can't be shared with forked worker processes;
+        key = (os.getpid(), filepath)
+        if key not in self._connections:
+            connection = sqlite3.connect(filepath, isolation_level=None)
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS datafiles ("
+                "collection TEXT NOT NULL, datafile_name TEXT NOT NULL, unique_value TEXT NOT NULL, "
+                "data TEXT NOT NULL, PRIMARY KEY (collection, datafile_name))")
+            connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS datafiles_unique_value ON datafiles (collection, unique_value)")
+            self._connections[key] = connection
+        return self._connections[key]
+
+    def read_index(self, db_path: str) -> Dict[str, str]:
+        rows = self.connection.execute(
+            "SELECT datafile_name, unique_value FROM datafiles WHERE collection = ?", (get_collection(db_path),))
+        return dict(rows.fetchall())
+
+    def read_datafile(self, db_path: str, datafile_name: str) -> Dict[str, Any]:
+        row = self.connection.execute(
+            "SELECT data FROM datafiles WHERE collection = ? AND datafile_name = ?",
+            (get_collection(db_path), datafile_name)).fetchone()
+        if row is None:
+            raise persistence.exceptions.DatafileNotFoundError(missing_datafile_name=datafile_name)
+        return json.loads(row[0])
+
+    def write_datafile(self, db_path: str, datafile_name: str, unique_value: str, data: Dict[str, Any]) -> None:
+        self.connection.execute(
+            "INSERT INTO datafiles (collection, datafile_name, unique_value, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (collection, datafile_name) DO UPDATE SET unique_value = excluded.unique_value, "
+            "data = excluded.data",
+            (get_collection(db_path), datafile_name, unique_value, json.dumps(data, sort_keys=True)))
+
+    def delete_datafile(self, db_path: str, datafile_name: str) -> None:
+        self.connection.execute(
+            "DELETE FROM datafiles WHERE collection = ? AND datafile_name = ?",
+            (get_collection(db_path), datafile_name))
+
+    @contextlib.contextmanager
+    def batch(self) -> Iterator[None]:
+        connection = self.connection
+        if self._batch_depth == 0:
+            connection.execute("BEGIN")
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                connection.execute("ROLLBACK")
+                persistence.cache.reset()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """Closes this process' connections."""
+        for (pid, filepath), connection in list(self._connections.items()):
+            if pid == os.getpid():
+                connection.close()
+                del self._connections[(pid, filepath)]
+
+
+backends = {
+    'json': JSONBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def get_backend() -> 'StorageBackend':
+    """Returns the storage backend named in the configs, creating it on first use."""
+    backend_cls = backends[persistence.configs.STORAGE_BACKEND]
+    if not isinstance(persistence.cache.backend, backend_cls):
+        persistence.cache.backend = backend_cls()
+    return persistence.cache.backend
+
+
+def get_collection(db_path: str) -> str:
+    """Returns the name of the collection stored at the path into the database, e.g. 'recipes'."""
+    return os.path.basename(os.path.normpath(db_path))
+
+
+def import_json_database(path_into_db: str, sqlite_filepath: Optional[str] = None) -> int:
+    """Copies every collection under the json database directory into the SQLite database, in one transaction,
+    and returns the number of datafiles imported.
+    Notes:
+        A collection is any directory containing an index.json. The SQLite database defaults to the
+        configured filename inside the json database directory.
+    """
+    if sqlite_filepath is None:
+        sqlite_filepath = f"{path_into_db}/{persistence.configs.SQLITE_DB_FILENAME}"
+    source = JSONBackend()
+    target = SQLiteBackend(filepath=sqlite_filepath)
+    num_imported = 0
+    try:
+        with target.batch():
+            for entry in sorted(os.scandir(path_into_db), key=lambda e: e.name):
+                if not entry.is_dir() or not os.path.exists(f"{entry.path}/index.json"):
+                    continue
+                for df_name, unique_value in source.read_index(entry.path).items():
+                    target.write_datafile(entry.path, df_name, unique_value, source.read_datafile(entry.path, df_name))
+                    num_imported += 1
+    finally:
+        target.close()
+    return num_imported
+
+
+def _read_json(filepath: str) -> Dict[str, Any]:
+    """Returns the data in the specified file as json."""
+    with open(filepath, 'r') as fh:
+        return json.loads(fh.read())
+
+
+def _write_json(filepath: str, data: Dict[str, Any]) -> None:
+    """Writes the data to the specified file as json."""
+    with open(filepath, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
@@ -1,2 +1,7 @@
 # _path_into_db = 'C:/Users/james.izzard/Dropbox/pydiet_database' # Real database
 PATH_INTO_DB = 'C:/Users/james.izzard/Dropbox/pydiet/database'  # Dev database
+STORAGE_BACKEND = 'json'  # One of 'json' or 'sqlite', see persistence.backends
+SQLITE_DB_FILENAME = 'pydiet.sqlite3'  # Inside PATH_INTO_DB, for the sqlite backend
+PRECALC_STORE_FILENAME = 'recipes.precalc'  # Inside PATH_INTO_DB/precalc_data, see persistence.precalc_store
+PRECALC_JOURNAL_FILENAME = 'recipes_journal.jsonl'  # Inside PATH_INTO_DB/precalc_data, see persistence.precalc_maintenance
+PRECALC_JOURNAL_MAX_ENTRIES = 1000  # Changes journaled before the precalc files are rewritten
@@ -1,10 +1,10 @@
 """Data persistence functionality."""
+import contextlib
 import json
-import os
 import uuid
 from difflib import SequenceMatcher
 from heapq import nlargest
-from typing import Dict, List, Any, TypeVar, Type, Optional
+from typing import Dict, List, Any, TypeVar, Type, Optional, Iterator
 
 import persistence
 
@@ -17,15 +17,25 @@ class Cache:
     def __init__(self):
         self.datafiles: Dict[str, Dict] = {}
         self.indexes: Dict[str, Dict] = {}
+        self.reverse_indexes: Dict[str, Dict] = {}
+        self.unique_value_counts: Dict[str, Dict[str, int]] = {}
         self.recipe_precalc_data: Dict[str, Dict] = {}
         self.recipes_by_tag: Dict[str, str] = {}
+        self.recipe_index: Optional['persistence.RecipeIndex'] = None
+        self.backend: Optional['persistence.StorageBackend'] = None
+        self.precalc_store: Optional['persistence.PrecalcStore'] = None
 
     def reset(self):
         """Reset all caches to empty."""
         self.datafiles = {}
         self.indexes = {}
+        self.reverse_indexes = {}
+        self.unique_value_counts = {}
         self.recipe_precalc_data = {}
         self.recipes_by_tag = {}
+        self.recipe_index = None
+        self.backend = None
+        self.precalc_store = None
 
 
 cache = Cache()
@@ -33,34 +43,41 @@ cache = Cache()
 
 def get_recipe_df_names_by_flag(flag_name:str, flag_value:bool) -> List[str]:
     """Returns a list of recipe datafile names corresponding to the flag name/values."""
-    names = []
-    for df_name, precalc_data in get_precalc_data_for_recipes().items():
-        if precalc_data['flag_data'][flag_name] == flag_value:
-            names.append(df_name)
-    return names
+    return persistence.query_recipe_df_names(flags={flag_name: flag_value})
+
+
+def get_recipes_by_tag() -> Dict[str, List[str]]:
+    """Returns a dict of recipe datafile names, keyed by tag."""
+    if cache.recipes_by_tag == {}:
+        _load_precalc_data()
+    return cache.recipes_by_tag
 
 
 def get_recipe_df_names_by_tag(tag: str) -> List[str]:
     """Returns a list of recipe datafile names corresponding to the specified tag."""
-    if cache.recipes_by_tag == {}:
-        cache.recipes_by_tag = _read_datafile(f"{persistence.configs.PATH_INTO_DB}/precalc_data/recipes_by_tag.json")
-    return cache.recipes_by_tag[tag]
+    return get_recipes_by_tag()[tag]
 
 
 def get_precalc_data_for_recipe(datafile_name: str) -> Dict[str, Any]:
     """Gets the precalc data for the named recipe."""
-    if cache.recipe_precalc_data == {}:
-        cache.recipe_precalc_data = _read_datafile(f"{persistence.configs.PATH_INTO_DB}/precalc_data/recipes.json")
-    return cache.recipe_precalc_data[datafile_name]
+    return get_precalc_data_for_recipes()[datafile_name]
 
 
 def get_precalc_data_for_recipes() -> Dict[str, Any]:
     """Returns all precalc data for the recipes."""
     if cache.recipe_precalc_data == {}:
-        cache.recipe_precalc_data = _read_datafile(f"{persistence.configs.PATH_INTO_DB}/precalc_data/recipes.json")
+        _load_precalc_data()
     return cache.recipe_precalc_data
 
 
+def _load_precalc_data() -> None:
+    """Reads the recipe precalc data and recipes by tag into the cache, with the changes in the journal."""
+    precalc_dirpath = f"{persistence.configs.PATH_INTO_DB}/precalc_data"
+    cache.recipe_precalc_data = _read_datafile(f"{precalc_dirpath}/recipes.json")
+    cache.recipes_by_tag = _read_datafile(f"{precalc_dirpath}/recipes_by_tag.json")
+    persistence.precalc_maintenance.replay_journal()
+
+
 def save_instance(subject: 'persistence.SupportsPersistence') -> None:
     """Saves the subject."""
 
@@ -74,6 +91,9 @@ def save_instance(subject: 'persistence.SupportsPersistence') -> None:
             subject.unique_value
         )
 
+    # Work out its precalc data before writing anything;
+    precalc_data = subject.precalc_data if isinstance(subject, persistence.YieldsPrecalcData) else None
+
     # If exists already, we are updating;
     if subject.datafile_name_is_defined:
         _update_datafile(subject)
@@ -81,6 +101,12 @@ def save_instance(subject: 'persistence.SupportsPersistence') -> None:
     else:
         _create_datafile(subject)
 
+    # Bring its precalc data up to date, dropping any old record if the data is incomplete;
+    if precalc_data is not None:
+        persistence.precalc_maintenance.update_precalc_data(subject.datafile_name, precalc_data)
+    elif isinstance(subject, persistence.YieldsPrecalcData):
+        persistence.precalc_maintenance.remove_precalc_data(subject.datafile_name)
+
 
 def load_instance(cls: Type[T], unique_value: Optional[str] = None,
                   datafile_name: Optional[str] = None) -> T:
@@ -102,7 +128,7 @@ def load_datafile(cls: Any, unique_value: Optional[str] = None, datafile_name: O
         datafile_name = get_datafile_name_for_unique_value(cls, unique_value)
 
     if datafile_name not in cache.datafiles.keys():
-        cache.datafiles[datafile_name] = _read_datafile(f"{cls.get_path_into_db()}/{datafile_name}.json")
+        cache.datafiles[datafile_name] = persistence.get_backend().read_datafile(cls.get_path_into_db(), datafile_name)
 
     # Load and return;
     return cache.datafiles[datafile_name]
@@ -121,6 +147,17 @@ def delete_instances(cls: Type['persistence.SupportsPersistence'], name: Optiona
     # Delete;
     _delete_index_entry(cls, datafile_name)
     _delete_datafile(cls, datafile_name)
+    if issubclass(cls, persistence.YieldsPrecalcData):
+        persistence.precalc_maintenance.remove_precalc_data(datafile_name)
+
+
+@contextlib.contextmanager
+def batch_writes() -> Iterator[None]:
+    """Groups the saves and deletes made inside the block into one write to the storage backend, and one
+    flush of the precalc data. With the sqlite backend the batch is a single transaction.
+    """
+    with persistence.precalc_maintenance.hold_precalc_flushes(), persistence.get_backend().batch():
+        yield
 
 
 def count_saved_instances(cls: Type['persistence.SupportsPersistence']) -> int:
@@ -144,14 +181,14 @@ def check_unique_value_available(cls: Type['persistence.SupportsPersistence'], p
     if proposed_value is None:
         raise persistence.exceptions.UndefinedUniqueValueError
 
-    # Grab the index data;
-    index_data = read_index(cls)
+    # Count the datafiles using the proposed value;
+    num_uses = _read_unique_value_counts(cls).get(proposed_value, 0)
 
-    # If we are ignoring a datafile, remove it from the index data;
-    if ignore_datafile is not None:
-        index_data.pop(ignore_datafile)
+    # If we are ignoring a datafile, don't count its use;
+    if ignore_datafile is not None and read_index(cls).get(ignore_datafile) == proposed_value:
+        num_uses -= 1
 
-    return proposed_value not in index_data.values()
+    return num_uses == 0
 
 
 def search_for_unique_values(
@@ -175,22 +212,20 @@ def search_for_unique_values(
 
 def get_datafile_name_for_unique_value(cls: Type['persistence.SupportsPersistence'], unique_value: str) -> str:
     """Returns the datafile name associated with the unique name."""
-    index = read_index(cls)
-    for df_name, u_name in index.items():
-        if u_name.strip() == unique_value.strip():
-            return df_name
-    raise persistence.exceptions.UniqueValueNotFoundError(missing_unique_value=unique_value)
+    try:
+        return read_reverse_index(cls)[unique_value.strip()][0]
+    except KeyError:
+        raise persistence.exceptions.UniqueValueNotFoundError(missing_unique_value=unique_value)
 
 
 def get_unique_value_from_datafile_name(cls: Type['persistence.SupportsPersistence'], datafile_name: str) -> str:
     """Returns the unique value associated with the datafile name."""
-    index = read_index(cls)
-    for df_name, u_name in index.items():
-        if datafile_name == df_name:
-            return u_name
-    raise persistence.exceptions.DatafileNotFoundError(
-        missing_datafile_name=datafile_name
-    )
+    try:
+        return read_index(cls)[datafile_name]
+    except KeyError:
+        raise persistence.exceptions.DatafileNotFoundError(
+            missing_datafile_name=datafile_name
+        )
 
 
 def _create_index_entry(subject: 'persistence.SupportsPersistence') -> None:
@@ -211,10 +246,8 @@ def _create_index_entry(subject: 'persistence.SupportsPersistence') -> None:
     # Generate and set the UID on object and index;
     subject._datafile_name = str(uuid.uuid4())
     index_data[subject.datafile_name] = subject.unique_value
-
-    # Write the index;
-    with open(subject.get_index_filepath(), 'w') as fh:
-        json.dump(index_data, fh, indent=2, sort_keys=True)
+    _add_reverse_index_entry(subject.__class__, subject.datafile_name, subject.unique_value)
+    _adjust_unique_value_count(subject.__class__, subject.unique_value, 1)
 
 
 def _create_datafile(subject: 'persistence.SupportsPersistence') -> None:
@@ -222,8 +255,8 @@ def _create_datafile(subject: 'persistence.SupportsPersistence') -> None:
     # Create the index entry;
     _create_index_entry(subject)
     # Create the datafile;
-    with open(subject.datafile_path, 'w') as fh:
-        json.dump(subject.persistable_data, fh, indent=2, sort_keys=True)
+    persistence.get_backend().write_datafile(
+        subject.get_path_into_db(), subject.datafile_name, subject.unique_value, subject.persistable_data)
 
 
 def _read_datafile(filepath: str) -> Dict[str, Any]:
@@ -235,12 +268,63 @@ def _read_datafile(filepath: str) -> Dict[str, Any]:
 
 def read_index(cls: Type['persistence.SupportsPersistence']) -> Dict[str, str]:
     """Returns the index corresponding to the _subject."""
-    if cls.__name__ in cache.indexes:
-        return cache.indexes[cls.__name__]
-    with open(cls.get_index_filepath(), 'r') as fh:
-        raw_data = fh.read()
-        cache.indexes[cls.__name__] = json.loads(raw_data)
-        return cache.indexes[cls.__name__]
+    if cls.__name__ not in cache.indexes:
+        cache.indexes[cls.__name__] = persistence.get_backend().read_index(cls.get_path_into_db())
+    return cache.indexes[cls.__name__]
+
+
+def read_reverse_index(cls: Type['persistence.SupportsPersistence']) -> Dict[str, List[str]]:
+    """Returns the index corresponding to the _subject, inverted to give datafile names by stripped unique value.
+    Notes:
+        The reverse index is built from the index on first use, and kept in step with it by the create,
+        update and delete index paths. Stripping can make two unique values equal, so each stripped value
+        maps to a list of datafile names, in the order they were indexed. Lookups use the first, and the
+        next takes its place if it is deleted or renamed.
+    """
+    if cls.__name__ not in cache.reverse_indexes:
+        reverse_index = {}
+        for df_name, u_name in read_index(cls).items():
+            reverse_index.setdefault(u_name.strip(), []).append(df_name)
+        cache.reverse_indexes[cls.__name__] = reverse_index
+    return cache.reverse_indexes[cls.__name__]
+
+
+def _read_unique_value_counts(cls: Type['persistence.SupportsPersistence']) -> Dict[str, int]:
+    """Returns the number of datafiles using each unique value in the index, built from the index on first use."""
+    if cls.__name__ not in cache.unique_value_counts:
+        counts = {}
+        for u_name in read_index(cls).values():
+            counts[u_name] = counts.get(u_name, 0) + 1
+        cache.unique_value_counts[cls.__name__] = counts
+    return cache.unique_value_counts[cls.__name__]
+
+
+def _adjust_unique_value_count(cls: Type['persistence.SupportsPersistence'], unique_value: Optional[str],
+                               delta: int) -> None:
+    """Adds delta to the count of datafiles using the unique value, dropping it once no datafile uses it."""
+    if unique_value is None:
+        return
+    counts = _read_unique_value_counts(cls)
+    counts[unique_value] = counts.get(unique_value, 0) + delta
+    if counts[unique_value] <= 0:
+        del counts[unique_value]
+
+
+def _add_reverse_index_entry(cls: Type['persistence.SupportsPersistence'], datafile_name: str,
+                             unique_value: str) -> None:
+    """Adds the datafile to the reverse index, under its stripped unique value."""
+    read_reverse_index(cls).setdefault(unique_value.strip(), []).append(datafile_name)
+
+
+def _remove_reverse_index_entry(cls: Type['persistence.SupportsPersistence'], datafile_name: str,
+                                unique_value: Optional[str]) -> None:
+    """Removes the datafile from the reverse index, dropping its stripped unique value once no datafile uses it."""
+    reverse_index = read_reverse_index(cls)
+    if unique_value is None or datafile_name not in reverse_index.get(unique_value.strip(), []):
+        return
+    reverse_index[unique_value.strip()].remove(datafile_name)
+    if not reverse_index[unique_value.strip()]:
+        del reverse_index[unique_value.strip()]
 
 
 def _update_datafile(subject: 'persistence.SupportsPersistence') -> None:
@@ -251,12 +335,12 @@ def _update_datafile(subject: 'persistence.SupportsPersistence') -> None:
     _update_unique_value(subject)
 
     # Update the datafile;
-    with open(subject.datafile_path, 'w') as fh:
-        json.dump(subject.persistable_data, fh, indent=2, sort_keys=True)
+    persistence.get_backend().write_datafile(
+        subject.get_path_into_db(), subject.datafile_name, subject.unique_value, subject.persistable_data)
 
 
 def _update_unique_value(subject: 'persistence.SupportsPersistence') -> None:
-    """Updates the index saved to disk with the current name on the instance.
+    """Updates the cached index with the current name on the instance.
     Raises:
         NameDuplicatedError: To indicate the name is not unique.
     """
@@ -267,19 +351,25 @@ def _update_unique_value(subject: 'persistence.SupportsPersistence') -> None:
 
     # Do the update;
     index_data = read_index(subject.__class__)
+    old_unique_value = index_data.get(subject.datafile_name)
+    if old_unique_value == subject.unique_value:
+        return
+    _remove_reverse_index_entry(subject.__class__, subject.datafile_name, old_unique_value)
+    _adjust_unique_value_count(subject.__class__, old_unique_value, -1)
     index_data[subject.datafile_name] = subject.unique_value
-    with open(subject.__class__.get_index_filepath(), 'w') as fh:
-        json.dump(index_data, fh, indent=2, sort_keys=True)
+    _add_reverse_index_entry(subject.__class__, subject.datafile_name, subject.unique_value)
+    _adjust_unique_value_count(subject.__class__, subject.unique_value, 1)
 
 
 def _delete_index_entry(cls: Type['persistence.SupportsPersistence'], datafile_name: str) -> None:
     """Deletes the subject's entry from its index."""
     index_data = read_index(cls)
+    _remove_reverse_index_entry(cls, datafile_name, index_data.get(datafile_name))
+    _adjust_unique_value_count(cls, index_data.get(datafile_name), -1)
     del index_data[datafile_name]
-    with open(cls.get_index_filepath(), 'w') as fh:
-        json.dump(index_data, fh, indent=2, sort_keys=True)
 
 
 def _delete_datafile(cls: Type['persistence.SupportsPersistence'], datafile_name: str) -> None:
-    """Deletes the specified datafile from the specified type's database."""
-    os.remove(cls.get_path_into_db() + datafile_name + '.json')
+    """Deletes the specified datafile, with its index entry, from the specified type's database."""
+    persistence.get_backend().delete_datafile(cls.get_path_into_db(), datafile_name)
+    cache.datafiles.pop(datafile_name, None)
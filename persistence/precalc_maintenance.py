@@ -0,0 +1,130 @@
+"""Keeps the recipe precalc data and tag lists in step with saves and deletes.
+Notes:
+    Each change is made to the cached precalc data and recipes by tag, and appended as one line to a
+    journal beside recipes.json, so a save outside a batch only writes the record that changed. The
+    journal is replayed whenever the precalc data is loaded. recipes.json, recipes_by_tag.json and the
+    binary precalc store are rewritten, and the journal emptied, by compact_precalc_data. This runs when
+    the outermost persistence.batch_writes block ends, or once the journal holds
+    configs.PRECALC_JOURNAL_MAX_ENTRIES changes. While the journal holds changes the binary precalc store
+    is out of date, so it is not used.
+"""
+import contextlib
+import json
+import os
+from typing import Dict, Any, Iterator, Optional
+
+import persistence
+
+# Batch and journal state, shared by every batch in the process;
+_pending: Dict[str, Any] = {'batch_depth': 0, 'changed': False, 'journal_entries': 0}
+
+
+def update_precalc_data(datafile_name: str, precalc_data: Dict[str, Any]) -> None:
+    """Sets the precalc data for the datafile, and moves it into the tag lists for its tags."""
+    persistence.get_precalc_data_for_recipes()
+    _apply_change(datafile_name, precalc_data)
+    _record_change(datafile_name, precalc_data)
+
+
+def remove_precalc_data(datafile_name: str) -> None:
+    """Removes the precalc data for the datafile, and takes it out of every tag list."""
+    if datafile_name not in persistence.get_precalc_data_for_recipes():
+        return
+    _apply_change(datafile_name, None)
+    _record_change(datafile_name, None)
+
+
+def replay_journal() -> None:
+    """Applies the changes in the journal to the cached precalc data and recipes by tag."""
+    _pending['journal_entries'] = 0
+    if not os.path.exists(get_journal_filepath()):
+        return
+    with open(get_journal_filepath(), 'r') as fh:
+        for line in fh:
+            if line.strip():
+                entry = json.loads(line)
+                _apply_change(entry['datafile_name'], entry['precalc_data'])
+                _pending['journal_entries'] += 1
+
+
+def journal_has_changes() -> bool:
+    """Returns True/False to indicate if the journal holds changes not yet compacted into the precalc files."""
+    return os.path.exists(get_journal_filepath()) and os.path.getsize(get_journal_filepath()) > 0
+
+
+@contextlib.contextmanager
+def hold_precalc_flushes() -> Iterator[None]:
+    """Holds back journal writes until the outermost block ends, then compacts the changes into the precalc
+    files in one go."""
+    _pending['batch_depth'] += 1
+    try:
+        yield
+    finally:
+        _pending['batch_depth'] -= 1
+        if _pending['batch_depth'] == 0 and _pending['changed']:
+            compact_precalc_data()
+
+
+def compact_precalc_data() -> None:
+    """Writes the cached precalc data and recipes by tag to disk, rewriting the binary precalc store too if
+    the database has one, and empties the journal."""
+    precalc_data = persistence.get_precalc_data_for_recipes()
+    precalc_dirpath = f"{persistence.configs.PATH_INTO_DB}/precalc_data"
+    _replace_json(f"{precalc_dirpath}/recipes.json", precalc_data)
+    _replace_json(f"{precalc_dirpath}/recipes_by_tag.json", persistence.main.get_recipes_by_tag())
+    if os.path.exists(persistence.precalc_store.get_precalc_store_filepath()):
+        persistence.write_precalc_store(
+            filepath=persistence.precalc_store.get_precalc_store_filepath(),
+            precalc_data=precalc_data,
+            get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+            get_serve_intervals=persistence.recipe_index._read_serve_intervals
+        )
+    if os.path.exists(get_journal_filepath()):
+        os.remove(get_journal_filepath())
+    _pending['changed'] = False
+    _pending['journal_entries'] = 0
+
+
+def get_journal_filepath() -> str:
+    """Returns the path to the journal of precalc data changes."""
+    return f"{persistence.configs.PATH_INTO_DB}/precalc_data/{persistence.configs.PRECALC_JOURNAL_FILENAME}"
+
+
+def _apply_change(datafile_name: str, precalc_data: Optional[Dict[str, Any]]) -> None:
+    """Sets or, if precalc_data is None, removes the datafile's record, and updates its tag lists to match."""
+    tags = [] if precalc_data is None else precalc_data['tags']
+    if precalc_data is None:
+        persistence.cache.recipe_precalc_data.pop(datafile_name, None)
+    else:
+        persistence.cache.recipe_precalc_data[datafile_name] = precalc_data
+    for tag, df_names in persistence.cache.recipes_by_tag.items():
+        if tag not in tags and datafile_name in df_names:
+            df_names.remove(datafile_name)
+    for tag in tags:
+        df_names = persistence.cache.recipes_by_tag.setdefault(tag, [])
+        if datafile_name not in df_names:
+            df_names.append(datafile_name)
+    # Drop the views built over the precalc data;
+    persistence.cache.recipe_index = None
+    persistence.cache.precalc_store = None
+
+
+def _record_change(datafile_name: str, precalc_data: Optional[Dict[str, Any]]) -> None:
+    """Appends the change to the journal, or leaves it for the end of the batch, compacting the journal once
+    it is full."""
+    if _pending['batch_depth'] > 0:
+        _pending['changed'] = True
+        return
+    with open(get_journal_filepath(), 'a') as fh:
+        fh.write(json.dumps({'datafile_name': datafile_name, 'precalc_data': precalc_data}, sort_keys=True) + '\n')
+    _pending['journal_entries'] += 1
+    if _pending['journal_entries'] >= persistence.configs.PRECALC_JOURNAL_MAX_ENTRIES:
+        compact_precalc_data()
+
+
+def _replace_json(filepath: str, data: Dict[str, Any]) -> None:
+    """Writes the data to the file as json, replacing the old file in one step."""
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+    os.replace(tmp_filepath, filepath)
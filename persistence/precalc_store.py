@@ -0,0 +1,203 @@
+"""Binary store of the recipe precalc data, held as fixed-width columns and opened with numpy.memmap.
+Notes:
+    The file starts with an 8 byte magic string and the 8 byte length of a json header. The header names
+    the nutrient, flag and tag columns, and gives the dtype, shape and offset of each array. Every array
+    starts on a 64 byte boundary after the header. The header does not grow with the number of recipes,
+    so the store opens in constant time, and pages of each column are only read when they are used.
+"""
+import json
+import os
+from typing import Dict, List, Optional, Callable, Any
+
+import numpy
+
+import persistence
+
+MAGIC = b'PYDIETPC'
+ALIGNMENT = 64
+# Flag values, as stored in the flags column;
+FLAG_TRUE, FLAG_FALSE, FLAG_NONE, FLAG_UNDEFINED = 1, 0, -1, -2
+
+
+class PrecalcStore:
+    """Read-only, memory-mapped view of a binary precalc store.
+    Notes:
+        Row n of every column refers to the nth datafile name in the string table. Serve intervals are
+        flattened into interval_rows, interval_starts and interval_ends, in minutes past midnight.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        with open(filepath, 'rb') as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filepath} is not a precalc store.")
+            header_length = int.from_bytes(fh.read(8), 'little')
+            header = json.loads(fh.read(header_length))
+        self.nutrient_names: List[str] = header['nutrient_names']
+        self.flag_names: List[str] = header['flag_names']
+        self.tag_names: List[str] = header['tag_names']
+        columns: Dict[str, 'numpy.ndarray'] = {}
+        for name, column in header['columns'].items():
+            shape = tuple(column['shape'])
+            if numpy.prod(shape) == 0:
+                # numpy.memmap can't map zero bytes;
+                columns[name] = numpy.zeros(shape, dtype=column['dtype'])
+            else:
+                columns[name] = numpy.memmap(
+                    filepath, dtype=column['dtype'], mode='r', offset=column['offset'], shape=shape)
+        self.df_name_table: 'numpy.ndarray' = columns['df_names']
+        self.nutrient_ratios: 'numpy.ndarray' = columns['nutrient_ratios']
+        self.calories_per_g: 'numpy.ndarray' = columns['calories_per_g']
+        self.cost_per_g: 'numpy.ndarray' = columns['cost_per_g']
+        self.typical_serving_size_g: 'numpy.ndarray' = columns['typical_serving_size_g']
+        self.flags: 'numpy.ndarray' = columns['flags']
+        self.tags: 'numpy.ndarray' = columns['tags']
+        self.interval_rows: 'numpy.ndarray' = columns['interval_rows']
+        self.interval_starts: 'numpy.ndarray' = columns['interval_starts']
+        self.interval_ends: 'numpy.ndarray' = columns['interval_ends']
+        self._df_names: Optional[List[str]] = None
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self):
+        return len(self.df_name_table)
+
+    @property
+    def df_names(self) -> List[str]:
+        """Returns the datafile names, in row order, decoding the string table on first use."""
+        if self._df_names is None:
+            self._df_names = numpy.char.decode(self.df_name_table, 'ascii').tolist()
+        return self._df_names
+
+    def get_row(self, datafile_name: str) -> int:
+        """Returns the row of the named recipe."""
+        if self._rows is None:
+            self._rows = {df_name: i for i, df_name in enumerate(self.df_names)}
+        return self._rows[datafile_name]
+
+
+def write_precalc_store(
+        filepath: str,
+        precalc_data: Dict[str, Dict[str, Any]],
+        get_df_names_by_tag: Optional[Callable[[], Dict[str, List[str]]]] = None,
+        get_serve_intervals: Optional[Callable[[str], List[str]]] = None
+) -> None:
+    """Writes the recipe precalc data to a binary precalc store, replacing any existing file atomically.
+    Tags and serve intervals are taken from the precalc data where it has them, and otherwise from
+    get_df_names_by_tag and get_serve_intervals, as for RecipeIndex.from_precalc_data.
+    """
+    df_names = list(precalc_data.keys())
+    rows = {df_name: i for i, df_name in enumerate(df_names)}
+    num_recipes = len(df_names)
+
+    # Collect the names of every nutrient, flag and tag which appears on any recipe;
+    nutrient_names, flag_names = set(), set()
+    for recipe_data in precalc_data.values():
+        nutrient_names.update(recipe_data['nutrient_ratios_data'].keys())
+        flag_names.update(recipe_data['flag_data'].keys())
+    nutrient_names, flag_names = sorted(nutrient_names), sorted(flag_names)
+    if all('tags' in recipe_data for recipe_data in precalc_data.values()):
+        df_names_by_tag: Dict[str, List[str]] = {}
+        for df_name, recipe_data in precalc_data.items():
+            for tag in recipe_data['tags']:
+                df_names_by_tag.setdefault(tag, []).append(df_name)
+    else:
+        df_names_by_tag = get_df_names_by_tag()
+    tag_names = sorted(df_names_by_tag.keys())
+
+    # Fill the columns;
+    columns: Dict[str, 'numpy.ndarray'] = {
+        'df_names': numpy.array([df_name.encode('ascii') for df_name in df_names],
+                                dtype=f"S{max([len(df_name) for df_name in df_names], default=1)}"),
+        'nutrient_ratios': numpy.zeros((num_recipes, len(nutrient_names))),
+        'calories_per_g': numpy.zeros(num_recipes),
+        'cost_per_g': numpy.zeros(num_recipes),
+        'typical_serving_size_g': numpy.zeros(num_recipes),
+        'flags': numpy.full((num_recipes, len(flag_names)), FLAG_UNDEFINED, dtype=numpy.int8),
+        'tags': numpy.zeros((num_recipes, len(tag_names)), dtype=bool),
+    }
+    nutrient_columns = {nutr_name: j for j, nutr_name in enumerate(nutrient_names)}
+    flag_columns = {flag_name: j for j, flag_name in enumerate(flag_names)}
+    flag_values = {True: FLAG_TRUE, False: FLAG_FALSE, None: FLAG_NONE}
+    interval_rows, interval_starts, interval_ends = [], [], []
+    for i, df_name in enumerate(df_names):
+        recipe_data = precalc_data[df_name]
+        for nutr_name, nutr_ratio_data in recipe_data['nutrient_ratios_data'].items():
+            subject_qty_g = nutr_ratio_data['subject_qty_data']['quantity_in_g']
+            host_qty_g = nutr_ratio_data['host_qty_data']['quantity_in_g']
+            columns['nutrient_ratios'][i, nutrient_columns[nutr_name]] = subject_qty_g / host_qty_g
+        columns['calories_per_g'][i] = recipe_data['calories_per_g']
+        columns['cost_per_g'][i] = recipe_data['cost_per_qty_data']['cost_per_g']
+        columns['typical_serving_size_g'][i] = recipe_data['typical_serving_size_g']
+        for flag_name, flag_value in recipe_data['flag_data'].items():
+            columns['flags'][i, flag_columns[flag_name]] = flag_values[flag_value]
+        serve_intervals = recipe_data['serve_intervals'] if 'serve_intervals' in recipe_data else \
+            get_serve_intervals(df_name)
+        for interval in serve_intervals:
+            start, end = interval.split('-')
+            interval_rows.append(i)
+            interval_starts.append(persistence.recipe_index._to_minutes(start))
+            interval_ends.append(persistence.recipe_index._to_minutes(end))
+    for j, tag in enumerate(tag_names):
+        columns['tags'][[rows[df_name] for df_name in df_names_by_tag[tag] if df_name in rows], j] = True
+    columns['interval_rows'] = numpy.array(interval_rows, dtype=numpy.int64)
+    columns['interval_starts'] = numpy.array(interval_starts, dtype=numpy.int32)
+    columns['interval_ends'] = numpy.array(interval_ends, dtype=numpy.int32)
+
+    # Lay the columns out after the header, each on an aligned offset;
+    header = {'nutrient_names': nutrient_names, 'flag_names': flag_names, 'tag_names': tag_names, 'columns': {
+        name: {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': 10 ** 19}
+        for name, array in columns.items()}}
+    # Size the header with the widest offsets, so it fits once the real ones are filled in;
+    header_length = len(json.dumps(header))
+    offset = _align(len(MAGIC) + 8 + header_length)
+    for name, array in columns.items():
+        header['columns'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode().ljust(header_length)
+
+    tmp_filepath = f"{filepath}.tmp"
+    with open(tmp_filepath, 'wb') as fh:
+        fh.write(MAGIC)
+        fh.write(header_length.to_bytes(8, 'little'))
+        fh.write(header_bytes)
+        for name, array in columns.items():
+            fh.seek(header['columns'][name]['offset'])
+            fh.write(numpy.ascontiguousarray(array).tobytes())
+        fh.truncate(offset)
+    os.replace(tmp_filepath, filepath)
+
+
+def get_precalc_store_filepath() -> str:
+    """Returns the path to the database's binary precalc store."""
+    return f"{persistence.configs.PATH_INTO_DB}/precalc_data/{persistence.configs.PRECALC_STORE_FILENAME}"
+
+
+def get_precalc_store() -> Optional['PrecalcStore']:
+    """Returns the database's binary precalc store, opening it on first use.
+    Returns None if the store hasn't been written, if the json precalc data is already loaded in the cache,
+    since that is then the data in use, or if the journal holds changes the store doesn't have yet.
+    """
+    if persistence.cache.recipe_precalc_data != {}:
+        return None
+    if persistence.cache.precalc_store is None:
+        filepath = get_precalc_store_filepath()
+        if not os.path.exists(filepath) or persistence.precalc_maintenance.journal_has_changes():
+            return None
+        persistence.cache.precalc_store = PrecalcStore(filepath)
+    return persistence.cache.precalc_store
+
+
+def rebuild_precalc_store() -> None:
+    """Writes the binary precalc store from the database's json precalc data."""
+    write_precalc_store(
+        filepath=get_precalc_store_filepath(),
+        precalc_data=persistence.get_precalc_data_for_recipes(),
+        get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+        get_serve_intervals=persistence.recipe_index._read_serve_intervals
+    )
+    persistence.cache.precalc_store = None
+
+
+def _align(offset: int) -> int:
+    """Rounds the offset up to the next multiple of ALIGNMENT."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
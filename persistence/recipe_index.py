@@ -0,0 +1,185 @@
+"""Bitmap index over the recipe precalc data, answering tag/flag/serve time queries with bitwise ANDs."""
+from typing import Dict, List, Optional, Callable, Tuple, Any
+
+import numpy
+
+import persistence
+
+
+class RecipeIndex:
+    """Holds a packed bitset per tag, per flag value and per queried serve time, with one bit per recipe.
+    Notes:
+        Bit n refers to the nth recipe in df_names. Serve time bitsets are built on first use from the
+        serve intervals, which are held as arrays of start and end minutes, and then kept.
+    """
+
+    def __init__(
+            self,
+            df_names: List[str],
+            tags: Dict[str, List[str]],
+            flag_data: Dict[str, Dict[str, Optional[bool]]],
+            serve_intervals: Dict[str, List[str]]
+    ):
+        self.df_names: List[str] = df_names
+        self._df_names = numpy.array(df_names, dtype=object)
+        rows = {df_name: i for i, df_name in enumerate(df_names)}
+
+        # Build a bitset for each tag;
+        self._tag_bits: Dict[str, 'numpy.ndarray'] = {}
+        for tag, tag_df_names in tags.items():
+            self._tag_bits[tag] = self._pack([rows[df_name] for df_name in tag_df_names if df_name in rows])
+
+        # Build a bitset for each value of each flag;
+        flag_rows: Dict[Tuple[str, bool], List[int]] = {}
+        for df_name, flags in flag_data.items():
+            for flag_name, flag_value in flags.items():
+                flag_rows.setdefault((flag_name, flag_value), []).append(rows[df_name])
+        self._flag_bits: Dict[Tuple[str, bool], 'numpy.ndarray'] = {
+            key: self._pack(flag_rows_) for key, flag_rows_ in flag_rows.items()}
+
+        # Flatten the serve intervals, so a serve time can be checked against all of them at once;
+        interval_rows, starts, ends = [], [], []
+        for df_name, intervals in serve_intervals.items():
+            for interval in intervals:
+                start, end = interval.split('-')
+                interval_rows.append(rows[df_name])
+                starts.append(_to_minutes(start))
+                ends.append(_to_minutes(end))
+        self._interval_rows = numpy.array(interval_rows, dtype=numpy.intp)
+        self._interval_starts = numpy.array(starts, dtype=int)
+        self._interval_ends = numpy.array(ends, dtype=int)
+        self._serve_time_bits: Dict[int, 'numpy.ndarray'] = {}
+
+    def __len__(self):
+        return len(self.df_names)
+
+    @classmethod
+    def from_precalc_data(
+            cls,
+            precalc_data: Dict[str, Dict[str, Any]],
+            get_df_names_by_tag: Optional[Callable[[], Dict[str, List[str]]]] = None,
+            get_serve_intervals: Optional[Callable[[str], List[str]]] = None
+    ) -> 'RecipeIndex':
+        """Builds the index from the recipe precalc data.
+        Tags and serve intervals are taken from the precalc data where every recipe has them, and otherwise
+        from get_df_names_by_tag and get_serve_intervals.
+        """
+        df_names = list(precalc_data.keys())
+
+        if all('tags' in recipe_data for recipe_data in precalc_data.values()):
+            tags: Dict[str, List[str]] = {}
+            for df_name, recipe_data in precalc_data.items():
+                for tag in recipe_data['tags']:
+                    tags.setdefault(tag, []).append(df_name)
+        else:
+            tags = get_df_names_by_tag()
+
+        serve_intervals = {}
+        for df_name, recipe_data in precalc_data.items():
+            if 'serve_intervals' in recipe_data:
+                serve_intervals[df_name] = recipe_data['serve_intervals']
+            else:
+                serve_intervals[df_name] = get_serve_intervals(df_name)
+
+        return cls(
+            df_names=df_names,
+            tags=tags,
+            flag_data={df_name: recipe_data['flag_data'] for df_name, recipe_data in precalc_data.items()},
+            serve_intervals=serve_intervals
+        )
+
+    @classmethod
+    def from_precalc_store(cls, store: 'persistence.PrecalcStore') -> 'RecipeIndex':
+        """Builds the index from the columns of a binary precalc store, without parsing any per-recipe data."""
+        index = cls(df_names=store.df_names, tags={}, flag_data={}, serve_intervals={})
+        for j, tag in enumerate(store.tag_names):
+            index._tag_bits[tag] = numpy.packbits(store.tags[:, j])
+        flag_values = {True: persistence.precalc_store.FLAG_TRUE, False: persistence.precalc_store.FLAG_FALSE,
+                       None: persistence.precalc_store.FLAG_NONE}
+        for j, flag_name in enumerate(store.flag_names):
+            for flag_value, stored_value in flag_values.items():
+                index._flag_bits[(flag_name, flag_value)] = numpy.packbits(store.flags[:, j] == stored_value)
+        index._interval_rows = numpy.asarray(store.interval_rows, dtype=numpy.intp)
+        index._interval_starts = numpy.asarray(store.interval_starts, dtype=int)
+        index._interval_ends = numpy.asarray(store.interval_ends, dtype=int)
+        return index
+
+    def query_rows(
+            self,
+            tags: Optional[List[str]] = None,
+            flags: Optional[Dict[str, bool]] = None,
+            serve_time: Optional[str] = None
+    ) -> 'numpy.ndarray':
+        """Returns the sorted rows of the recipes with all the tags and flag values, servable at the time."""
+        empty = numpy.zeros_like(self._pack([]))
+        bits = [self._tag_bits.get(tag, empty) for tag in (tags or [])]
+        bits += [self._flag_bits.get((flag_name, flag_value), empty) for flag_name, flag_value in (flags or {}).items()]
+        if serve_time is not None:
+            bits.append(self._get_serve_time_bits(serve_time))
+
+        if len(bits) == 0:
+            return numpy.arange(len(self.df_names))
+        combined = numpy.bitwise_and.reduce(bits)
+        return numpy.flatnonzero(numpy.unpackbits(combined, count=len(self.df_names)))
+
+    def query_df_names(
+            self,
+            tags: Optional[List[str]] = None,
+            flags: Optional[Dict[str, bool]] = None,
+            serve_time: Optional[str] = None
+    ) -> List[str]:
+        """Returns the datafile names of the recipes matching the query."""
+        return self._df_names[self.query_rows(tags, flags, serve_time)].tolist()
+
+    def _get_serve_time_bits(self, serve_time: str) -> 'numpy.ndarray':
+        """Returns the bitset of recipes servable at the time, building it on first use."""
+        minutes = _to_minutes(serve_time)
+        if minutes not in self._serve_time_bits:
+            starts, ends = self._interval_starts, self._interval_ends
+            # Match model.time.time_is_in_interval, including its handling of intervals past midnight;
+            in_interval = ((starts <= minutes) & (minutes <= ends)) | ((starts > ends) & (ends > minutes))
+            self._serve_time_bits[minutes] = self._pack(numpy.unique(self._interval_rows[in_interval]))
+        return self._serve_time_bits[minutes]
+
+    def _pack(self, rows: List[int]) -> 'numpy.ndarray':
+        """Returns a packed bitset with the bits for the rows set."""
+        bools = numpy.zeros(len(self.df_names), dtype=bool)
+        bools[numpy.asarray(rows, dtype=numpy.intp)] = True
+        return numpy.packbits(bools)
+
+
+def _to_minutes(time_str: str) -> int:
+    """Converts a HH:MM time string into minutes past midnight."""
+    hours, minutes = time_str.strip().split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def get_recipe_index() -> 'RecipeIndex':
+    """Returns the index over the recipe precalc data, building it on first use, from the binary precalc store
+    if the database has one."""
+    if persistence.cache.recipe_index is None and persistence.get_precalc_store() is not None:
+        persistence.cache.recipe_index = RecipeIndex.from_precalc_store(persistence.get_precalc_store())
+    elif persistence.cache.recipe_index is None:
+        persistence.cache.recipe_index = RecipeIndex.from_precalc_data(
+            precalc_data=persistence.get_precalc_data_for_recipes(),
+            get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+            get_serve_intervals=_read_serve_intervals
+        )
+    return persistence.cache.recipe_index
+
+
+def _read_serve_intervals(df_name: str) -> List[str]:
+    """Returns the serve intervals from the recipe's datafile, caching the datafile as load_datafile does."""
+    if df_name not in persistence.cache.datafiles.keys():
+        persistence.cache.datafiles[df_name] = persistence.get_backend().read_datafile(
+            f"{persistence.configs.PATH_INTO_DB}/recipes", df_name)
+    return persistence.cache.datafiles[df_name]['serve_intervals']
+
+
+def query_recipe_df_names(
+        tags: Optional[List[str]] = None,
+        flags: Optional[Dict[str, bool]] = None,
+        serve_time: Optional[str] = None
+) -> List[str]:
+    """Returns the datafile names of the recipes with all the tags and flag values, servable at the time."""
+    return get_recipe_index().query_df_names(tags=tags, flags=flags, serve_time=serve_time)
@@ -16,6 +16,16 @@ class YieldsPersistableData(abc.ABC):
         return {}
 
 
+class YieldsPrecalcData(abc.ABC):
+    """Base class for persistable objects whose precalc data is kept up to date as they are saved and deleted."""
+
+    @property
+    @abc.abstractmethod
+    def precalc_data(self) -> Optional[Dict[str, Any]]:
+        """Returns the precalc data for this instance, or None if its data is too incomplete to calculate it."""
+        raise NotImplementedError
+
+
 class CanLoadData(abc.ABC):
     """Base class for objects that can load persistable data."""
 
@@ -332,3 +332,34 @@ class TestNutrientRatios(TestCase):
                 ratios[nutrient_name]['subject_qty_data']['quantity_in_g'],
                 places=8
             )
+
+
+class TestGenomeKey(TestCase):
+    """Tests the genome_key property."""
+
+    @pfx.use_test_database
+    def test_meals_with_same_recipes_and_quantities_share_key(self):
+        """Checks the key depends only on the recipes and their quantities."""
+        porridge = model.recipes.get_datafile_name_for_unique_value("Porridge")
+        milkshake = model.recipes.get_datafile_name_for_unique_value("Banana Milkshake")
+        sm1 = model.meals.SettableMeal(meal_data={porridge: qfx.get_qty_data(500), milkshake: qfx.get_qty_data(300)})
+        sm2 = model.meals.SettableMeal(meal_data={milkshake: qfx.get_qty_data(300), porridge: qfx.get_qty_data(500)})
+        self.assertEqual(sm1.genome_key, sm2.genome_key)
+
+    @pfx.use_test_database
+    def test_key_changes_when_quantity_is_set(self):
+        """Checks setting a recipe quantity invalidates the key."""
+        sm = model.meals.SettableMeal()
+        sm.add_recipe("Porridge", qfx.get_qty_data(500))
+        key_before = sm.genome_key
+        sm.set_recipe_quantity("Porridge", 200, 'g')
+        self.assertNotEqual(key_before, sm.genome_key)
+
+    @pfx.use_test_database
+    def test_key_changes_when_recipe_is_added(self):
+        """Checks adding a recipe invalidates the key."""
+        sm = model.meals.SettableMeal()
+        sm.add_recipe("Porridge", qfx.get_qty_data(500))
+        key_before = sm.genome_key
+        sm.add_recipe("Banana Milkshake", qfx.get_qty_data(300))
+        self.assertNotEqual(key_before, sm.genome_key)
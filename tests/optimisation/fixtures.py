@@ -1,4 +1,7 @@
 """Fixtures for testing the optimisation module."""
+from typing import Dict, Any
+
+import model
 
 test_ga_configs = {
     "max_population_size": 10000
@@ -20,4 +23,36 @@ test_goals = {
     },
     'total_calories': 1000,
     'max_cost': 3.00
-}
\ No newline at end of file
+}
+
+
+def _ratio_data(ratio: float) -> 'model.quantity.QuantityRatioData':
+    """Returns quantity ratio data for the ratio provided."""
+    return {
+        'subject_qty_data': {'quantity_in_g': ratio, 'pref_unit': 'g'},
+        'host_qty_data': {'quantity_in_g': 1, 'pref_unit': 'g'}
+    }
+
+
+def _precalc_data(calories_per_g: float, cost_per_g: float, typical_serving_size_g: float, tags,
+                  **nutrient_ratios: float) -> Dict[str, Any]:
+    """Returns a recipe precalc data entry."""
+    return {
+        'calories_per_g': calories_per_g,
+        'cost_per_qty_data': {'cost_per_g': cost_per_g, 'quantity_in_g': 100, 'pref_unit': 'g'},
+        'flag_data': {'vegetarian': True, 'nut_free': True},
+        'nutrient_ratios_data': {nutr_name: _ratio_data(ratio) for nutr_name, ratio in nutrient_ratios.items()},
+        'serve_intervals': ["10:00-14:00"],
+        'tags': tags,
+        'typical_serving_size_g': typical_serving_size_g
+    }
+
+
+test_precalc_data = {
+    'main-a': _precalc_data(2.0, 0.004, 300, ['main'], protein=0.25, carbohydrate=0.35, fat=0.2),
+    'main-b': _precalc_data(1.5, 0.002, 350, ['main'], protein=0.1, carbohydrate=0.6, fat=0.1),
+    'side-a': _precalc_data(1.0, 0.001, 150, ['side'], protein=0.05, carbohydrate=0.5, fat=0.05),
+    'side-b': _precalc_data(3.0, 0.003, 100, ['side'], protein=0.3, carbohydrate=0.1, fat=0.4),
+    'drink-a': _precalc_data(0.5, 0.002, 250, ['drink'], carbohydrate=0.1),
+    'drink-b': _precalc_data(0.4, 0.010, 330, ['drink'], protein=0.02, carbohydrate=0.08, fat=0.01),
+}
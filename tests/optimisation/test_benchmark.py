@@ -0,0 +1,96 @@
+"""Tests for the optimisation.benchmark module."""
+import sys
+from unittest import TestCase, mock
+
+import model
+import optimisation
+import optimisation.benchmark
+import persistence
+
+
+class TestInstallSyntheticRecipeDB(TestCase):
+    """Tests the install_synthetic_recipe_db function."""
+
+    def setUp(self) -> None:
+        self.path_into_db = persistence.configs.PATH_INTO_DB
+
+    def tearDown(self) -> None:
+        persistence.configs.PATH_INTO_DB = self.path_into_db
+        persistence.cache.reset()
+
+    def test_recipes_are_installed(self):
+        """Checks the synthetic recipes can be queried and loaded into meals."""
+        optimisation.benchmark.install_synthetic_recipe_db(num_recipes=50, seed=3)
+        self.assertEqual(50, len(persistence.get_precalc_data_for_recipes()))
+        df_name = persistence.query_recipe_df_names(tags=['main'])[0]
+        meal = model.meals.SettableMeal(meal_data={
+            df_name: model.quantity.QuantityData(quantity_in_g=100, pref_unit='g')})
+        self.assertGreater(meal.num_calories, 0)
+
+    def test_same_seed_gives_same_db(self):
+        """Checks the database depends only on the seed."""
+        optimisation.benchmark.install_synthetic_recipe_db(num_recipes=20, seed=3)
+        first = persistence.get_precalc_data_for_recipes()
+        optimisation.benchmark.install_synthetic_recipe_db(num_recipes=20, seed=3)
+        self.assertEqual(first, persistence.get_precalc_data_for_recipes())
+
+
+class TestSummariseRun(TestCase):
+    """Tests the summarise_run function."""
+
+    def test_calculates_rates_and_thresholds(self):
+        """Checks the rates use the final record, and thresholds use the first record to reach them."""
+        records = [
+            {'seconds': 1.0, 'generation': 1, 'fitness': 0.7, 'evaluations': 100},
+            {'seconds': 2.0, 'generation': 2, 'fitness': 0.82, 'evaluations': 150},
+            {'seconds': 4.0, 'generation': 3, 'fitness': 0.86, 'evaluations': 200},
+        ]
+        summary = optimisation.benchmark.summarise_run(records, thresholds=[0.8, 0.85, 0.9])
+        self.assertEqual(50, summary['evaluations_per_second'])
+        self.assertEqual(0.75, summary['generations_per_second'])
+        self.assertEqual({'0.8': 2.0, '0.85': 4.0, '0.9': None}, summary['time_to_fitness'])
+
+
+class TestCompareToBaseline(TestCase):
+    """Tests the compare_to_baseline function."""
+
+    def test_flags_regressions_beyond_tolerance(self):
+        """Checks only metrics worse than the baseline by more than the tolerance are reported."""
+        baseline = {'cases': {'config1-1000': {
+            'evaluations_per_second': 100, 'generations_per_second': 10, 'final_fitness': 0.9, 'peak_rss_mb': 100}}}
+        results = {'cases': {
+            'config1-1000': {
+                'evaluations_per_second': 80, 'generations_per_second': 9.5, 'final_fitness': 0.95,
+                'peak_rss_mb': 120},
+            'config2-1000': {
+                'evaluations_per_second': 1, 'generations_per_second': 1, 'final_fitness': 0.1, 'peak_rss_mb': 1}
+        }}
+        regressions = optimisation.benchmark.compare_to_baseline(results, baseline, tolerance=0.1)
+        self.assertEqual(['config1-1000'], list(regressions.keys()))
+        self.assertEqual({'evaluations_per_second', 'peak_rss_mb'}, set(regressions['config1-1000'].keys()))
+
+    def test_skips_unmeasured_metrics(self):
+        """Checks a metric which wasn't measured, such as peak RSS on Windows, isn't compared."""
+        baseline = {'cases': {'config1-1000': {
+            'evaluations_per_second': 100, 'generations_per_second': 10, 'final_fitness': 0.9, 'peak_rss_mb': 100}}}
+        results = {'cases': {'config1-1000': {
+            'evaluations_per_second': 100, 'generations_per_second': 10, 'final_fitness': 0.9, 'peak_rss_mb': None}}}
+        self.assertEqual({}, optimisation.benchmark.compare_to_baseline(results, baseline))
+
+
+class TestGetPeakRSSMB(TestCase):
+    """Tests the get_peak_rss_mb function."""
+
+    def test_converts_units_by_platform(self):
+        """Checks ru_maxrss is read as bytes on macOS and kilobytes on Linux."""
+        usage = mock.Mock(ru_maxrss=2 * 1024 * 1024)
+        with mock.patch('resource.getrusage', return_value=usage):
+            with mock.patch.object(sys, 'platform', 'darwin'):
+                self.assertEqual(2, optimisation.benchmark.get_peak_rss_mb())
+            with mock.patch.object(sys, 'platform', 'linux'):
+                self.assertEqual(2048, optimisation.benchmark.get_peak_rss_mb())
+
+    def test_returns_none_without_resource_module(self):
+        """Checks None is returned where the resource module can't be imported, as on Windows."""
+        with mock.patch.dict(sys.modules, {'resource': None}):
+            self.assertIsNone(optimisation.benchmark.get_peak_rss_mb())
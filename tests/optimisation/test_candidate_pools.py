@@ -0,0 +1,40 @@
+"""Tests for the CandidatePools class."""
+import copy
+from unittest import TestCase
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class TestGetPool(TestCase):
+    """Tests the CandidatePools.get_pool method."""
+
+    def setUp(self) -> None:
+        precalc_data = copy.deepcopy(ofx.test_precalc_data)
+        precalc_data['side-b']['flag_data']['vegetarian'] = False
+        precalc_data['drink-a']['serve_intervals'] = ["18:00-20:00"]
+        self.ra = optimisation.RecipeArrays.from_precalc_data(precalc_data)
+        self.pools = optimisation.CandidatePools(self.ra, precalc_data=precalc_data)
+
+    def get_df_names(self, *args):
+        return [self.ra.df_names[rid] for rid in self.pools.get_pool(*args)]
+
+    def test_filters_by_tag(self):
+        """Checks only recipes with the tag are in the pool."""
+        self.assertEqual(['main-a', 'main-b'], self.get_df_names('main', {}))
+
+    def test_filters_by_flags(self):
+        """Checks recipes with the wrong flag value are excluded."""
+        self.assertEqual(['side-a'], self.get_df_names('side', {'vegetarian': True}))
+        self.assertEqual(['side-b'], self.get_df_names('side', {'vegetarian': False}))
+
+    def test_filters_by_serve_time(self):
+        """Checks recipes which can't be served at the time are excluded."""
+        self.assertEqual(['drink-b'], self.get_df_names('drink', {}, "12:00"))
+        self.assertEqual(['drink-a'], self.get_df_names('drink', {}, "19:00"))
+
+    def test_pools_are_computed_once_per_key(self):
+        """Checks repeated requests return the cached pool, whatever the flag order."""
+        pool = self.pools.get_pool('main', {'vegetarian': True, 'nut_free': True})
+        self.assertIs(pool, self.pools.get_pool('main', {'nut_free': True, 'vegetarian': True}))
+        self.assertEqual(1, len(self.pools))
@@ -0,0 +1,167 @@
+"""Tests for the optimisation.day_plan module."""
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+import optimisation.benchmark
+import persistence
+from tests.optimisation import fixtures as ofx
+
+
+def qty(quantity_in_g: float):
+    """Returns quantity data for a nutrient mass goal."""
+    return {'quantity_in_g': quantity_in_g, 'pref_unit': 'g'}
+
+
+def create_day_goals_data():
+    """Returns day goals with a lunch and a dinner, each a main and a side."""
+    return {
+        'flags': {'vegetarian': True, 'nut_free': None},
+        'max_cost_gbp_target': None,
+        'calorie_target': None,
+        'nutrient_mass_goals': {'protein': qty(100)},
+        'meal_goals': {
+            'lunch': {
+                'name': 'lunch', 'time_str': '12:00', 'tags': ['main', 'side'], 'flags': {'nut_free': True},
+                'max_cost_gbp_target': None, 'calorie_target': None,
+                'nutrient_mass_goals': {'carbohydrate': qty(200)}
+            },
+            'dinner': {
+                'name': 'dinner', 'time_str': '12:30', 'tags': ['main', 'side'], 'flags': {},
+                'max_cost_gbp_target': None, 'calorie_target': None,
+                'nutrient_mass_goals': {}
+            }
+        }
+    }
+
+
+class TestGetMealFlags(TestCase):
+    """Tests for the get_meal_flags function."""
+
+    def test_meal_flags_override_day_flags(self):
+        """Checks the meal's flags are merged over the day's, ignoring flags set to None."""
+        day_goals_data = create_day_goals_data()
+        self.assertEqual({'vegetarian': True, 'nut_free': True},
+                         optimisation.day_plan.get_meal_flags(day_goals_data, 'lunch'))
+        self.assertEqual({'vegetarian': True}, optimisation.day_plan.get_meal_flags(day_goals_data, 'dinner'))
+
+
+class TestDayPlanEngine(TestCase):
+    """Tests for the DayPlanEngine class."""
+
+    def setUp(self) -> None:
+        self.recipe_arrays = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.ids = self.recipe_arrays.recipe_ids
+
+    def genome(self, *recipe_quantities) -> 'optimisation.Genome':
+        """Returns a genome of the (df_name, quantity) pairs."""
+        return optimisation.Genome(
+            recipe_ids=[self.ids[df_name] for df_name, _ in recipe_quantities],
+            quantities_g=[quantity_g for _, quantity_g in recipe_quantities]
+        )
+
+    def test_day_goal_is_met_across_meals(self):
+        """Checks a day goal is scored on the combined masses of every meal."""
+        day_goals_data = create_day_goals_data()
+        day_goals_data['meal_goals']['lunch']['nutrient_mass_goals'] = {}
+        engine = optimisation.DayPlanEngine(self.recipe_arrays, day_goals_data)
+        # 200g of main-a gives 50g of protein, so two of them meet the 100g day goal exactly;
+        lunch = self.genome(('main-a', 200), ('side-a', 0))
+        dinner = self.genome(('main-a', 200), ('side-a', 0))
+        self.assertAlmostEqual(1, engine.score_plan([lunch, dinner]))
+        # Either meal alone only meets half of it;
+        context = engine.get_context(0, [lunch, self.genome(('main-a', 0), ('side-a', 0))])
+        self.assertAlmostEqual(0.5, engine.score(1, dinner.recipe_ids, dinner.quantities_g, context)[0])
+
+    def test_worst_goal_sets_fitness(self):
+        """Checks the fitness is the worst of the meal and day goals."""
+        engine = optimisation.DayPlanEngine(self.recipe_arrays, create_day_goals_data())
+        # Lunch has 70g of carbohydrate against its 200g goal;
+        lunch = self.genome(('main-a', 200), ('side-a', 0))
+        dinner = self.genome(('main-a', 200), ('side-a', 0))
+        self.assertAlmostEqual(70 / 200, engine.score_plan([lunch, dinner]))
+
+    def test_meals_are_scaled_to_calorie_targets(self):
+        """Checks each meal's masses are scaled to its calorie target before scoring."""
+        day_goals_data = create_day_goals_data()
+        day_goals_data['meal_goals']['lunch']['nutrient_mass_goals'] = {}
+        day_goals_data['meal_goals']['lunch']['calorie_target'] = 400
+        engine = optimisation.DayPlanEngine(self.recipe_arrays, day_goals_data)
+        # 100g of main-a is 200kcal, so it is doubled to 200g and gives 50g of protein;
+        lunch = self.genome(('main-a', 100), ('side-a', 0))
+        masses, calories, _ = engine.meal_totals(0, lunch.recipe_ids, lunch.quantities_g)
+        self.assertAlmostEqual(400, calories[0])
+        self.assertAlmostEqual(50, masses[0, engine.nutrient_names.index('protein')])
+
+    def test_scaled_genome_matches_meal_totals(self):
+        """Checks the scaled genome has the calories and masses the meal is scored with, unscaled."""
+        day_goals_data = create_day_goals_data()
+        day_goals_data['meal_goals']['lunch']['calorie_target'] = 400
+        engine = optimisation.DayPlanEngine(self.recipe_arrays, day_goals_data)
+        lunch = self.genome(('main-a', 100), ('side-a', 50))
+        scaled = engine.scaled_genome(0, lunch)
+        scaled_totals = engine.meal_totals(1, scaled.recipe_ids, scaled.quantities_g)
+        for expected, actual in zip(engine.meal_totals(0, lunch.recipe_ids, lunch.quantities_g), scaled_totals):
+            numpy.testing.assert_allclose(expected, actual)
+        self.assertIs(lunch, engine.scaled_genome(1, lunch))
+
+    def test_over_budget_day_scores_zero(self):
+        """Checks a plan over the day's max cost is written off."""
+        day_goals_data = create_day_goals_data()
+        day_goals_data['meal_goals']['lunch']['nutrient_mass_goals'] = {}
+        day_goals_data['max_cost_gbp_target'] = 1.0
+        engine = optimisation.DayPlanEngine(self.recipe_arrays, day_goals_data)
+        lunch = self.genome(('main-a', 200), ('side-a', 0))
+        # Each meal costs 0.80, which is within budget alone but not together;
+        self.assertEqual(0, engine.score_plan([lunch, self.genome(('main-a', 200), ('side-a', 0))]))
+        self.assertAlmostEqual(0.5, engine.score_plan([lunch, self.genome(('main-a', 0), ('side-a', 0))]))
+
+
+class TestRunDayPlan(TestCase):
+    """Tests for the run_day_plan function, run against the test database."""
+
+    def setUp(self) -> None:
+        self.path_into_db = persistence.configs.PATH_INTO_DB
+        persistence.configs.PATH_INTO_DB = optimisation.benchmark.TEST_DATABASE_PATH
+        persistence.cache.reset()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history_filepath = os.path.join(self.tmp_dir.name, 'history.jsonl')
+
+    def tearDown(self) -> None:
+        persistence.configs.PATH_INTO_DB = self.path_into_db
+        persistence.cache.reset()
+        self.tmp_dir.cleanup()
+
+    def test_returns_meals_at_calorie_targets(self):
+        """Checks meals with a calorie target come back at it, and the history has one record per generation
+        with the same quantities."""
+        day_goals_data = {
+            'flags': {}, 'max_cost_gbp_target': None, 'calorie_target': None,
+            'nutrient_mass_goals': {'protein': qty(60)},
+            'meal_goals': {
+                'lunch': {
+                    'name': 'lunch', 'time_str': '12:00', 'tags': ['main', 'drink'], 'flags': {},
+                    'max_cost_gbp_target': None, 'calorie_target': 700, 'nutrient_mass_goals': {}
+                },
+                'dinner': {
+                    'name': 'dinner', 'time_str': '17:00', 'tags': ['main'], 'flags': {},
+                    'max_cost_gbp_target': None, 'calorie_target': None, 'nutrient_mass_goals': {}
+                }
+            }
+        }
+        plan = optimisation.run_day_plan(
+            day_goals_data=day_goals_data,
+            ga_configs=dict(optimisation.configs.ga_configs, max_population_size=10, max_generations=3),
+            day_plan_configs=dict(optimisation.configs.day_plan_configs, epoch_generations=1),
+            history_filepath=self.history_filepath,
+            seed=5,
+            num_workers=2
+        )
+        self.assertEqual(['lunch', 'dinner'], list(plan.keys()))
+        self.assertAlmostEqual(700, plan['lunch'].num_calories)
+        history = optimisation.read_history(self.history_filepath)
+        self.assertEqual([2, 3], [gen for gen, _ in history])
+        self.assertEqual(plan['lunch'].persistable_data, history[-1][1]['meals']['lunch'])
@@ -0,0 +1,58 @@
+"""Tests for the FitnessCache class."""
+from typing import List
+from unittest import TestCase
+
+import optimisation
+
+
+class StubMember:
+    """Minimal member exposing a genome key."""
+
+    def __init__(self, genome_key):
+        self.genome_key = genome_key
+
+
+class CountingScorer:
+    """Scores members by their genome key, counting the members it is asked to score."""
+
+    def __init__(self):
+        self.scored = 0
+
+    def __call__(self, *members: 'StubMember') -> List[float]:
+        self.scored += len(members)
+        return [float(member.genome_key) for member in members]
+
+
+class TestCalculateFitness(TestCase):
+    """Tests for the calculate_fitness method."""
+
+    def test_returns_underlying_scores(self):
+        """Checks the cached scores match the wrapped function."""
+        fc = optimisation.FitnessCache(calculate_fitness=CountingScorer())
+        self.assertEqual([1.0, 2.0], fc.calculate_fitness(StubMember(1), StubMember(2)))
+
+    def test_identical_genomes_are_scored_once(self):
+        """Checks a genome seen before is not re-scored."""
+        scorer = CountingScorer()
+        fc = optimisation.FitnessCache(calculate_fitness=scorer)
+        fc.calculate_fitness(StubMember(1), StubMember(2))
+        fc.calculate_fitness(StubMember(2), StubMember(1), StubMember(1))
+        self.assertEqual(2, scorer.scored)
+        self.assertEqual(3, fc.hits)
+        self.assertEqual(2, fc.misses)
+
+    def test_changed_genome_is_rescored(self):
+        """Checks a member is re-scored once its genome key changes."""
+        scorer = CountingScorer()
+        fc = optimisation.FitnessCache(calculate_fitness=scorer)
+        m = StubMember(1)
+        fc.calculate_fitness(m)
+        m.genome_key = 3
+        self.assertEqual([3.0], fc.calculate_fitness(m))
+        self.assertEqual(2, scorer.scored)
+
+    def test_oldest_entries_are_evicted(self):
+        """Checks the cache stays within its maximum size."""
+        fc = optimisation.FitnessCache(calculate_fitness=CountingScorer(), max_size=2)
+        fc.calculate_fitness(StubMember(1), StubMember(2), StubMember(3))
+        self.assertEqual(2, len(fc))
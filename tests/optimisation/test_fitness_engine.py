@@ -0,0 +1,87 @@
+"""Tests for the optimisation.fitness_engine module."""
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+def score_with_fitness_function(recipe_df_names, quantities) -> float:
+    """Scores a single member the slow way, via fitness_function and the precalc data."""
+    precalc = ofx.test_precalc_data
+
+    def get_nutrient_ratio(nutr_name: str) -> float:
+        total = 0
+        for df_name, qty in zip(recipe_df_names, quantities):
+            nrd = precalc[df_name]['nutrient_ratios_data']
+            if nutr_name in nrd:
+                total += nrd[nutr_name]['subject_qty_data']['quantity_in_g'] * qty
+        return total / sum(quantities)
+
+    return optimisation.fitness_function(
+        get_nutrient_ratio=get_nutrient_ratio,
+        get_total_calories=lambda: sum(
+            precalc[df]['calories_per_g'] * q for df, q in zip(recipe_df_names, quantities)),
+        get_total_cost=lambda: sum(
+            precalc[df]['cost_per_qty_data']['cost_per_g'] * q for df, q in zip(recipe_df_names, quantities)),
+        target_nutrient_ratios=ofx.test_goals['target_nutrient_ratios'],
+        target_total_calories=ofx.test_goals['total_calories'],
+        target_max_cost=ofx.test_goals['max_cost']
+    )
+
+
+class TestRecipeArrays(TestCase):
+    """Tests for the RecipeArrays class."""
+
+    def test_columns_are_populated_from_precalc_data(self):
+        """Checks the arrays hold the precalc values in the right rows."""
+        ra = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        rid = ra.recipe_ids['side-b']
+        self.assertEqual(3.0, ra.calories_per_g[rid])
+        self.assertEqual(0.003, ra.cost_per_g[rid])
+        self.assertEqual(100, ra.typical_serving_size_g[rid])
+        self.assertEqual(0.4, ra.nutrient_ratios[rid, ra.nutrient_columns['fat']])
+
+    def test_missing_nutrients_are_zero(self):
+        """Checks nutrients not defined on a recipe are treated as zero."""
+        ra = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.assertEqual(0, ra.nutrient_ratios[ra.recipe_ids['drink-a'], ra.nutrient_columns['protein']])
+
+
+class TestScore(TestCase):
+    """Tests for the FitnessEngine.score method."""
+
+    def setUp(self) -> None:
+        self.engine = optimisation.build_fitness_engine(
+            goals=ofx.test_goals,
+            recipe_arrays=optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        )
+        self.members = [
+            (['main-a', 'side-a', 'drink-a'], [300, 150, 250]),
+            (['main-b', 'side-b', 'drink-b'], [200, 120, 330]),
+            (['main-a', 'side-b', 'drink-b'], [400, 80, 100]),
+            (['main-b', 'side-a', 'drink-a'], [175, 75, 500]),
+        ]
+
+    def test_matches_fitness_function(self):
+        """Checks the batched scores match fitness_function member by member."""
+        ids = numpy.array([[self.engine.recipe_arrays.recipe_ids[df] for df in dfs] for dfs, _ in self.members])
+        qts = numpy.array([qts for _, qts in self.members], dtype=float)
+        scores = self.engine.score(ids, qts)
+        for (dfs, qts), score in zip(self.members, scores):
+            self.assertAlmostEqual(score_with_fitness_function(dfs, qts), score)
+
+    def test_expensive_members_score_zero(self):
+        """Checks members over the max cost are written off."""
+        engine = optimisation.build_fitness_engine(
+            goals={**ofx.test_goals, 'max_cost': 0.01},
+            recipe_arrays=self.engine.recipe_arrays
+        )
+        ids = numpy.array([self.engine.recipe_arrays.recipe_ids[df] for df in self.members[0][0]])
+        self.assertEqual(0, engine.score(ids, self.members[0][1])[0])
+
+    def test_members_without_calories_score_zero(self):
+        """Checks members with no calories are written off, since their scaled cost can't be calculated."""
+        ids = numpy.array([self.engine.recipe_arrays.recipe_ids[df] for df in self.members[0][0]])
+        self.assertEqual(0, self.engine.score(ids, numpy.zeros(3))[0])
@@ -0,0 +1,148 @@
+"""Tests for the optimisation.genome module."""
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class GenomeTestCase(TestCase):
+    """Provides recipe arrays and a seeded generator."""
+
+    def setUp(self) -> None:
+        self.ra = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.rng = numpy.random.default_rng(42)
+        self.candidates = [
+            numpy.array([self.ra.recipe_ids['main-a'], self.ra.recipe_ids['main-b']]),
+            numpy.array([self.ra.recipe_ids['side-a'], self.ra.recipe_ids['side-b']]),
+            numpy.array([self.ra.recipe_ids['drink-a'], self.ra.recipe_ids['drink-b']]),
+        ]
+
+
+class TestGenomeKey(GenomeTestCase):
+    """Tests the Genome.genome_key property."""
+
+    def test_key_changes_when_quantity_is_set(self):
+        """Checks setting a quantity invalidates the key."""
+        g = optimisation.Genome(recipe_ids=[0, 2], quantities_g=[100, 200])
+        key_before = g.genome_key
+        g.set_quantity(1, 150)
+        self.assertNotEqual(key_before, g.genome_key)
+
+    def test_equal_genomes_share_key(self):
+        """Checks separate genomes with the same slots have the same key."""
+        g1 = optimisation.Genome(recipe_ids=[0, 2], quantities_g=[100, 200])
+        g2 = optimisation.Genome(recipe_ids=[0, 2], quantities_g=[100, 200])
+        self.assertEqual(g1.genome_key, g2.genome_key)
+
+
+class TestMealConversion(GenomeTestCase):
+    """Tests the conversions between genomes and meals."""
+
+    def test_round_trip_preserves_recipes_and_quantities(self):
+        """Checks a genome survives conversion to a meal and back."""
+        g = optimisation.Genome(recipe_ids=[1, 3, 5], quantities_g=[120.5, 80, 330])
+        g2 = optimisation.meal_to_genome(optimisation.genome_to_meal(g, self.ra), self.ra)
+        self.assertEqual(g.genome_key, g2.genome_key)
+
+    def test_meal_data_is_keyed_by_datafile_name(self):
+        """Checks the meal holds each recipe's quantity against its datafile name."""
+        g = optimisation.Genome(recipe_ids=[self.ra.recipe_ids['side-b']], quantities_g=[80])
+        meal = optimisation.genome_to_meal(g, self.ra)
+        self.assertEqual(80, meal.recipe_quantities_data['side-b']['quantity_in_g'])
+
+
+class TestCreateRandomGenome(GenomeTestCase):
+    """Tests the create_random_genome function."""
+
+    def test_slots_are_drawn_from_candidates_at_typical_serving_size(self):
+        """Checks each slot holds one of its candidates, at its typical serving size."""
+        for _ in range(20):
+            g = optimisation.create_random_genome(self.candidates, self.ra, self.rng)
+            for slot, candidates in enumerate(self.candidates):
+                self.assertIn(g.recipe_ids[slot], candidates)
+                self.assertEqual(self.ra.typical_serving_size_g[g.recipe_ids[slot]], g.quantities_g[slot])
+
+
+class TestSpliceGenomes(GenomeTestCase):
+    """Tests the splice_genomes function."""
+
+    def test_slots_come_from_parents(self):
+        """Checks each slot of the child is the same slot from one of its parents."""
+        g1 = optimisation.create_random_genome(self.candidates, self.ra, self.rng)
+        g2 = optimisation.create_random_genome(self.candidates, self.ra, self.rng)
+        for _ in range(20):
+            child = optimisation.splice_genomes(g1, g2, self.rng)
+            for slot in range(len(child)):
+                self.assertIn(
+                    (child.recipe_ids[slot], child.quantities_g[slot]),
+                    [(g1.recipe_ids[slot], g1.quantities_g[slot]), (g2.recipe_ids[slot], g2.quantities_g[slot])]
+                )
+
+
+class TestMutateGenome(GenomeTestCase):
+    """Tests the mutate_genome function."""
+
+    def test_changes_one_quantity_within_bounds(self):
+        """Checks a single quantity changes, to within half and one and a half typical servings."""
+        g = optimisation.create_random_genome(self.candidates, self.ra, self.rng)
+        before = g.quantities_g.copy()
+        optimisation.mutate_genome(g, self.ra, self.rng)
+        changed = numpy.flatnonzero(before != g.quantities_g)
+        self.assertEqual(1, len(changed))
+        typical = self.ra.typical_serving_size_g[g.recipe_ids[changed[0]]]
+        self.assertTrue(typical / 2 <= g.quantities_g[changed[0]] <= typical * 1.5)
+
+
+class TestChooseCullLosers(GenomeTestCase):
+    """Tests the choose_cull_losers function."""
+
+    def test_culls_requested_number_of_distinct_members(self):
+        """Checks the right number of distinct members are chosen, across several rounds."""
+        losers = optimisation.choose_cull_losers(self.rng.random(20), 15, self.rng)
+        self.assertEqual(15, len(losers))
+        self.assertEqual(15, len(set(losers.tolist())))
+
+    def test_fittest_member_always_survives(self):
+        """Checks the fittest member never loses a tournament."""
+        fitnesses = self.rng.random(20)
+        for _ in range(20):
+            self.assertNotIn(fitnesses.argmax(), optimisation.choose_cull_losers(fitnesses, 10, self.rng))
+
+
+class TestBreedGenomes(GenomeTestCase):
+    """Tests the breed_genomes function."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        parents = [optimisation.create_random_genome(self.candidates, self.ra, self.rng) for _ in range(5)]
+        self.parent_ids = numpy.stack([p.recipe_ids for p in parents])
+        self.parent_qts = numpy.stack([p.quantities_g for p in parents])
+
+    def breed(self, mutation_prob: float, random_solution_prob: float):
+        return optimisation.breed_genomes(
+            self.parent_ids, self.parent_qts, 50, self.candidates, self.ra, mutation_prob, random_solution_prob,
+            self.rng)
+
+    def test_random_children_use_candidates_at_typical_size(self):
+        """Checks fully random children draw each slot from its candidates."""
+        for child in self.breed(0, 100):
+            for slot, candidates in enumerate(self.candidates):
+                self.assertIn(child.recipe_ids[slot], candidates)
+            self.assertTrue(numpy.array_equal(self.ra.typical_serving_size_g[child.recipe_ids], child.quantities_g))
+
+    def test_spliced_children_take_slots_from_parents(self):
+        """Checks unmutated spliced children only contain slots found on the parents."""
+        for child in self.breed(0, 0):
+            for slot in range(len(child)):
+                from_parent = (self.parent_ids[:, slot] == child.recipe_ids[slot]) & \
+                              (self.parent_qts[:, slot] == child.quantities_g[slot])
+                self.assertTrue(from_parent.any())
+
+    def test_mutated_children_stay_within_range(self):
+        """Checks mutated quantities are within 0.5 and 1.5 typical servings."""
+        for child in self.breed(100, 0):
+            typical = self.ra.typical_serving_size_g[child.recipe_ids]
+            self.assertTrue(numpy.all(child.quantities_g >= typical / 2))
+            self.assertTrue(numpy.all(child.quantities_g <= typical * 1.5))
@@ -0,0 +1,76 @@
+"""Tests for the History class and history readers."""
+import os
+import tempfile
+from unittest import TestCase
+
+import optimisation
+
+
+class HistoryTestCase(TestCase):
+    """Provides a history file in a temporary directory."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history_filepath = os.path.join(self.tmp_dir.name, 'history.jsonl')
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+
+class TestRecordSolution(HistoryTestCase):
+    """Tests the History.record_solution method."""
+
+    def test_appends_one_line_per_record(self):
+        """Checks each record is appended as its own line, and read back in order."""
+        hist = optimisation.History(self.history_filepath, fsync_every=2)
+        for gen in range(1, 4):
+            hist.record_solution(gen, {'fitness': gen / 10})
+        with open(self.history_filepath) as fh:
+            self.assertEqual(3, len(fh.readlines()))
+        self.assertEqual(
+            [(1, {'fitness': 0.1}), (2, {'fitness': 0.2}), (3, {'fitness': 0.3})],
+            optimisation.read_history(self.history_filepath)
+        )
+
+    def test_new_history_empties_file(self):
+        """Checks creating a history discards the records of a previous run."""
+        optimisation.History(self.history_filepath).record_solution(1, {'fitness': 0.1})
+        optimisation.History(self.history_filepath)
+        self.assertEqual([], optimisation.read_history(self.history_filepath))
+
+
+class TestHistoryReader(HistoryTestCase):
+    """Tests the HistoryReader class."""
+
+    def test_only_returns_new_records(self):
+        """Checks each read only returns the records added since the last read."""
+        hist = optimisation.History(self.history_filepath)
+        reader = optimisation.HistoryReader(self.history_filepath)
+        hist.record_solution(1, {'fitness': 0.1})
+        self.assertEqual([(1, {'fitness': 0.1})], reader.read_new())
+        self.assertEqual([], reader.read_new())
+        hist.record_solution(2, {'fitness': 0.2})
+        self.assertEqual([(2, {'fitness': 0.2})], reader.read_new())
+
+    def test_partial_lines_are_left_for_next_read(self):
+        """Checks a partly written record is not returned until it is complete."""
+        optimisation.History(self.history_filepath)
+        reader = optimisation.HistoryReader(self.history_filepath)
+        with open(self.history_filepath, 'a') as fh:
+            fh.write('[1, {"fitn')
+        self.assertEqual([], reader.read_new())
+        with open(self.history_filepath, 'a') as fh:
+            fh.write('ess": 0.1}]\n')
+        self.assertEqual([(1, {'fitness': 0.1})], reader.read_new())
+
+    def test_restarted_history_is_read_from_start(self):
+        """Checks a reader starts again, and flags the restart, when the history is recreated."""
+        hist = optimisation.History(self.history_filepath)
+        reader = optimisation.HistoryReader(self.history_filepath)
+        hist.record_solution(1, {'fitness': 0.1})
+        hist.record_solution(2, {'fitness': 0.2})
+        reader.read_new()
+        self.assertFalse(reader.restarted)
+        optimisation.History(self.history_filepath).record_solution(1, {'fitness': 0.3})
+        self.assertEqual([(1, {'fitness': 0.3})], reader.read_new())
+        self.assertTrue(reader.restarted)
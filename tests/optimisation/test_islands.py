@@ -0,0 +1,102 @@
+"""Tests for the optimisation.islands module."""
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import model
+import optimisation
+import optimisation.benchmark
+import persistence
+from tests.optimisation import fixtures as ofx
+
+
+def create_state(fitnesses, offset: int) -> 'optimisation.islands.IslandState':
+    """Creates an island state whose members are identifiable by their recipe ids."""
+    n = len(fitnesses)
+    return optimisation.islands.IslandState(
+        recipe_ids=numpy.arange(n).reshape(n, 1) + offset,
+        quantities_g=numpy.ones((n, 1)),
+        fitnesses=numpy.array(fitnesses, dtype=float),
+        generation=1,
+        rng=numpy.random.default_rng(0)
+    )
+
+
+class TestGetMigrationRoutes(TestCase):
+    """Tests for the get_migration_routes function."""
+
+    def test_ring_sends_to_next_island(self):
+        """Checks each island sends to its neighbour, wrapping around."""
+        self.assertEqual([(0, 1), (1, 2), (2, 0)], optimisation.get_migration_routes(3, 'ring'))
+
+    def test_full_sends_to_every_other_island(self):
+        """Checks every island sends to every other island."""
+        self.assertEqual(6, len(optimisation.get_migration_routes(3, 'full')))
+
+    def test_single_island_has_no_routes(self):
+        """Checks a lone island has nowhere to migrate to."""
+        self.assertEqual([], optimisation.get_migration_routes(1, 'ring'))
+
+    def test_unknown_topology_raises(self):
+        """Checks an unknown topology is rejected."""
+        with self.assertRaises(ValueError):
+            optimisation.get_migration_routes(3, 'star')
+
+
+class TestMigrate(TestCase):
+    """Tests for the migrate function."""
+
+    def test_best_replace_worst_on_ring(self):
+        """Checks each island's best member replaces its neighbour's worst member."""
+        states = [create_state([0.1, 0.9, 0.5], offset=0), create_state([0.8, 0.2, 0.3], offset=100)]
+        optimisation.migrate(states, migration_size=1, topology='ring')
+        # Island 0's best (id 1) replaces island 1's worst (slot 1);
+        self.assertEqual(1, states[1]['recipe_ids'][1, 0])
+        # Island 1's best (id 100) replaces island 0's worst (slot 0);
+        self.assertEqual(100, states[0]['recipe_ids'][0, 0])
+        self.assertEqual(0.8, states[0]['fitnesses'][0])
+
+
+class TestRunIslands(TestCase):
+    """Tests for the run_islands function, run against the test database."""
+
+    def setUp(self) -> None:
+        self.path_into_db = persistence.configs.PATH_INTO_DB
+        persistence.configs.PATH_INTO_DB = optimisation.benchmark.TEST_DATABASE_PATH
+        persistence.cache.reset()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.history_filepath = os.path.join(self.tmp_dir.name, 'history.jsonl')
+
+    def tearDown(self) -> None:
+        persistence.configs.PATH_INTO_DB = self.path_into_db
+        persistence.cache.reset()
+        self.tmp_dir.cleanup()
+
+    def run_islands(self, max_generations: int, seed: int) -> 'model.meals.SettableMeal':
+        """Runs two small islands over the main and drink recipes."""
+        return optimisation.run_islands(
+            ga_configs=dict(optimisation.configs.ga_configs, max_population_size=10, max_generations=max_generations),
+            constraints={'tags': ['main', 'drink'], 'flags': {}, 'time': None},
+            goals=ofx.test_goals,
+            history_filepath=self.history_filepath,
+            island_configs=dict(optimisation.configs.island_configs, num_islands=2, migration_interval=2),
+            seed=seed,
+            num_workers=2
+        )
+
+    def test_same_seed_gives_same_result(self):
+        """Checks two runs with the same seed find the same meal, and record the same history."""
+        first_meal = self.run_islands(max_generations=5, seed=7)
+        first_history = optimisation.read_history(self.history_filepath)
+        second_meal = self.run_islands(max_generations=5, seed=7)
+        self.assertEqual(4, len(first_history))
+        self.assertEqual(first_history, optimisation.read_history(self.history_filepath))
+        self.assertEqual(first_meal.persistable_data, second_meal.persistable_data)
+
+    def test_returns_initial_fittest_without_generations(self):
+        """Checks a run with no generations to evolve returns a meal, and records no history."""
+        meal = self.run_islands(max_generations=1, seed=7)
+        self.assertEqual(2, len(meal.persistable_data))
+        self.assertEqual([], optimisation.read_history(self.history_filepath))
@@ -0,0 +1,62 @@
+"""Tests for the optimisation.local_search module."""
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class TestRefineQuantities(TestCase):
+    """Tests the refine_quantities function."""
+
+    def setUp(self) -> None:
+        self.ra = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.engine = optimisation.build_fitness_engine(goals=ofx.test_goals, recipe_arrays=self.ra)
+        self.recipe_ids = numpy.array([self.ra.recipe_ids[df] for df in ['main-a', 'side-b', 'drink-b']])
+        self.typical = self.ra.typical_serving_size_g[self.recipe_ids]
+
+    def test_quantities_are_within_serving_bounds(self):
+        """Checks the refined quantities are between 0.5 and 1.5 typical servings."""
+        quantities_g = optimisation.refine_quantities(self.recipe_ids, self.engine)
+        self.assertTrue(numpy.all(quantities_g >= self.typical / 2 - 1e-6))
+        self.assertTrue(numpy.all(quantities_g <= self.typical * 1.5 + 1e-6))
+
+    def test_beats_random_quantities(self):
+        """Checks no random quantities within the bounds score better than the refined quantities."""
+        refined = self.engine.score(self.recipe_ids, optimisation.refine_quantities(self.recipe_ids, self.engine))
+        rng = numpy.random.default_rng(0)
+        random_quantities = rng.uniform(self.typical / 2, self.typical * 1.5, size=(500, 3))
+        random_scores = self.engine.score(numpy.tile(self.recipe_ids, (500, 1)), random_quantities)
+        self.assertGreaterEqual(refined[0] + 1e-9, random_scores.max())
+
+    def test_returns_none_if_max_cost_cannot_be_met(self):
+        """Checks None is returned when every quantity is too expensive."""
+        engine = optimisation.build_fitness_engine(goals={**ofx.test_goals, 'max_cost': 0.01}, recipe_arrays=self.ra)
+        self.assertIsNone(optimisation.refine_quantities(self.recipe_ids, engine))
+
+
+class TestRefinePopulation(TestCase):
+    """Tests the refine_population function."""
+
+    def test_refined_members_replace_originals(self):
+        """Checks improved members are written back into the population with their new fitness."""
+        ra = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        engine = optimisation.build_fitness_engine(goals=ofx.test_goals, recipe_arrays=ra)
+        rng = numpy.random.default_rng(1)
+        candidates = [numpy.arange(0, 2), numpy.arange(2, 4), numpy.arange(4, 6)]
+        pop = optimisation.Population(
+            create_random_member=lambda: optimisation.create_random_genome(candidates, ra, rng),
+            calculate_fitness=engine.calculate_genome_fitness,
+            max_size=10,
+            rng=rng
+        )
+        pop.populate_with_random_members()
+        best_before = pop.highest_fitness_score
+
+        num_improved = optimisation.refine_population(pop, engine, num_members=3)
+
+        self.assertGreater(num_improved, 0)
+        self.assertEqual(10, len(pop))
+        self.assertGreater(pop.highest_fitness_score, best_before)
+        self.assertEqual(engine.calculate_genome_fitness(*pop.members), pop.fitnesses.tolist())
@@ -1,6 +1,12 @@
 """Tests for the optimisation.main module."""
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
-from unittest import TestCase
+from unittest import TestCase, mock
+
+import numpy
 
 import optimisation
 import persistence
@@ -149,3 +155,59 @@ class TestSpliceMembers(TestCase):
         m3 = optimisation.splice_members(m1, m2)
         for rq in m3.recipe_quantities.values():
             self.assertTrue(rq.quantity_in_g in tags[rq.recipe.tags[0]])
+
+
+class TestRunFitnessReps(TestCase):
+    """Tests for the run_fitness_reps function, with each rep run in a thread by a stand-in."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_file = os.path.join(self.tmp_dir.name, 'reps.json')
+        self.history_filepath = os.path.join(self.tmp_dir.name, 'history.jsonl')
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def run_fitness_reps(self, **kwargs) -> 'mock.Mock':
+        """Runs the reps, each returning a fitness history built from its seed, and returns the rep stand-in."""
+        run_fitness_rep = mock.Mock(side_effect=lambda ga_configs, constraints, goals, history_filepath, seed,
+                                    path_into_db: {1: seed % 100 / 100, 2: 1.0})
+        with mock.patch('optimisation.main.ProcessPoolExecutor', ThreadPoolExecutor), \
+                mock.patch('optimisation.main._run_fitness_rep', run_fitness_rep):
+            optimisation.main.run_fitness_reps(
+                output_file=self.output_file, history_filepath=self.history_filepath, **kwargs)
+        return run_fitness_rep
+
+    def test_seeds_are_drawn_from_seed(self):
+        """Checks each rep gets its own seed from the seed sequence, so the reps are reproducible."""
+        run_fitness_rep = self.run_fitness_reps(num_reps=3, seed=11)
+        expected = [int(s) for s in numpy.random.SeedSequence(11).generate_state(3)]
+        self.assertEqual(expected, [c.args[4] for c in run_fitness_rep.call_args_list])
+        self.assertEqual(3, len(set(expected)))
+
+    def test_explicit_seeds_are_used(self):
+        """Checks explicit seeds are passed to the reps in order, and must have one per rep."""
+        run_fitness_rep = self.run_fitness_reps(num_reps=2, seeds=[5, 9])
+        self.assertEqual([5, 9], [c.args[4] for c in run_fitness_rep.call_args_list])
+        with self.assertRaises(ValueError):
+            self.run_fitness_reps(num_reps=3, seeds=[5, 9])
+
+    def test_each_rep_has_own_history_file(self):
+        """Checks each rep writes its history next to history_filepath, numbered by rep."""
+        run_fitness_rep = self.run_fitness_reps(num_reps=2, seed=1)
+        root = os.path.join(self.tmp_dir.name, 'history')
+        self.assertEqual([f"{root}.rep1.jsonl", f"{root}.rep2.jsonl"],
+                         [c.args[3] for c in run_fitness_rep.call_args_list])
+
+    def test_saves_fitness_by_rep_and_generation(self):
+        """Checks the output file holds each rep's fitness history, keyed by rep and generation."""
+        self.run_fitness_reps(num_reps=2, seeds=[105, 250], set_goals=ofx.test_goals)
+        with open(self.output_file) as fh:
+            self.assertEqual({'1': {'1': 0.05, '2': 1.0}, '2': {'1': 0.5, '2': 1.0}}, json.load(fh))
+
+    def test_set_goals_does_not_change_configs(self):
+        """Checks goals set for the reps are passed to them, without replacing the configured goals."""
+        goals = optimisation.configs.goals
+        run_fitness_rep = self.run_fitness_reps(num_reps=1, seed=1, set_goals=ofx.test_goals)
+        self.assertEqual(ofx.test_goals, run_fitness_rep.call_args.args[2])
+        self.assertIs(goals, optimisation.configs.goals)
@@ -0,0 +1,68 @@
+"""Tests for the optimisation.metrics module."""
+import json
+import os
+import pstats
+import tempfile
+from unittest import TestCase
+
+import optimisation
+
+
+class TestMetrics(TestCase):
+    """Tests the Metrics class."""
+
+    def test_time_accumulates_calls_and_seconds(self):
+        """Checks each timed block adds a call and some time to its phase."""
+        metrics = optimisation.Metrics()
+        for _ in range(3):
+            with metrics.time('cull_population'):
+                sum(range(1000))
+        self.assertEqual(3, metrics.get_calls('cull_population'))
+        self.assertGreater(metrics.get_seconds('cull_population'), 0)
+        self.assertEqual(0, metrics.get_calls('regrow_population'))
+
+    def test_wrap_times_each_call(self):
+        """Checks a wrapped function still returns its result, and each call is counted."""
+        metrics = optimisation.Metrics()
+        calculate_fitness = metrics.wrap('calculate_fitness', lambda *members: [0.5] * len(members))
+        self.assertEqual([0.5, 0.5], calculate_fitness(1, 2))
+        calculate_fitness(3)
+        self.assertEqual(2, metrics.get_calls('calculate_fitness'))
+
+    def test_emit_sends_totals_to_sinks(self):
+        """Checks every sink receives the cumulative totals for the generation."""
+        records = []
+        metrics = optimisation.Metrics(sinks=[records.append])
+        metrics.record('log_fittest_member', 0.25)
+        metrics.emit(1)
+        metrics.record('log_fittest_member', 0.5)
+        metrics.emit(2)
+        self.assertEqual(
+            {'generation': 2, 'phases': {'log_fittest_member': {'seconds': 0.75, 'calls': 2}}}, records[-1])
+
+
+class TestFileOutputs(TestCase):
+    """Tests the JSON Lines sink and the profiler."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_jsonl_writer_appends_records(self):
+        """Checks each record is written as its own line."""
+        filepath = os.path.join(self.tmp_dir.name, 'metrics.jsonl')
+        metrics = optimisation.Metrics(sinks=[optimisation.JsonlMetricsWriter(filepath)])
+        metrics.record('cull_population', 1.0)
+        metrics.emit(1)
+        metrics.emit(2)
+        with open(filepath) as fh:
+            self.assertEqual([1, 2], [json.loads(line)['generation'] for line in fh])
+
+    def test_profiled_dumps_stats(self):
+        """Checks the profile is saved and readable by pstats."""
+        filepath = os.path.join(self.tmp_dir.name, 'run.prof')
+        with optimisation.profiled(filepath):
+            sum(range(1000))
+        self.assertGreater(pstats.Stats(filepath).total_calls, 0)
@@ -0,0 +1,45 @@
+"""Tests for the optimisation.milp module."""
+import itertools
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class TestSolveMeal(TestCase):
+    """Tests for the solve_meal function."""
+
+    def setUp(self) -> None:
+        self.recipe_arrays = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.candidate_recipe_ids = optimisation.CandidatePools(
+            self.recipe_arrays, ofx.test_precalc_data).get_pools(['main', 'side', 'drink'], {})
+
+    def test_matches_best_of_every_choice(self):
+        """Checks the solution is as fit as the best refined quantities for every choice of recipes."""
+        engine = optimisation.build_fitness_engine(goals=ofx.test_goals, recipe_arrays=self.recipe_arrays)
+        genome, fitness = optimisation.solve_meal(engine, self.candidate_recipe_ids)
+        best_fitness = 0
+        for recipe_ids in itertools.product(*self.candidate_recipe_ids):
+            quantities_g = optimisation.refine_quantities(numpy.array(recipe_ids), engine)
+            if quantities_g is not None:
+                best_fitness = max(best_fitness, float(engine.score(numpy.array(recipe_ids), quantities_g)[0]))
+        self.assertAlmostEqual(best_fitness, fitness, places=6)
+        self.assertAlmostEqual(fitness, float(engine.score(genome.recipe_ids, genome.quantities_g)[0]))
+
+    def test_one_recipe_per_slot_within_serving_bounds(self):
+        """Checks each slot holds one of its candidates, at between 0.5 and 1.5 typical servings."""
+        engine = optimisation.build_fitness_engine(goals=ofx.test_goals, recipe_arrays=self.recipe_arrays)
+        genome, _ = optimisation.solve_meal(engine, self.candidate_recipe_ids)
+        for recipe_id, quantity_g, candidates in zip(genome.recipe_ids, genome.quantities_g,
+                                                     self.candidate_recipe_ids):
+            self.assertIn(recipe_id, candidates)
+            typical_serving_size_g = self.recipe_arrays.typical_serving_size_g[recipe_id]
+            self.assertTrue(0.5 * typical_serving_size_g - 1e-6 <= quantity_g <= 1.5 * typical_serving_size_g + 1e-6)
+
+    def test_returns_none_if_max_cost_cannot_be_met(self):
+        """Checks None is returned when every meal is too expensive."""
+        engine = optimisation.build_fitness_engine(goals=dict(ofx.test_goals, max_cost=0.01),
+                                                   recipe_arrays=self.recipe_arrays)
+        self.assertIsNone(optimisation.solve_meal(engine, self.candidate_recipe_ids))
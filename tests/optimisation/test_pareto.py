@@ -0,0 +1,63 @@
+"""Tests for the optimisation.pareto module."""
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class TestNonDominatedSort(TestCase):
+    """Tests for the non_dominated_sort function."""
+
+    def test_assigns_fronts(self):
+        """Checks each member is put in the first front where nothing left dominates it."""
+        objectives = numpy.array([
+            [1, 4],  # Front 0;
+            [2, 2],  # Front 0;
+            [4, 1],  # Front 0;
+            [3, 3],  # Dominated by [2, 2], front 1;
+            [4, 4],  # Dominated by [3, 3], front 2;
+            [2, 2],  # Equal to a front 0 member, which does not dominate it, front 0;
+        ], dtype=float)
+        self.assertEqual([0, 0, 0, 1, 2, 0], optimisation.non_dominated_sort(objectives).tolist())
+
+
+class TestCrowdingDistance(TestCase):
+    """Tests for the crowding_distance function."""
+
+    def test_ends_are_infinite_and_interior_sums_gaps(self):
+        """Checks the ends of a front are always kept, and interior members score the gaps around them."""
+        objectives = numpy.array([[0, 4], [1, 3], [3, 1], [4, 0]], dtype=float)
+        distances = optimisation.crowding_distance(objectives, numpy.zeros(4, dtype=int))
+        self.assertEqual([numpy.inf, numpy.inf], distances[[0, 3]].tolist())
+        # Member 1's neighbours are 3 apart on each objective, over spans of 4;
+        self.assertAlmostEqual(1.5, distances[1])
+
+
+class TestSelectSurvivors(TestCase):
+    """Tests for the select_survivors function."""
+
+    def test_prefers_lower_fronts_then_less_crowded(self):
+        """Checks survivors fill from the first front, breaking ties on crowding distance."""
+        objectives = numpy.array([[0, 4], [1, 3], [1.1, 2.9], [4, 0], [5, 5]], dtype=float)
+        survivors = optimisation.pareto.select_survivors(objectives, 3)
+        # The two ends of the front, then member 2, whose neighbours are further apart than member 1's;
+        self.assertEqual({0, 2, 3}, set(survivors.tolist()))
+
+
+class TestComputeObjectives(TestCase):
+    """Tests for the compute_objectives function."""
+
+    def test_objectives_match_fitness_engine(self):
+        """Checks the nutrient error is 1 - the unpenalised fitness, and the cost and calories are unscaled."""
+        recipe_arrays = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        engine = optimisation.build_fitness_engine(goals=ofx.test_goals, recipe_arrays=recipe_arrays)
+        ids = recipe_arrays.recipe_ids
+        recipe_ids = numpy.array([[ids['main-a'], ids['side-a'], ids['drink-a']]])
+        quantities_g = numpy.array([[300., 150., 250.]])
+        objectives = optimisation.pareto.compute_objectives(engine, recipe_ids, quantities_g)
+        deltas = numpy.abs(engine.nutrient_ratios(recipe_ids, quantities_g) - engine.target_ratios)
+        self.assertAlmostEqual(deltas.max(), objectives[0, 0])
+        self.assertAlmostEqual(300 * 0.004 + 150 * 0.001 + 250 * 0.002, objectives[0, 1])
+        self.assertAlmostEqual(abs(300 * 2 + 150 * 1 + 250 * 0.5 - 1000) / 1000, objectives[0, 2])
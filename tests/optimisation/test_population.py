@@ -1,5 +1,7 @@
 """Tests for the Population class."""
-from unittest import TestCase
+from unittest import TestCase, mock
+
+import numpy
 
 import optimisation
 import model
@@ -26,4 +28,78 @@ class TestPopulateWithRandomMembers(TestCase):
             self.assertTrue(isinstance(member, model.meals.SettableMeal))
 
         # Check there are the right number of objects in the population;
-        self.assertEqual(10, len(pop))
\ No newline at end of file
+        self.assertEqual(10, len(pop))
+
+class TestSlots(TestCase):
+    """Tests the slot bookkeeping used by append, remove and the stored fitnesses."""
+
+    def setUp(self) -> None:
+        self.members = [object() for _ in range(5)]
+        fitnesses = {id(m): i / 10 for i, m in enumerate(self.members)}
+        self.pop = optimisation.Population(
+            create_random_member=object,
+            calculate_fitness=lambda *ms: [fitnesses[id(m)] for m in ms],
+            max_size=2
+        )
+        for member in self.members:
+            self.pop.append(member)
+
+    def test_fitness_array_grows_past_max_size(self):
+        """Checks every member's fitness is stored once the initial array is full."""
+        self.assertEqual([0, 0.1, 0.2, 0.3, 0.4], self.pop.fitnesses.tolist())
+
+    def test_cannot_append_twice(self):
+        """Checks appending a member already in the population raises an exception."""
+        with self.assertRaises(ValueError):
+            self.pop.append(self.members[2])
+
+    def test_remove_keeps_fitnesses_aligned(self):
+        """Checks the member swapped into a removed slot keeps its own fitness."""
+        self.pop.remove(self.members[1])
+        self.assertNotIn(self.members[1], self.pop)
+        self.assertEqual(4, len(self.pop))
+        for member, fitness in zip(self.pop.members, self.pop.fitnesses):
+            self.assertEqual(self.pop.get_fitness(member), fitness)
+        self.assertEqual(0.4, self.pop.get_fitness(self.members[4]))
+
+    def test_append_uses_provided_fitness(self):
+        """Checks a provided fitness is stored without recalculating."""
+        member = object()
+        self.pop.append(member, fitness=0.9)
+        self.assertEqual(0.9, self.pop.get_fitness(member))
+        self.assertIs(member, self.pop.fittest_member)
+
+    def test_chooses_two_different_members(self):
+        """Checks the two chosen members are never the same member."""
+        for rng in (None, numpy.random.default_rng(1)):
+            self.pop._rng = rng
+            for _ in range(50):
+                m1, m2 = self.pop.choose_two_random_members()
+                self.assertIsNot(m1, m2)
+
+    def test_remove_slots_compacts_survivors(self):
+        """Checks removing several slots keeps the survivors, their order and their fitnesses."""
+        self.pop.remove_slots(numpy.array([0, 3]))
+        self.assertEqual([self.members[i] for i in (1, 2, 4)], self.pop.members)
+        self.assertEqual([0.1, 0.2, 0.4], self.pop.fitnesses.tolist())
+        self.assertEqual(0.4, self.pop.get_fitness(self.members[4]))
+        self.assertNotIn(self.members[3], self.pop)
+
+
+class TestLogFittestMember(TestCase):
+    """Tests the log_fittest_member method."""
+
+    def test_scales_to_run_total_calories(self):
+        """Checks the fittest member is logged scaled to the run's total calories, not the configured goal."""
+        logged = []
+        pop = optimisation.Population(
+            create_random_member=object,
+            calculate_fitness=lambda *ms: [0.5 for _ in ms],
+            log_fittest_member=lambda gen, data: logged.append((gen, data)),
+            total_calories=1234
+        )
+        pop.append(object())
+        with mock.patch('optimisation.create_solution_data', return_value={'fitness': 0.5}) as create_solution_data:
+            pop.log_fittest_member()
+        create_solution_data.assert_called_once_with(0.5, pop.fittest_member, 1234)
+        self.assertEqual([(1, {'fitness': 0.5})], logged)
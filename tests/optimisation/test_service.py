@@ -0,0 +1,130 @@
+"""Tests for the optimisation.service module."""
+import asyncio
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import optimisation
+import optimisation.service
+
+
+def fake_job_runner(job_id, request, progress_queue, cancel_event, path_into_db):
+    """Reports a generation per seed unit, stopping early if cancelled, and waits for cancellation if seed is 0."""
+    num_generations = request['seed']
+    if num_generations == 0:
+        cancel_event.wait(5)
+    generation = 0
+    for generation in range(1, num_generations + 1):
+        if cancel_event.is_set():
+            break
+        progress_queue.put({'job_id': job_id, 'generation': generation, 'fitness': generation / 10,
+                            'evaluations': generation * 10})
+    return {'meal': {}, 'fitness': generation / 10, 'generation': generation, 'evaluations': generation * 10,
+            'cancelled': cancel_event.is_set()}
+
+
+class TestParseJobRequest(TestCase):
+    """Tests for the parse_job_request function."""
+
+    def test_fills_in_defaults(self):
+        """Checks ga configs are merged over the defaults, and missing keys take the defaults."""
+        request = optimisation.service.parse_job_request({'ga_configs': {'max_generations': 5}})
+        self.assertEqual(5, request['ga_configs']['max_generations'])
+        self.assertEqual(optimisation.configs.ga_configs['cull_percentage'], request['ga_configs']['cull_percentage'])
+        self.assertEqual(optimisation.configs.goals, request['goals'])
+        self.assertIsNone(request['seed'])
+
+    def test_rejects_invalid_requests(self):
+        """Checks unknown keys and badly typed values are rejected."""
+        for request in [[], {'unknown': 1}, {'ga_configs': 5}, {'seed': 'one'}]:
+            with self.assertRaises(ValueError):
+                optimisation.service.parse_job_request(request)
+
+
+class TestJobProgressPolicy(TestCase):
+    """Tests for the JobProgressPolicy class."""
+
+    def test_reports_progress_and_stops_on_cancel(self):
+        """Checks each generation is reported, and the run stops once cancelled."""
+        progress_queue, cancel_event = queue.Queue(), threading.Event()
+        policy = optimisation.service.JobProgressPolicy(
+            'job', optimisation.MaxGenerations(10), progress_queue, cancel_event)
+        pop = optimisation.Population(create_random_member=lambda: None, calculate_fitness=lambda *m: [0.5] * len(m))
+        pop.append(object())
+        self.assertFalse(policy.should_stop(pop, 3))
+        cancel_event.set()
+        self.assertTrue(policy.should_stop(pop, 4))
+        self.assertEqual({'job_id': 'job', 'generation': 1, 'fitness': 0.5, 'evaluations': 3}, progress_queue.get())
+        self.assertEqual(4, progress_queue.get()['evaluations'])
+
+
+class TestOptimisationService(TestCase):
+    """Tests for the OptimisationService class, with jobs run on threads by a fake job runner."""
+
+    def run_with_service(self, test):
+        """Runs the coroutine function with a started service, closing the service afterwards."""
+        async def run():
+            service = optimisation.service.OptimisationService(
+                executor=ThreadPoolExecutor(max_workers=2), job_runner=fake_job_runner)
+            await service.start()
+            try:
+                await asyncio.wait_for(test(service), 10)
+            finally:
+                await service.close()
+        asyncio.run(run())
+
+    def test_job_runs_to_completion(self):
+        """Checks a submitted job finishes with its result, having streamed every generation."""
+        async def test(service):
+            status, summary = await service.handle_request('POST', '/jobs', json.dumps({'seed': 3}).encode())
+            self.assertEqual((202, 'queued'), (status, summary['state']))
+            status, stream = await service.handle_request('GET', f"/jobs/{summary['job_id']}/progress", b'')
+            self.assertEqual([1, 2, 3], [record['generation'] async for record in stream])
+            status, summary = await service.handle_request('GET', f"/jobs/{summary['job_id']}", b'')
+            self.assertEqual('finished', summary['state'])
+            self.assertEqual(3, summary['result']['generation'])
+        self.run_with_service(test)
+
+    def test_running_job_can_be_cancelled(self):
+        """Checks cancelling a job stops it, keeping its result."""
+        async def test(service):
+            job = service.submit({'seed': 0})
+            status, summary = await service.handle_request('DELETE', f"/jobs/{job.job_id}", b'')
+            self.assertEqual(202, status)
+            await job.future
+            self.assertEqual('cancelled', job.state)
+            self.assertTrue(job.result['cancelled'])
+        self.run_with_service(test)
+
+    def test_errors(self):
+        """Checks bad requests, unknown routes and jobs, and disallowed methods are reported."""
+        async def test(service):
+            self.assertEqual(400, (await service.handle_request('POST', '/jobs', b'{"seed": "x"}'))[0])
+            self.assertEqual(404, (await service.handle_request('GET', '/recipes', b''))[0])
+            self.assertEqual(404, (await service.handle_request('GET', '/jobs/missing', b''))[0])
+            self.assertEqual(405, (await service.handle_request('PUT', '/jobs', b''))[0])
+        self.run_with_service(test)
+
+    def test_malformed_content_length_is_rejected(self):
+        """Checks a request with a non-numeric or negative Content-Length gets a 400 response."""
+        async def test(service):
+            server = await asyncio.start_server(service._handle_connection, host='127.0.0.1', port=0)
+            async with server:
+                for content_length in ['abc', '-1']:
+                    reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                    writer.write(f"POST /jobs HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode())
+                    await writer.drain()
+                    self.assertTrue((await reader.read()).startswith(b'HTTP/1.1 400 Bad Request'))
+                    writer.close()
+        self.run_with_service(test)
+
+    def test_forgets_oldest_ended_jobs(self):
+        """Checks only max_ended_jobs ended jobs are kept."""
+        async def test(service):
+            service.max_ended_jobs = 1
+            first, second = service.submit({'seed': 1}), service.submit({'seed': 1})
+            await asyncio.gather(first.future, second.future)
+            self.assertEqual(1, len(service.jobs))
+        self.run_with_service(test)
@@ -0,0 +1,120 @@
+"""Tests for the optimisation.solution_archive module."""
+import copy
+import math
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy
+
+import optimisation
+from tests.optimisation import fixtures as ofx
+
+
+class TestGetGoalDistance(TestCase):
+    """Tests for the get_goal_vector and get_goal_distance functions."""
+
+    def test_identical_goals_have_no_distance(self):
+        """Checks the same goals give a distance of zero."""
+        goal_vector = optimisation.solution_archive.get_goal_vector(ofx.test_constraints, ofx.test_goals)
+        self.assertEqual(0, optimisation.solution_archive.get_goal_distance(goal_vector, goal_vector))
+
+    def test_calories_are_compared_relatively(self):
+        """Checks doubling the calories is the same distance at any scale."""
+        goals = [dict(ofx.test_goals, total_calories=calories) for calories in (500, 1000, 2000)]
+        v1, v2, v3 = [optimisation.solution_archive.get_goal_vector(ofx.test_constraints, g) for g in goals]
+        self.assertAlmostEqual(optimisation.solution_archive.get_goal_distance(v1, v2),
+                               optimisation.solution_archive.get_goal_distance(v2, v3))
+
+    def test_zero_max_cost_is_compared(self):
+        """Checks a zero max cost gives a finite goal vector, nearer to cheap goals than to expensive ones."""
+        goals = [dict(ofx.test_goals, max_cost=c) for c in [0, 0.5, 30]]
+        v1, v2, v3 = [optimisation.solution_archive.get_goal_vector(ofx.test_constraints, g) for g in goals]
+        self.assertTrue(math.isfinite(v1['log_max_cost']))
+        self.assertLess(optimisation.solution_archive.get_goal_distance(v1, v2),
+                        optimisation.solution_archive.get_goal_distance(v1, v3))
+
+
+class TestSolutionArchive(TestCase):
+    """Tests for the SolutionArchive class."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tmp_dir.name, 'archive.json')
+        self.recipe_arrays = optimisation.RecipeArrays.from_precalc_data(ofx.test_precalc_data)
+        self.candidate_recipe_ids = optimisation.CandidatePools(
+            self.recipe_arrays, ofx.test_precalc_data).get_pools(['main', 'side'], {})
+        self.rng = numpy.random.default_rng(0)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def genome(self, main: str, side: str, quantity_g: float = 100) -> 'optimisation.Genome':
+        """Returns a genome of the main and side, each at the quantity."""
+        ids = self.recipe_arrays.recipe_ids
+        return optimisation.Genome(recipe_ids=[ids[main], ids[side]], quantities_g=[quantity_g, quantity_g])
+
+    def constraints(self, **flags):
+        """Returns constraints for a main and a side, with the flags."""
+        return {'tags': ['main', 'side'], 'flags': flags}
+
+    def test_round_trip_through_file(self):
+        """Checks saved solutions are loaded by a new archive."""
+        archive = optimisation.SolutionArchive(self.filepath)
+        archive.add(self.constraints(), ofx.test_goals, [self.genome('main-a', 'side-a')], [0.9], self.recipe_arrays)
+        archive.save()
+        seeds = optimisation.SolutionArchive(self.filepath).get_seed_genomes(
+            self.constraints(), ofx.test_goals, self.recipe_arrays, self.candidate_recipe_ids, 1, self.rng)
+        self.assertEqual(['main-a', 'side-a'], [self.recipe_arrays.df_names[i] for i in seeds[0].recipe_ids])
+
+    def test_keeps_fittest_solutions(self):
+        """Checks only the fittest max_solutions are kept, fittest first."""
+        archive = optimisation.SolutionArchive(self.filepath, max_solutions=2)
+        archive.add(self.constraints(), ofx.test_goals,
+                    [self.genome('main-a', 'side-a'), self.genome('main-b', 'side-a'), self.genome('main-a', 'side-b')],
+                    [0.5, 0.9, 0.7], self.recipe_arrays)
+        entry = archive.get_nearest_entry(self.constraints(), ofx.test_goals)
+        self.assertEqual([0.9, 0.7], [solution['fitness'] for solution in entry['solutions']])
+
+    def test_seeds_from_nearest_goals(self):
+        """Checks the entry with the nearest goals is used."""
+        archive = optimisation.SolutionArchive(self.filepath)
+        archive.add(self.constraints(), dict(ofx.test_goals, total_calories=500),
+                    [self.genome('main-a', 'side-a')], [0.9], self.recipe_arrays)
+        archive.add(self.constraints(), dict(ofx.test_goals, total_calories=2000),
+                    [self.genome('main-b', 'side-b')], [0.9], self.recipe_arrays)
+        seeds = archive.get_seed_genomes(self.constraints(), dict(ofx.test_goals, total_calories=1800),
+                                         self.recipe_arrays, self.candidate_recipe_ids, 1, self.rng)
+        self.assertEqual(self.recipe_arrays.recipe_ids['main-b'], seeds[0].recipe_ids[0])
+
+    def test_other_tags_are_not_used(self):
+        """Checks solutions for other tags are never used to seed."""
+        archive = optimisation.SolutionArchive(self.filepath)
+        archive.add(self.constraints(), ofx.test_goals, [self.genome('main-a', 'side-a')], [0.9], self.recipe_arrays)
+        seeds = archive.get_seed_genomes({'tags': ['main', 'drink'], 'flags': {}}, ofx.test_goals,
+                                         self.recipe_arrays, self.candidate_recipe_ids, 10, self.rng)
+        self.assertEqual([], seeds)
+
+    def test_fills_with_mutated_copies(self):
+        """Checks the number of genomes asked for is returned, topping up with mutated copies."""
+        archive = optimisation.SolutionArchive(self.filepath)
+        archive.add(self.constraints(), ofx.test_goals, [self.genome('main-a', 'side-a')], [0.9], self.recipe_arrays)
+        seeds = archive.get_seed_genomes(self.constraints(), ofx.test_goals, self.recipe_arrays,
+                                         self.candidate_recipe_ids, 5, self.rng)
+        self.assertEqual(5, len(seeds))
+        self.assertEqual([100, 100], seeds[0].quantities_g.tolist())
+        # Mutation only changes quantities, so every copy keeps the archived recipes;
+        self.assertTrue(all(seed.recipe_ids.tolist() == seeds[0].recipe_ids.tolist() for seed in seeds))
+
+    def test_skips_solutions_no_longer_valid(self):
+        """Checks solutions with recipes which have been deleted, or are not candidates, are skipped."""
+        archive = optimisation.SolutionArchive(self.filepath)
+        archive.add(self.constraints(), ofx.test_goals,
+                    [self.genome('main-a', 'side-a'), self.genome('main-b', 'side-b')], [0.9, 0.8], self.recipe_arrays)
+        precalc_data = copy.deepcopy(ofx.test_precalc_data)
+        del precalc_data['main-a']
+        recipe_arrays = optimisation.RecipeArrays.from_precalc_data(precalc_data)
+        candidate_recipe_ids = optimisation.CandidatePools(recipe_arrays, precalc_data).get_pools(['main', 'side'], {})
+        seeds = archive.get_seed_genomes(self.constraints(), ofx.test_goals, recipe_arrays, candidate_recipe_ids, 1,
+                                         self.rng)
+        self.assertEqual(['main-b', 'side-b'], [recipe_arrays.df_names[i] for i in seeds[0].recipe_ids])
@@ -0,0 +1,85 @@
+"""Tests for the optimisation.termination module."""
+from types import SimpleNamespace
+from unittest import TestCase
+
+import optimisation
+
+
+def make_population(generation: int, highest_fitness_score: float):
+    """Returns a stand in for a population, with just the attributes the policies read."""
+    return SimpleNamespace(generation=generation, highest_fitness_score=highest_fitness_score)
+
+
+class TestStallDetection(TestCase):
+    """Tests the StallDetection policy."""
+
+    def test_stops_after_generations_without_improvement(self):
+        """Checks the policy stops once the best score has been flat for the set number of generations."""
+        policy = optimisation.StallDetection(num_generations=3)
+        policy.start()
+        scores = [0.5, 0.6, 0.6, 0.6, 0.6]
+        stops = [policy.should_stop(make_population(g, f), 0) for g, f in enumerate(scores, start=1)]
+        self.assertEqual([False, False, False, False, True], stops)
+
+    def test_small_improvements_do_not_count(self):
+        """Checks improvements below the minimum do not reset the stall."""
+        policy = optimisation.StallDetection(num_generations=2, min_improvement=0.01)
+        policy.start()
+        self.assertFalse(policy.should_stop(make_population(1, 0.5), 0))
+        self.assertFalse(policy.should_stop(make_population(2, 0.505), 0))
+        self.assertTrue(policy.should_stop(make_population(3, 0.509), 0))
+
+
+class TestWallClockDeadline(TestCase):
+    """Tests the WallClockDeadline policy."""
+
+    def test_stops_after_deadline(self):
+        """Checks the policy stops once the deadline has passed since start."""
+        now = [100.0]
+        policy = optimisation.WallClockDeadline(max_seconds=5, clock=lambda: now[0])
+        policy.start()
+        now[0] = 104.9
+        self.assertFalse(policy.should_stop(make_population(1, 0), 0))
+        now[0] = 105.0
+        self.assertTrue(policy.should_stop(make_population(1, 0), 0))
+
+
+class TestCombinators(TestCase):
+    """Tests the AnyOf and AllOf policies."""
+
+    def setUp(self) -> None:
+        self.target = optimisation.TargetFitness(0.9)
+        self.budget = optimisation.EvaluationBudget(1000)
+
+    def test_any_of(self):
+        """Checks AnyOf stops when one of its policies stops."""
+        policy = optimisation.AnyOf(self.target, self.budget)
+        self.assertFalse(policy.should_stop(make_population(1, 0.5), 10))
+        self.assertTrue(policy.should_stop(make_population(1, 0.95), 10))
+        self.assertTrue(policy.should_stop(make_population(1, 0.5), 1000))
+
+    def test_all_of(self):
+        """Checks AllOf only stops when all of its policies stop."""
+        policy = optimisation.AllOf(self.target, self.budget)
+        self.assertFalse(policy.should_stop(make_population(1, 0.95), 10))
+        self.assertTrue(policy.should_stop(make_population(1, 0.95), 1000))
+
+
+class TestBuildTerminationPolicy(TestCase):
+    """Tests the build_termination_policy function."""
+
+    def test_unset_limits_are_skipped(self):
+        """Checks only the limits set in the configs become policies."""
+        policy = optimisation.build_termination_policy(
+            {'max_generations': 10, 'target_fitness': None, 'stall_generations': 5})
+        self.assertEqual(
+            [optimisation.MaxGenerations, optimisation.StallDetection],
+            [type(p) for p in policy.policies]
+        )
+
+    def test_acceptable_fitness_does_not_stop_run(self):
+        """Checks acceptable_fitness doesn't stop the run early, and target_fitness does."""
+        policy = optimisation.build_termination_policy({'max_generations': 10, 'acceptable_fitness': 0.9})
+        self.assertFalse(policy.should_stop(make_population(1, 0.95), 0))
+        policy = optimisation.build_termination_policy({'max_generations': 10, 'target_fitness': 0.9})
+        self.assertTrue(policy.should_stop(make_population(1, 0.95), 0))
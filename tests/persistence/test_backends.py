@@ -0,0 +1,101 @@
+"""Tests for functionality in persistence.backends"""
+import json
+import os
+import sqlite3
+import tempfile
+from unittest import TestCase, mock
+
+import model
+import persistence
+import tests
+from tests.persistence import fixtures as fx
+
+
+class TestSQLiteBackend(TestCase):
+    """Tests for the SQLiteBackend class."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.backend = persistence.SQLiteBackend(filepath=f"{self.tmp_dir.name}/test.sqlite3")
+
+    def tearDown(self) -> None:
+        self.backend.close()
+        self.tmp_dir.cleanup()
+
+    def test_round_trips_datafiles_and_index(self):
+        """Check written datafiles are read back, and appear in the index until deleted."""
+        self.backend.write_datafile('db/recipes', 'df-a', 'Toast', {'name': 'Toast'})
+        self.backend.write_datafile('db/recipes', 'df-b', 'Tea', {'name': 'Tea'})
+        self.backend.write_datafile('db/recipes', 'df-a', 'Hot Toast', {'name': 'Hot Toast'})
+        self.assertEqual({'name': 'Hot Toast'}, self.backend.read_datafile('db/recipes', 'df-a'))
+        self.backend.delete_datafile('db/recipes', 'df-b')
+        self.assertEqual({'df-a': 'Hot Toast'}, self.backend.read_index('db/recipes'))
+        self.assertEqual({}, self.backend.read_index('db/ingredients'))
+        with self.assertRaises(persistence.exceptions.DatafileNotFoundError):
+            _ = self.backend.read_datafile('db/recipes', 'df-b')
+
+    def test_failed_batch_is_rolled_back(self):
+        """Check none of a batch's writes are kept if it raises."""
+        with self.assertRaises(RuntimeError):
+            with self.backend.batch():
+                self.backend.write_datafile('db/recipes', 'df-a', 'Toast', {'name': 'Toast'})
+                raise RuntimeError
+        self.assertEqual({}, self.backend.read_index('db/recipes'))
+
+    def test_unique_values_are_unique_per_collection(self):
+        """Check a unique value can't be used twice in a collection, but can in another."""
+        self.backend.write_datafile('db/recipes', 'df-a', 'Toast', {})
+        self.backend.write_datafile('db/ingredients', 'df-b', 'Toast', {})
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.backend.write_datafile('db/recipes', 'df-c', 'Toast', {})
+
+
+class TestJSONBackend(TestCase):
+    """Tests for the JSONBackend class."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = f"{self.tmp_dir.name}/recipes"
+        os.mkdir(self.db_path)
+        with open(f"{self.db_path}/index.json", 'w') as fh:
+            json.dump({}, fh)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_batch_writes_index_once_at_end(self):
+        """Check the index file is only rewritten when the batch ends."""
+        backend = persistence.JSONBackend()
+        with backend.batch():
+            backend.write_datafile(self.db_path, 'df-a', 'Toast', {'name': 'Toast'})
+            backend.write_datafile(self.db_path, 'df-b', 'Tea', {'name': 'Tea'})
+            with open(f"{self.db_path}/index.json") as fh:
+                self.assertEqual({}, json.load(fh))
+        with open(f"{self.db_path}/index.json") as fh:
+            self.assertEqual({'df-a': 'Toast', 'df-b': 'Tea'}, json.load(fh))
+        self.assertEqual({'name': 'Tea'}, persistence.JSONBackend().read_datafile(self.db_path, 'df-b'))
+
+
+class TestImportJSONDatabase(TestCase):
+    """Tests for the import_json_database function."""
+
+    @fx.use_test_database
+    def test_imported_database_matches_json(self):
+        """Check every datafile is imported, and loads the same through the persistence API."""
+        cls = model.ingredients.ReadonlyIngredient
+        df_name = persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey")
+        json_data = persistence.load_datafile(cls=cls, datafile_name=df_name)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            num_imported = persistence.import_json_database(
+                tests.persistence.configs.PATH_INTO_DB, f"{tmp_dir}/{persistence.configs.SQLITE_DB_FILENAME}")
+            self.assertEqual(
+                len(persistence.read_index(cls)) + len(persistence.read_index(model.recipes.RecipeBase)),
+                num_imported
+            )
+            # Load through the persistence API, from a database directory holding only the sqlite file;
+            with mock.patch('persistence.configs.STORAGE_BACKEND', 'sqlite'), \
+                    mock.patch('persistence.configs.PATH_INTO_DB', tmp_dir):
+                persistence.cache.reset()
+                self.assertEqual(df_name, persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey"))
+                self.assertEqual(json_data, persistence.load_datafile(cls=cls, datafile_name=df_name))
+                persistence.get_backend().close()
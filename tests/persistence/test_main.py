@@ -1,5 +1,5 @@
 """Tests for functionality in persistence.main"""
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import model
 import persistence
@@ -21,6 +21,42 @@ class TestGetDatafileNameForUniqueValue(TestCase):
             )
         )
 
+    @fx.use_test_database
+    def test_ignores_surrounding_whitespace(self):
+        """Check that the unique value is matched once stripped."""
+        self.assertEqual(
+            "1198a703-ae23-4303-9b21-dd8ef9d16548",
+            persistence.get_datafile_name_for_unique_value(
+                cls=model.ingredients.ReadonlyIngredient,
+                unique_value=" Honey "
+            )
+        )
+
+    @fx.use_test_database
+    def test_deleted_entry_is_no_longer_found(self):
+        """Check that deleting an index entry removes it from the reverse index too."""
+        cls = model.ingredients.ReadonlyIngredient
+        df_name = persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey")
+        with mock.patch('builtins.open', mock.mock_open()):
+            persistence.main._delete_index_entry(cls, df_name)
+        with self.assertRaises(persistence.exceptions.UniqueValueNotFoundError):
+            _ = persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey")
+
+    @fx.use_test_database
+    def test_colliding_value_is_found_once_first_is_deleted(self):
+        """Check that where two unique values strip to the same value, the second is found once the first has
+        been deleted."""
+        cls = model.ingredients.ReadonlyIngredient
+        df_name = persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey")
+        persistence.read_index(cls)['other-honey'] = " Honey"
+        persistence.cache.reverse_indexes = {}
+        self.assertEqual(df_name, persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey"))
+        persistence.main._delete_index_entry(cls, df_name)
+        self.assertEqual("other-honey", persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey"))
+        persistence.main._delete_index_entry(cls, "other-honey")
+        with self.assertRaises(persistence.exceptions.UniqueValueNotFoundError):
+            _ = persistence.get_datafile_name_for_unique_value(cls=cls, unique_value="Honey")
+
     @fx.use_test_database
     def test_raises_exception_if_name_not_found(self):
         """Check that we get an exception if we don't recognise the unique name."""
@@ -30,3 +66,58 @@ class TestGetDatafileNameForUniqueValue(TestCase):
                 cls=model.ingredients.ReadonlyIngredient,
                 unique_value="fake"
             )
+
+
+class TestGetUniqueValueFromDatafileName(TestCase):
+    """Tests for get_unique_value_from_datafile_name method."""
+
+    @fx.use_test_database
+    def test_gets_correct_unique_value(self):
+        """Check that the correct unique value is returned."""
+        self.assertEqual(
+            "Honey",
+            persistence.get_unique_value_from_datafile_name(
+                cls=model.ingredients.ReadonlyIngredient,
+                datafile_name="1198a703-ae23-4303-9b21-dd8ef9d16548"
+            )
+        )
+
+    @fx.use_test_database
+    def test_raises_exception_if_datafile_not_found(self):
+        """Check that we get an exception if we don't recognise the datafile name."""
+        with self.assertRaises(persistence.exceptions.DatafileNotFoundError):
+            _ = persistence.get_unique_value_from_datafile_name(
+                cls=model.ingredients.ReadonlyIngredient,
+                datafile_name="fake"
+            )
+
+
+class TestCheckUniqueValueAvailable(TestCase):
+    """Tests for check_unique_value_available method."""
+
+    @fx.use_test_database
+    def test_saved_value_is_unavailable(self):
+        """Check that a value already in the index is not available, and a new one is."""
+        cls = model.ingredients.ReadonlyIngredient
+        self.assertFalse(persistence.check_unique_value_available(cls=cls, proposed_value="Honey"))
+        self.assertTrue(persistence.check_unique_value_available(cls=cls, proposed_value="fake"))
+
+    @fx.use_test_database
+    def test_ignored_datafile_does_not_count(self):
+        """Check that a datafile's own value is available to it, and the index is left intact."""
+        cls = model.ingredients.ReadonlyIngredient
+        df_name = "1198a703-ae23-4303-9b21-dd8ef9d16548"
+        num_entries = persistence.count_saved_instances(cls)
+        self.assertTrue(persistence.check_unique_value_available(
+            cls=cls, proposed_value="Honey", ignore_datafile=df_name))
+        self.assertEqual(num_entries, persistence.count_saved_instances(cls))
+        self.assertEqual("Honey", persistence.get_unique_value_from_datafile_name(cls, df_name))
+
+    @fx.use_test_database
+    def test_deleted_value_becomes_available(self):
+        """Check that deleting an index entry frees its value."""
+        cls = model.ingredients.ReadonlyIngredient
+        self.assertFalse(persistence.check_unique_value_available(cls=cls, proposed_value="Honey"))
+        with mock.patch('builtins.open', mock.mock_open()):
+            persistence.main._delete_index_entry(cls, "1198a703-ae23-4303-9b21-dd8ef9d16548")
+        self.assertTrue(persistence.check_unique_value_available(cls=cls, proposed_value="Honey"))
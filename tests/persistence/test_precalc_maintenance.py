@@ -0,0 +1,99 @@
+"""Tests for functionality in persistence.precalc_maintenance"""
+import json
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import model
+import persistence
+import tests
+
+
+def use_test_database_copy(func):
+    """Decorator to run the test against a fresh copy of the test database, which it can write to."""
+
+    def wrapper(self, *args, **kwargs):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shutil.copytree(tests.persistence.configs.PATH_INTO_DB, f"{tmp_dir}/db")
+            with mock.patch('persistence.configs.PATH_INTO_DB', f"{tmp_dir}/db"):
+                persistence.cache.reset()
+                return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+def read_precalc_file(filename: str):
+    """Returns the contents of the named precalc data file on disk."""
+    with open(f"{persistence.configs.PATH_INTO_DB}/precalc_data/{filename}") as fh:
+        return json.load(fh)
+
+
+class TestSaveAndDeleteRecipe(TestCase):
+    """Tests for keeping the precalc data in step with saves and deletes of recipes."""
+
+    def load_recipe(self) -> 'model.recipes.SettableRecipe':
+        """Loads the first recipe with precalc data."""
+        df_name = sorted(read_precalc_file('recipes.json').keys())[0]
+        return model.recipes.SettableRecipe(
+            persistence.load_datafile(cls=model.recipes.RecipeBase, datafile_name=df_name))
+
+    @use_test_database_copy
+    def test_save_journals_only_the_changed_record(self):
+        """Check saving a recipe outside a batch appends its record to the journal, leaving recipes.json as it
+        was, and that the change is seen once the precalc data is reloaded."""
+        recipe = self.load_recipe()
+        recipe.add_tags(['snack'])
+        recipes_json = read_precalc_file('recipes.json')
+        persistence.save_instance(recipe)
+        self.assertEqual(recipes_json, read_precalc_file('recipes.json'))
+        with open(persistence.precalc_maintenance.get_journal_filepath()) as fh:
+            self.assertEqual(1, len(fh.readlines()))
+        persistence.cache.reset()
+        self.assertEqual(recipe.precalc_data, persistence.get_precalc_data_for_recipe(recipe.datafile_name))
+        self.assertIn(recipe.datafile_name, persistence.get_recipe_df_names_by_tag('snack'))
+        self.assertIn(recipe.datafile_name, persistence.query_recipe_df_names(tags=['snack']))
+
+    @use_test_database_copy
+    def test_delete_removes_precalc_data_and_tags(self):
+        """Check deleting a recipe removes its precalc data and takes it out of every tag list."""
+        df_name = self.load_recipe().datafile_name
+        persistence.delete_instances(model.recipes.RecipeBase, datafile_name=df_name)
+        persistence.cache.reset()
+        self.assertNotIn(df_name, persistence.get_precalc_data_for_recipes())
+        for df_names in persistence.main.get_recipes_by_tag().values():
+            self.assertNotIn(df_name, df_names)
+
+    @use_test_database_copy
+    def test_saves_recipe_with_incomplete_data(self):
+        """Check a recipe whose precalc data can't be calculated still saves, without a precalc record."""
+        recipe = model.recipes.SettableRecipe()
+        recipe.name = "Brand New Recipe"
+        persistence.save_instance(recipe)
+        self.assertEqual(recipe.datafile_name, persistence.get_datafile_name_for_unique_value(
+            cls=model.recipes.RecipeBase, unique_value="Brand New Recipe"))
+        self.assertNotIn(recipe.datafile_name, persistence.get_precalc_data_for_recipes())
+
+    @use_test_database_copy
+    def test_batch_compacts_once(self):
+        """Check the precalc files are only written once, at the end of a batch of saves, leaving no journal."""
+        recipe = self.load_recipe()
+        with mock.patch('persistence.precalc_maintenance._replace_json',
+                        wraps=persistence.precalc_maintenance._replace_json) as replace_json:
+            with persistence.batch_writes():
+                persistence.save_instance(recipe)
+                persistence.save_instance(recipe)
+                self.assertEqual(0, replace_json.call_count)
+        self.assertEqual(2, replace_json.call_count)
+        self.assertFalse(persistence.precalc_maintenance.journal_has_changes())
+        self.assertEqual(recipe.precalc_data, read_precalc_file('recipes.json')[recipe.datafile_name])
+
+    @use_test_database_copy
+    def test_full_journal_is_compacted(self):
+        """Check the journal is compacted into the precalc files once it holds the max number of changes."""
+        recipe = self.load_recipe()
+        with mock.patch('persistence.configs.PRECALC_JOURNAL_MAX_ENTRIES', 2):
+            persistence.save_instance(recipe)
+            self.assertTrue(persistence.precalc_maintenance.journal_has_changes())
+            persistence.save_instance(recipe)
+        self.assertFalse(persistence.precalc_maintenance.journal_has_changes())
+        self.assertEqual(recipe.precalc_data, read_precalc_file('recipes.json')[recipe.datafile_name])
@@ -0,0 +1,75 @@
+"""Tests for functionality in persistence.precalc_store"""
+import tempfile
+from unittest import TestCase, mock
+
+import numpy
+
+import optimisation
+import persistence
+from tests.persistence import fixtures as fx
+
+
+class TestPrecalcStore(TestCase):
+    """Tests for writing and opening a binary precalc store."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = f"{self.tmp_dir.name}/recipes.precalc"
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    @fx.use_test_database
+    def test_columns_match_json_precalc_data(self):
+        """Check the store's columns hold the same values as arrays built from the json precalc data."""
+        precalc_data = persistence.get_precalc_data_for_recipes()
+        persistence.write_precalc_store(
+            filepath=self.filepath,
+            precalc_data=precalc_data,
+            get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+            get_serve_intervals=persistence.recipe_index._read_serve_intervals
+        )
+        store = persistence.PrecalcStore(self.filepath)
+        self.assertIsInstance(store.nutrient_ratios, numpy.memmap)
+        expected = optimisation.RecipeArrays.from_precalc_data(precalc_data)
+        actual = optimisation.RecipeArrays.from_precalc_store(store)
+        self.assertEqual(expected.df_names, actual.df_names)
+        self.assertEqual(expected.nutrient_names, actual.nutrient_names)
+        for name in ['nutrient_ratios', 'calories_per_g', 'cost_per_g', 'typical_serving_size_g']:
+            numpy.testing.assert_array_equal(getattr(expected, name), getattr(actual, name))
+
+    @fx.use_test_database
+    def test_recipe_index_matches_json_precalc_data(self):
+        """Check an index built from the store answers queries as one built from the json precalc data."""
+        persistence.write_precalc_store(
+            filepath=self.filepath,
+            precalc_data=persistence.get_precalc_data_for_recipes(),
+            get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+            get_serve_intervals=persistence.recipe_index._read_serve_intervals
+        )
+        from_store = persistence.RecipeIndex.from_precalc_store(persistence.PrecalcStore(self.filepath))
+        from_json = persistence.get_recipe_index()
+        for query in [{'tags': ['main']}, {'flags': {'vegetarian': True}}, {'flags': {'caffeine_free': None}},
+                      {'tags': ['main'], 'serve_time': '12:30'}, {'serve_time': '23:00'}]:
+            self.assertEqual(from_json.query_df_names(**query), from_store.query_df_names(**query))
+
+    def test_opens_empty_store(self):
+        """Check a store with no recipes can be written and opened."""
+        persistence.write_precalc_store(filepath=self.filepath, precalc_data={}, get_df_names_by_tag=lambda: {})
+        store = persistence.PrecalcStore(self.filepath)
+        self.assertEqual(0, len(store))
+        self.assertEqual([], store.df_names)
+
+    @fx.use_test_database
+    def test_json_precalc_data_in_cache_takes_precedence(self):
+        """Check the store is only used while the json precalc data has not been loaded."""
+        persistence.write_precalc_store(
+            filepath=self.filepath,
+            precalc_data=persistence.get_precalc_data_for_recipes(),
+            get_df_names_by_tag=persistence.main.get_recipes_by_tag,
+            get_serve_intervals=persistence.recipe_index._read_serve_intervals
+        )
+        self.assertIsNone(persistence.get_precalc_store())
+        persistence.cache.reset()
+        with mock.patch('persistence.precalc_store.get_precalc_store_filepath', return_value=self.filepath):
+            self.assertIsInstance(persistence.get_precalc_store(), persistence.PrecalcStore)
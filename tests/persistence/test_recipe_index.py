@@ -0,0 +1,60 @@
+"""Tests for functionality in persistence.recipe_index"""
+from unittest import TestCase
+
+import persistence
+from tests.persistence import fixtures as fx
+
+
+class TestQueryRows(TestCase):
+    """Tests for the RecipeIndex.query_rows method."""
+
+    def setUp(self) -> None:
+        self.index = persistence.RecipeIndex(
+            df_names=['a', 'b', 'c', 'd'],
+            tags={'main': ['a', 'b'], 'drink': ['c', 'd']},
+            flag_data={
+                'a': {'vegetarian': True, 'nut_free': True},
+                'b': {'vegetarian': False, 'nut_free': True},
+                'c': {'vegetarian': True, 'nut_free': None},
+                'd': {'vegetarian': True, 'nut_free': True},
+            },
+            serve_intervals={
+                'a': ['06:00-10:00', '12:00-13:00'],
+                'b': ['12:00-14:00'],
+                'c': ['22:00-02:00'],
+                'd': [],
+            }
+        )
+
+    def test_combines_tags_and_flags(self):
+        """Check only recipes matching every tag and flag are returned."""
+        self.assertEqual(['a'], self.index.query_df_names(tags=['main'], flags={'vegetarian': True}))
+        self.assertEqual(['a', 'd'], self.index.query_df_names(flags={'vegetarian': True, 'nut_free': True}))
+
+    def test_filters_by_serve_time(self):
+        """Check the serve time filter matches the serve intervals, including their end times."""
+        self.assertEqual(['a', 'b'], self.index.query_df_names(serve_time='13:00'))
+        self.assertEqual(['b'], self.index.query_df_names(tags=['main'], serve_time='13:30'))
+        self.assertEqual(['c'], self.index.query_df_names(serve_time='01:00'))
+
+    def test_unknown_tags_and_flag_values_match_nothing(self):
+        """Check querying a tag or flag value no recipe has returns no recipes."""
+        self.assertEqual([], self.index.query_df_names(tags=['dessert']))
+        self.assertEqual([], self.index.query_df_names(flags={'nut_free': False}))
+
+    def test_empty_query_returns_all(self):
+        """Check an empty query returns every recipe."""
+        self.assertEqual(['a', 'b', 'c', 'd'], self.index.query_df_names())
+
+
+class TestQueryRecipeDfNames(TestCase):
+    """Tests for the query_recipe_df_names function."""
+
+    @fx.use_test_database
+    def test_matches_tag_and_flag_lookups(self):
+        """Check the index gives the same result as the tag and flag lookups."""
+        expected = set(persistence.get_recipe_df_names_by_tag('main')).intersection(
+            persistence.get_precalc_data_for_recipes().keys())
+        expected = [df_name for df_name in persistence.get_precalc_data_for_recipes().keys() if df_name in expected
+                    and persistence.get_precalc_data_for_recipe(df_name)['flag_data']['vegetarian'] is True]
+        self.assertEqual(expected, persistence.query_recipe_df_names(tags=['main'], flags={'vegetarian': True}))